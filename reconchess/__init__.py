@@ -1,7 +1,9 @@
-from .game import Game, LocalGame, RemoteGame
-from .player import Player, load_player
+from .game import Game, LocalGame, SimulatedGame, RemoteGame
+from .player import Player, AsyncPlayer, load_player
 from .types import *
 from .utilities import is_illegal_castle, is_psuedo_legal_castle
 from .play import play_local_game, play_remote_game, play_turn, notify_opponent_move_results, play_sense, play_move
-from .history import Turn, GameHistory, GameHistoryEncoder, GameHistoryDecoder
+from .play import async_play_local_game, async_play_turn, async_notify_opponent_move_results, async_play_sense, \
+    async_play_move
+from .history import Turn, GameHistory, GameHistoryEncoder, GameHistoryDecoder, TURN_PHASES
 import chess
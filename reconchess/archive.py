@@ -0,0 +1,164 @@
+import json
+import os
+import struct
+from typing import Iterator
+from .types import *
+from .history import GameHistory
+
+try:
+    import fcntl
+except ImportError:
+    # not available on windows, where appends from several processes at once are not supported
+    fcntl = None
+
+# magic, metadata length, history length. the metadata is utf-8 json, the history is from GameHistory.to_bytes
+_RECORD_HEADER = struct.Struct('<4sII')
+_RECORD_MAGIC = b'RCGA'
+
+# offset of each record in the archive
+_INDEX_ENTRY = struct.Struct('<Q')
+
+
+class HistoryArchive(object):
+    """
+    An append-only file of many game histories, so that tournaments and self-play runs don't leave behind one file
+    per game. Each record is a game's history in the binary format of :meth:`GameHistory.to_bytes`, along with a
+    dictionary of metadata, such as the names of the bots.
+
+    Next to the archive is an index file (the archive path plus `.idx`) with the offset of every record, so the number
+    of games and any single game can be read without scanning the archive. :meth:`games` streams the games in order,
+    reading one record at a time, so archives larger than memory can be processed.
+
+    Every :meth:`append` opens the files and holds an exclusive lock on the archive while it writes, so any number of
+    processes (e.g. the workers of a :class:`multiprocessing.Pool`) can append to the same archive at once. The lock
+    uses :mod:`fcntl`, which is only available on Unix.
+
+    Examples:
+        >>> archive = HistoryArchive('tournament.rca')
+        >>> archive.append(history, {'white': 'TroutBot', 'black': 'RandomBot'})
+        0
+        >>> len(archive)
+        1
+        >>> for metadata, history in archive.games():
+        ...     print(metadata['white'], history.num_turns())
+        TroutBot 58
+
+    :param path: The path of the archive. It is created by the first :meth:`append` if it doesn't exist.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + '.idx'
+
+    def append(self, history: GameHistory, metadata: dict = None) -> int:
+        """
+        Adds a game to the end of the archive.
+
+        :param history: The history of the game.
+        :param metadata: Optional JSON serializable dictionary stored with the game.
+        :return: The index of the game in the archive.
+        """
+        metadata_bytes = json.dumps(metadata if metadata is not None else {}).encode('utf-8')
+        history_bytes = history.to_bytes()
+        record = _RECORD_HEADER.pack(_RECORD_MAGIC, len(metadata_bytes), len(history_bytes)) + metadata_bytes + \
+            history_bytes
+
+        with open(self.path, 'ab') as fp:
+            if fcntl is not None:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            try:
+                offset = fp.seek(0, os.SEEK_END)
+                fp.write(record)
+                fp.flush()
+                with open(self.index_path, 'ab') as index_fp:
+                    game_index = index_fp.seek(0, os.SEEK_END) // _INDEX_ENTRY.size
+                    index_fp.write(_INDEX_ENTRY.pack(offset))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+        return game_index
+
+    def __len__(self):
+        if not os.path.exists(self.index_path):
+            return 0
+        return os.path.getsize(self.index_path) // _INDEX_ENTRY.size
+
+    def _offset(self, index: int) -> int:
+        num_games = len(self)
+        if index < 0:
+            index += num_games
+        if not 0 <= index < num_games:
+            raise IndexError('game index out of range')
+        with open(self.index_path, 'rb') as fp:
+            fp.seek(index * _INDEX_ENTRY.size)
+            return _INDEX_ENTRY.unpack(fp.read(_INDEX_ENTRY.size))[0]
+
+    def read(self, index: int) -> Tuple[dict, GameHistory]:
+        """
+        Reads a single game using the index.
+
+        :param index: The index of the game, in the order the games were appended. Negative indices count from the
+            end.
+        :return: The metadata and :class:`GameHistory` of the game.
+        """
+        offset = self._offset(index)
+        with open(self.path, 'rb') as fp:
+            fp.seek(offset)
+            return _read_record(fp)
+
+    def games(self) -> Iterator[Tuple[dict, GameHistory]]:
+        """
+        Streams every game in the archive in order. Only one record is read at a time, and the index isn't used, so
+        games whose index entries were lost (e.g. when a process was killed in the middle of :meth:`append`) are
+        included too.
+
+        :return: Generator of (metadata, :class:`GameHistory`) tuples.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as fp:
+            while True:
+                record = _read_record(fp)
+                if record is None:
+                    return
+                yield record
+
+    def rebuild_index(self):
+        """
+        Rewrites the index by scanning the archive, e.g. after the archive was copied without it.
+        """
+        offsets = []
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as fp:
+                while True:
+                    offset = fp.tell()
+                    header = fp.read(_RECORD_HEADER.size)
+                    if not header:
+                        break
+                    _, metadata_length, history_length = _unpack_header(header)
+                    fp.seek(metadata_length + history_length, os.SEEK_CUR)
+                    offsets.append(offset)
+        with open(self.index_path, 'wb') as fp:
+            fp.write(b''.join(_INDEX_ENTRY.pack(offset) for offset in offsets))
+
+
+def _unpack_header(header: bytes) -> Tuple[bytes, int, int]:
+    if len(header) < _RECORD_HEADER.size:
+        raise ValueError('Archive ends in the middle of a record')
+    magic, metadata_length, history_length = _RECORD_HEADER.unpack(header)
+    if magic != _RECORD_MAGIC:
+        raise ValueError('No game record found in the archive')
+    return magic, metadata_length, history_length
+
+
+def _read_record(fp) -> Optional[Tuple[dict, GameHistory]]:
+    # reads the record at the current position of `fp`, or returns None at the end of the file
+    header = fp.read(_RECORD_HEADER.size)
+    if not header:
+        return None
+    _, metadata_length, history_length = _unpack_header(header)
+    metadata_bytes = fp.read(metadata_length)
+    history_bytes = fp.read(history_length)
+    if len(history_bytes) < history_length:
+        raise ValueError('Archive ends in the middle of a record')
+    return json.loads(metadata_bytes.decode('utf-8')), GameHistory.from_bytes(history_bytes)
@@ -0,0 +1,194 @@
+import chess
+import numpy as np
+from .types import *
+from .utilities import SENSE_WINDOW_MASKS
+
+# rough estimate of the number of possible moves for a player in a turn
+AVERAGE_MOVES_PER_TURN = 30
+
+# senses centered on the edge of the board cover fewer squares
+INTERIOR_SQUARES = [square for square in chess.SQUARES
+                    if 1 <= chess.square_rank(square) <= 6 and 1 <= chess.square_file(square) <= 6]
+
+# _SENSE_WINDOW_MATRIX[window_square, center] is 1 if window_square is in the sense centered on center
+_SENSE_WINDOW_MATRIX = np.array([[(mask >> window_square) & 1 for mask in SENSE_WINDOW_MASKS]
+                                 for window_square in chess.SQUARES], dtype=float)
+
+
+def sense_window_scores(grid) -> np.ndarray:
+    """
+    Scores every possible sense against a grid of per-square values, such as the probability of an opponent piece
+    being on each square. The score of a sense is the sum of the values of the squares in it. Any number of grids can
+    be scored at once by stacking them along leading axes.
+
+    Examples:
+        >>> scores = sense_window_scores(np.ones((8, 8)))
+        >>> scores[chess.A1], scores[chess.B2]
+        (4.0, 9.0)
+
+    :param grid: Array of shape (..., 8, 8) indexed by [rank, file], or (..., 64) indexed by :class:`Square`.
+    :return: Array of shape (..., 64) with the score of the sense centered on each :class:`Square`.
+    """
+    grid = np.asarray(grid, dtype=float)
+    if grid.shape[-2:] == (8, 8):
+        grid = grid.reshape(grid.shape[:-2] + (64,))
+    return grid @ _SENSE_WINDOW_MATRIX
+
+
+def best_sense_squares(grid, candidates: List[Square] = None) -> np.ndarray:
+    """
+    Gets the highest scoring sense for each grid, see :func:`sense_window_scores`. Ties go to the lowest square.
+
+    :param grid: Array of shape (..., 8, 8) or (..., 64).
+    :param candidates: Optional list of the :class:`Square` that can be chosen. Defaults to every square.
+    :return: Integer array of shape (...) with the center :class:`Square` of the best sense for each grid.
+    """
+    scores = sense_window_scores(grid)
+    if candidates is None:
+        return scores.argmax(axis=-1)
+    candidates = np.asarray(candidates)
+    return candidates[scores[..., candidates].argmax(axis=-1)]
+
+
+class BeliefState(object):
+    """
+    A probability distribution over where the opponent's pieces are. Each square of the board has a probability for
+    each of the opponent's piece types, stored in :attr:`probabilities` as an array of shape (8, 8, 6) that is indexed
+    by [rank, file, piece_type - 1].
+
+    Example usage from a :class:`Player`: ::
+
+        def handle_game_start(self, color: Color, board: chess.Board):
+            self.belief = BeliefState(color, board)
+
+        def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+            self.belief.handle_sense_result(sense_result)
+
+        def handle_move_result(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                               captured_opponent_piece: bool, capture_square: Optional[Square]):
+            if captured_opponent_piece:
+                self.belief.handle_capture(capture_square)
+            self.belief.handle_own_move(taken_move)
+
+    :param color: The color of the player holding the belief. The probabilities are for the other color's pieces.
+    :param board: The starting board. The opponent's pieces on it start with probability 1. Defaults to the standard
+        starting position.
+    """
+
+    def __init__(self, color: Color, board: chess.Board = None):
+        self.color = color
+        self.probabilities = np.zeros((8, 8, len(chess.PIECE_TYPES)))
+
+        board = chess.Board() if board is None else board
+        for square, piece in board.piece_map().items():
+            if piece.color != color:
+                self.probabilities[chess.square_rank(square), chess.square_file(square), piece.piece_type - 1] = 1
+        self.opponent_pieces_left = len([piece for piece in board.piece_map().values() if piece.color != color])
+
+    def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+        """
+        Updates the probabilities using the result of a sense. Squares that were empty or had our pieces on them have
+        all of their probabilities set to 0. For squares with an opponent's piece, the piece type is set to
+        probability 1, and the probability of that piece type on every other square where it is the most likely piece
+        type is reduced, since one of those pieces must be the one that was sensed.
+
+        :param sense_result: The sense result passed to :meth:`Player.handle_sense_result`.
+        """
+        pieces_left = max(self.opponent_pieces_left, 1)
+        moves_per_piece = AVERAGE_MOVES_PER_TURN / pieces_left
+        stay_factor = (pieces_left - 1) / pieces_left
+
+        for square, piece in sense_result:
+            rank, file = chess.square_rank(square), chess.square_file(square)
+            self.probabilities[rank, file] = 0
+
+            if piece is None or piece.color == self.color:
+                continue
+
+            piece_index = piece.piece_type - 1
+            self.probabilities[rank, file, piece_index] = 1
+
+            # every square where this piece type is the most likely piece. note that the sensed square is always
+            # the closest of these, so it gets the "moved here" update and the rest get the "stayed" update
+            candidates = self.probabilities.argmax(axis=2) == piece_index
+            candidates[rank, file] = False
+            self.probabilities[candidates, piece_index] *= stay_factor
+            self.probabilities[rank, file, piece_index] += (1 - stay_factor) / moves_per_piece
+
+    def handle_capture(self, square: Square):
+        """
+        Updates the probabilities after we captured an opponent's piece on `square`.
+
+        :param square: The :class:`Square` the capture happened on.
+        """
+        self.opponent_pieces_left -= 1
+        self.probabilities[chess.square_rank(square), chess.square_file(square)] = 0
+
+    def handle_own_move(self, taken_move: Optional[chess.Move]):
+        """
+        Updates the probabilities after one of our pieces moved, since no opponent piece can be where it moved to.
+
+        :param taken_move: The taken move passed to :meth:`Player.handle_move_result`.
+        """
+        if taken_move is not None:
+            square = taken_move.to_square
+            self.probabilities[chess.square_rank(square), chess.square_file(square)] = 0
+
+    def square_totals(self) -> np.ndarray:
+        """
+        :return: Array of shape (8, 8) with the total probability of any opponent piece on each square.
+        """
+        return self.probabilities.sum(axis=2)
+
+    def window_totals(self) -> np.ndarray:
+        """
+        :return: Array of shape (8, 8) where each element is the total probability of the 3x3 sense centered on that
+            square.
+        """
+        return sense_window_scores(self.square_totals()).reshape(8, 8)
+
+    def best_sense_square(self) -> Square:
+        """
+        Gets the sense with the highest total probability. Only :data:`INTERIOR_SQUARES` are considered, since senses
+        centered on the edge of the board cover fewer squares.
+
+        :return: The center :class:`Square` of the best sense, or :data:`chess.A1` if every sense has probability 0.
+        """
+        totals = self.square_totals()
+        if not totals.any():
+            return chess.A1
+        return int(best_sense_squares(totals, INTERIOR_SQUARES))
+
+    def most_likely_square(self, piece_type: PieceType) -> Optional[Square]:
+        """
+        :param piece_type: The opponent piece type in question.
+        :return: The :class:`Square` where `piece_type` is most likely to be, or `None` if it has probability 0
+            everywhere.
+        """
+        probabilities = self.probabilities[:, :, piece_type - 1].reshape(64)
+        square = int(probabilities.argmax())
+        return square if probabilities[square] > 0 else None
+
+    def likely_pieces(self, threshold: float, max_pawns: int = 8) -> List[Tuple[Square, PieceType]]:
+        """
+        Gets the squares where an opponent piece other than the king is likely to be. The most likely piece type on
+        each square is used, and pawns past `max_pawns` are skipped.
+
+        :param threshold: Minimum probability for a piece to be included.
+        :param max_pawns: Maximum number of pawns to include.
+        :return: List of (:class:`Square`, :class:`PieceType`) tuples in square order.
+        """
+        probabilities = self.probabilities[:, :, :-1].reshape(64, len(chess.PIECE_TYPES) - 1)
+        piece_types = probabilities.argmax(axis=1) + 1
+        likely = probabilities.max(axis=1) >= threshold
+
+        pieces = []
+        num_pawns = 0
+        for square in np.flatnonzero(likely):
+            piece_type = int(piece_types[square])
+            if piece_type == chess.PAWN:
+                if num_pawns >= max_pawns:
+                    continue
+                num_pawns += 1
+            pieces.append((int(square), piece_type))
+        return pieces
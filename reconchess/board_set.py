@@ -0,0 +1,594 @@
+import multiprocessing
+import os
+import sys
+import time
+import chess
+import chess.polyglot
+import numpy as np
+from typing import Iterable, Iterator, Union
+from .types import *
+from .utilities import CASTLING_MOVES, add_pawn_queen_promotion, capture_square_of_move, \
+    moves_without_opponent_pieces, pawn_capture_moves_on, revise_move, successor_boards
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # python < 3.8, where BoardSetPool pickles the arrays for its workers instead
+    shared_memory = None
+
+# the columns of BoardSet.bitboards. piece types are 1 more than their column. the white pieces are the pieces that
+# aren't black, so they aren't stored
+_PAWNS, _KNIGHTS, _BISHOPS, _ROOKS, _QUEENS, _KINGS, _BLACK = range(7)
+
+# the bits of BoardSet.castling, in the order of their Zobrist keys: the rook square of each castle and the square
+# the king has to be on
+_CASTLING_FLAGS = [(chess.WHITE, chess.H1, chess.E1), (chess.WHITE, chess.A1, chess.E1),
+                   (chess.BLACK, chess.H8, chess.E8), (chess.BLACK, chess.A8, chess.E8)]
+
+_ZOBRIST = np.array(chess.polyglot.POLYGLOT_RANDOM_ARRAY, dtype=np.uint64)
+
+
+def _byte_table(keys: np.ndarray) -> np.ndarray:
+    # table[i, b] is the XOR of the keys of the bits set in byte b of byte i of a bitboard, so a bitboard is hashed
+    # with 8 lookups instead of 64
+    table = np.zeros((8, 256), dtype=np.uint64)
+    for i in range(8):
+        for bit in range(8):
+            has_bit = (np.arange(256) >> bit) & 1 == 1
+            table[i, has_bit] ^= keys[8 * i + bit]
+    return table
+
+
+# _ZOBRIST_PIECES[column, color] is the byte table of that piece type and color, see chess.polyglot.ZobristHasher
+_ZOBRIST_PIECES = np.array([[_byte_table(_ZOBRIST[64 * (2 * piece_column + color):64 * (2 * piece_column + color + 1)])
+                             for color in [chess.BLACK, chess.WHITE]] for piece_column in range(6)])
+_ZOBRIST_CASTLING = np.array([np.bitwise_xor.reduce(_ZOBRIST[768:772][[bit for bit in range(4) if flags >> bit & 1]])
+                              for flags in range(16)], dtype=np.uint64)
+_ZOBRIST_EP_FILES = _ZOBRIST[772:780]
+_ZOBRIST_WHITE_TURN = _ZOBRIST[780]
+
+# the arrays of a BoardSet, in the order they are laid out in shared memory by BoardSetPool
+_ARRAY_NAMES = ['bitboards', 'castling', 'ep_squares', 'turns', 'weights', 'keys']
+
+# BoardSetPool expands this many boards between checks of the deadline
+_EXPAND_CHUNK_SIZE = 128
+
+# how long BoardSetPool waits past the deadline for workers to return the boards they finished
+_DEADLINE_GRACE_SECONDS = 0.25
+
+# _EP_CAPTURERS[turn, ep_square] are the squares a pawn of the player to move can capture en passant from
+_EP_CAPTURERS = np.array([[chess.BB_PAWN_ATTACKS[not turn][square] & chess.BB_RANKS[4 if turn else 3]
+                           for square in chess.SQUARES] for turn in [chess.BLACK, chess.WHITE]], dtype=np.uint64)
+
+
+class BoardSet(object):
+    """
+    A set of boards stored in arrays, for belief tracking bots that keep tens of thousands of hypotheses about the
+    true board. Each board takes 75 bytes, about 10 times less than a :class:`chess.Board` with a move on its stack,
+    and the filters are vectorized over every board at once.
+
+    Each board has a weight, such as its likelihood, and a key, which is the :func:`chess.polyglot.zobrist_hash` of
+    the board. Boards with the same key are merged into one, and their weights are added up. Boards are kept in the
+    order they were first added.
+
+    Only the pieces, castling rights, en passant square and turn are kept. The boards returned by :meth:`board` have
+    no move stack and the default move counters, and their castling rights are cleaned (see
+    :meth:`chess.Board.clean_castling_rights`).
+
+    Examples:
+        >>> boards = BoardSet([chess.Board()]).expand(None)
+        >>> len(boards)
+        21
+        >>> boards = boards.filter_sense_result([(chess.E4, chess.Piece(chess.PAWN, chess.WHITE))])
+        >>> len(boards), boards[0].fen()
+        (1, 'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1')
+
+    :param boards: The boards in the set.
+    :param weights: Optional weight of each board. Defaults to 1 for each board.
+    """
+
+    def __init__(self, boards: Iterable[chess.Board] = (), weights: Iterable[float] = None):
+        rows = []
+        for board in boards:
+            rows.append((board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+                         board.occupied_co[chess.BLACK], board.castling_rights,
+                         board.ep_square if board.ep_square is not None else -1, board.turn))
+        if rows:
+            columns = list(zip(*rows))
+            bitboards = np.array(columns[:7], dtype=np.uint64).T
+            castling_rights = np.array(columns[7], dtype=np.uint64)
+            ep_squares = np.array(columns[8], dtype=np.int8)
+            turns = np.array(columns[9], dtype=bool)
+        else:
+            bitboards = np.zeros((0, 7), dtype=np.uint64)
+            castling_rights = np.zeros(0, dtype=np.uint64)
+            ep_squares = np.zeros(0, dtype=np.int8)
+            turns = np.zeros(0, dtype=bool)
+
+        weights = np.ones(len(rows)) if weights is None else np.fromiter(weights, dtype=float, count=len(rows))
+        self._set_arrays(bitboards, _castling_flags(bitboards, castling_rights), ep_squares, turns, weights)
+        self._deduplicate()
+
+    @classmethod
+    def _from_arrays(cls, bitboards: np.ndarray, castling: np.ndarray, ep_squares: np.ndarray, turns: np.ndarray,
+                     weights: np.ndarray, keys: np.ndarray = None) -> 'BoardSet':
+        board_set = cls.__new__(cls)
+        board_set._set_arrays(bitboards, castling, ep_squares, turns, weights, keys)
+        return board_set
+
+    def _set_arrays(self, bitboards, castling, ep_squares, turns, weights, keys=None):
+        self.bitboards = bitboards
+        """Array of shape (n, 7) with the bitboards of the pawns, knights, bishops, rooks, queens, kings and black
+        pieces of each board."""
+        self.castling = castling
+        """Array of the castling rights of each board, as bit flags for white kingside, white queenside, black
+        kingside and black queenside castling."""
+        self.ep_squares = ep_squares
+        """Array of the en passant square of each board, or -1."""
+        self.turns = turns
+        """Array of the player to move on each board."""
+        self.weights = weights
+        """Array of the weight of each board."""
+        self.keys = keys if keys is not None else _zobrist_keys(bitboards, castling, ep_squares, turns)
+        """Array of the Zobrist hash of each board."""
+
+    def _deduplicate(self):
+        unique_keys, first_indices, inverse = np.unique(self.keys, return_index=True, return_inverse=True)
+        if len(unique_keys) == len(self.keys):
+            return
+        weights = np.bincount(inverse.reshape(-1), weights=self.weights, minlength=len(unique_keys))
+        order = np.argsort(first_indices)
+        indices = first_indices[order]
+        self._set_arrays(self.bitboards[indices], self.castling[indices], self.ep_squares[indices],
+                         self.turns[indices], weights[order], self.keys[indices])
+
+    @classmethod
+    def concatenate(cls, board_sets: Iterable['BoardSet']) -> 'BoardSet':
+        """
+        Merges several sets into one. Boards in more than one of them are merged, and their weights are added up.
+
+        :param board_sets: The sets to merge.
+        :return: The merged set.
+        """
+        board_sets = list(board_sets)
+        if not board_sets:
+            return cls()
+        board_set = cls._from_arrays(*[np.concatenate([getattr(board_set, name) for board_set in board_sets])
+                                       for name in _ARRAY_NAMES])
+        board_set._deduplicate()
+        return board_set
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self) -> Iterator[chess.Board]:
+        for index in range(len(self)):
+            yield self.board(index)
+
+    def __getitem__(self, index: int) -> chess.Board:
+        return self.board(index)
+
+    def __contains__(self, board: chess.Board) -> bool:
+        return bool(np.any(self.keys == np.uint64(chess.polyglot.zobrist_hash(board))))
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used by the arrays of the set."""
+        return sum(getattr(self, name).nbytes for name in _ARRAY_NAMES)
+
+    def board(self, index: int) -> chess.Board:
+        """
+        :param index: The index of the board in the set.
+        :return: A new :class:`chess.Board` with the board at `index`.
+        """
+        return _make_board(self.bitboards[index], int(self.castling[index]), int(self.ep_squares[index]),
+                           bool(self.turns[index]))
+
+    def select(self, indices: Union[np.ndarray, slice]) -> 'BoardSet':
+        """
+        :param indices: A boolean mask, an array of indices or a slice.
+        :return: A new set with the selected boards.
+        """
+        return BoardSet._from_arrays(self.bitboards[indices], self.castling[indices], self.ep_squares[indices],
+                                     self.turns[indices], self.weights[indices], self.keys[indices])
+
+    def most_likely(self, max_boards: int) -> 'BoardSet':
+        """
+        :param max_boards: The maximum number of boards to keep.
+        :return: A new set with the `max_boards` boards with the largest weights, in order of decreasing weight.
+        """
+        return self.select(np.argsort(-self.weights, kind='stable')[:max_boards])
+
+    def filter_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]) -> 'BoardSet':
+        """
+        :param sense_result: The sense result passed to :meth:`Player.handle_sense_result`.
+        :return: A new set with the boards that have the sensed piece (or no piece) on every sensed square.
+        """
+        return self.select(self._sense_result_mask(sense_result))
+
+    def _sense_result_mask(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]) -> np.ndarray:
+        window_mask = 0
+        expected = [0] * 7
+        for square, piece in sense_result:
+            window_mask |= chess.BB_SQUARES[square]
+            if piece is not None:
+                expected[piece.piece_type - 1] |= chess.BB_SQUARES[square]
+                if piece.color == chess.BLACK:
+                    expected[_BLACK] |= chess.BB_SQUARES[square]
+
+        sensed = self.bitboards & np.uint64(window_mask)
+        return (sensed == np.array(expected, dtype=np.uint64)).all(axis=1)
+
+    def filter_move_result(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                           capture_square: Optional[Square]) -> 'BoardSet':
+        """
+        Keeps the boards where requesting `requested_move` would have resulted in `taken_move` and `capture_square`,
+        with moves revised the same way as :class:`LocalGame` does it (see :func:`reconchess.utilities.revise_move`).
+        The boards must have the player who moved to move.
+
+        The result of a move only depends on the pieces along its path, so boards are grouped by those pieces and
+        each group is only checked once.
+
+        :param requested_move: The requested move passed to :meth:`Player.handle_move_result`.
+        :param taken_move: The taken move passed to :meth:`Player.handle_move_result`.
+        :param capture_square: The capture square passed to :meth:`Player.handle_move_result`.
+        :return: A new set with the consistent boards.
+        """
+        if requested_move is None:
+            return self.select(np.full(len(self), taken_move is None and capture_square is None))
+
+        path_mask = chess.BB_SQUARES[requested_move.from_square] | chess.BB_SQUARES[requested_move.to_square] | \
+            chess.BB_BETWEEN[requested_move.from_square][requested_move.to_square]
+        if requested_move in CASTLING_MOVES:
+            rook_square = chess.square(7 if requested_move.to_square > requested_move.from_square else 0,
+                                       chess.square_rank(requested_move.from_square))
+            path_mask |= chess.BB_SQUARES[rook_square] | chess.BB_BETWEEN[requested_move.from_square][rook_square]
+
+        paths = np.column_stack([self.bitboards & np.uint64(path_mask)] +
+                                [array.astype(np.uint64) for array in [self.castling, self.ep_squares + 1, self.turns]])
+        if not len(paths):
+            return self
+        unique_paths, inverse = np.unique(paths, axis=0, return_inverse=True)
+
+        consistent = np.zeros(len(unique_paths), dtype=bool)
+        for index, path in enumerate(unique_paths):
+            board = _make_board(path[:7], int(path[7]), int(path[8]) - 1, bool(path[9]))
+            move = add_pawn_queen_promotion(board, requested_move)
+            if move not in moves_without_opponent_pieces(board) + pawn_capture_moves_on(board):
+                continue
+            revised = revise_move(board, move)
+            consistent[index] = revised == taken_move and capture_square_of_move(board, revised) == capture_square
+        return self.select(consistent[inverse.reshape(-1)])
+
+    def push(self, move: Optional[chess.Move]) -> 'BoardSet':
+        """
+        Makes `move` on every board, the same way :meth:`chess.Board.push` does it. The move must be pseudo legal (or
+        a pseudo legal castle) on every board, e.g. the taken move after :meth:`filter_move_result`.
+
+        :param move: The move to make, or `None` to pass.
+        :return: A new set with the boards after the move.
+        """
+        bitboards = self.bitboards.copy()
+        castling = self.castling.copy()
+        turns = ~self.turns
+        ep_squares = np.full(len(self), -1, dtype=np.int8)
+        if move is None:
+            board_set = BoardSet._from_arrays(bitboards, castling, ep_squares, turns, self.weights.copy())
+            board_set._deduplicate()
+            return board_set
+
+        from_bb, to_bb = np.uint64(chess.BB_SQUARES[move.from_square]), np.uint64(chess.BB_SQUARES[move.to_square])
+        piece_columns = np.argmax((bitboards[:, :6] & from_bb) != 0, axis=1)
+        rows = np.arange(len(self))
+        is_pawn = piece_columns == _PAWNS
+        is_king = piece_columns == _KINGS
+        diff = move.to_square - move.from_square
+
+        # en passant captures the pawn behind the en passant square, which is empty
+        is_en_passant = is_pawn & (self.ep_squares == move.to_square) & (abs(diff) in [7, 9]) & \
+            (_occupied(bitboards) & to_bb == 0)
+        victim_bb = np.where(self.turns, to_bb >> np.uint64(8), to_bb << np.uint64(8))
+        bitboards &= ~np.where(is_en_passant, victim_bb, np.uint64(0))[:, np.newaxis]
+
+        bitboards &= ~(from_bb | to_bb)
+        if move.promotion:
+            piece_columns = np.full(len(self), move.promotion - 1)
+        bitboards[rows, piece_columns] |= to_bb
+        bitboards[~self.turns, _BLACK] |= to_bb
+
+        # castling moves the rook too
+        if move in CASTLING_MOVES and abs(diff) == 2:
+            rook_from = chess.square(7 if diff > 0 else 0, chess.square_rank(move.from_square))
+            rook_to = (move.from_square + move.to_square) // 2
+            rook_bbs = np.uint64(chess.BB_SQUARES[rook_from] | chess.BB_SQUARES[rook_to])
+            bitboards[is_king, _ROOKS] ^= rook_bbs
+            bitboards[is_king & ~self.turns, _BLACK] ^= rook_bbs
+
+        # rights are lost when the king or the rook moves, or the rook is captured
+        for bit, (_, rook_square, king_square) in enumerate(_CASTLING_FLAGS):
+            if move.from_square in [rook_square, king_square] or move.to_square == rook_square:
+                castling &= ~np.uint8(1 << bit)
+        castling = _castling_flags(bitboards, castling, is_flags=True)
+
+        if abs(diff) == 16:
+            ep_squares[is_pawn] = (move.from_square + move.to_square) // 2
+
+        board_set = BoardSet._from_arrays(bitboards, castling, ep_squares, turns, self.weights.copy())
+        board_set._deduplicate()
+        return board_set
+
+    def expand(self, capture_square: Optional[Square]) -> 'BoardSet':
+        """
+        Replaces each board with every board that could follow it after the player to move takes a move, given only
+        where that move captured a piece, see :func:`reconchess.utilities.successor_boards`.
+
+        :param capture_square: The square a piece was captured on, or `None` if nothing was captured.
+        :return: A new set with the successor boards.
+        """
+        successors = successor_boards(iter(self), capture_square, self.weights)
+        return BoardSet((board for board, _ in successors.values()),
+                        (weight for _, weight in successors.values()))
+
+
+def _occupied(bitboards: np.ndarray) -> np.ndarray:
+    return np.bitwise_or.reduce(bitboards[..., :_BLACK], axis=-1)
+
+
+def _color_pieces(bitboards: np.ndarray, color: Color) -> np.ndarray:
+    if color == chess.BLACK:
+        return bitboards[..., _BLACK]
+    return _occupied(bitboards) & ~bitboards[..., _BLACK]
+
+
+def _castling_flags(bitboards: np.ndarray, castling_rights: np.ndarray, is_flags: bool = False) -> np.ndarray:
+    # the castling flags that are still valid, i.e. the rook and king are on their starting squares. castling_rights
+    # are either python-chess castling rights bitboards, or flags to clean if is_flags is set
+    flags = np.zeros(len(bitboards), dtype=np.uint8)
+    for bit, (color, rook_square, king_square) in enumerate(_CASTLING_FLAGS):
+        if is_flags:
+            has_right = castling_rights & np.uint8(1 << bit) != 0
+        else:
+            has_right = castling_rights & np.uint64(chess.BB_SQUARES[rook_square]) != 0
+        pieces = _color_pieces(bitboards, color)
+        has_rook = bitboards[:, _ROOKS] & pieces & np.uint64(chess.BB_SQUARES[rook_square]) != 0
+        has_king = bitboards[:, _KINGS] & pieces & np.uint64(chess.BB_SQUARES[king_square]) != 0
+        flags |= (has_right & has_rook & has_king).astype(np.uint8) << np.uint8(bit)
+    return flags
+
+
+def _zobrist_keys(bitboards: np.ndarray, castling: np.ndarray, ep_squares: np.ndarray,
+                  turns: np.ndarray) -> np.ndarray:
+    # the same as chess.polyglot.zobrist_hash for each board
+    keys = np.zeros(len(bitboards), dtype=np.uint64)
+    for color_index, color in enumerate([chess.BLACK, chess.WHITE]):
+        color_pieces = _color_pieces(bitboards, color)
+        for piece_column in range(6):
+            pieces = bitboards[:, piece_column] & color_pieces
+            table = _ZOBRIST_PIECES[piece_column, color_index]
+            for i in range(8):
+                keys ^= table[i, (pieces >> np.uint64(8 * i)) & np.uint64(0xff)]
+
+    keys ^= _ZOBRIST_CASTLING[castling]
+
+    # the en passant square is only hashed if a pawn can capture on it
+    has_ep = ep_squares >= 0
+    ep_indices = np.where(has_ep, ep_squares, 0)
+    own_pawns = bitboards[:, _PAWNS] & np.where(turns, _color_pieces(bitboards, chess.WHITE), bitboards[:, _BLACK])
+    can_capture = has_ep & (own_pawns & _EP_CAPTURERS[turns.astype(int), ep_indices] != 0)
+    keys ^= np.where(can_capture, _ZOBRIST_EP_FILES[ep_indices % 8], np.uint64(0))
+
+    keys ^= np.where(turns, _ZOBRIST_WHITE_TURN, np.uint64(0))
+    return keys
+
+
+def _make_board(bitboards: np.ndarray, castling: int, ep_square: int, turn: bool) -> chess.Board:
+    board = chess.Board(None)
+    board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings = \
+        (int(bitboard) for bitboard in bitboards[:6])
+    board.occupied = int(_occupied(bitboards))
+    board.occupied_co[chess.BLACK] = int(bitboards[_BLACK])
+    board.occupied_co[chess.WHITE] = board.occupied & ~board.occupied_co[chess.BLACK]
+    board.castling_rights = 0
+    for bit, (_, rook_square, _) in enumerate(_CASTLING_FLAGS):
+        if castling >> bit & 1:
+            board.castling_rights |= chess.BB_SQUARES[rook_square]
+    board.ep_square = ep_square if ep_square >= 0 else None
+    board.turn = turn
+    return board
+
+
+class BoardSetPool(object):
+    """
+    Filters and expands large :class:`BoardSet` on a pool of worker processes. Each set is split into one shard per
+    process, and the arrays of the set are handed to the workers through shared memory (pickled on python versions
+    before 3.8), so no :class:`chess.Board` is ever sent between processes. The workers send back the surviving boards
+    as arrays, and the results are merged into one set, with duplicates merged.
+
+    Every call can be given a time limit, e.g. from :func:`reconchess.engine.search_limit`, so that the player never
+    runs out of time. Boards are expanded in order of decreasing weight, and when the time is up the boards that
+    weren't expanded yet are dropped. Filtering is all or nothing per shard: the boards of a shard that didn't finish
+    in time are kept unfiltered.
+
+    Sets with fewer than `min_boards_per_process` boards per process are handled in the calling process, since
+    starting the workers costs more than it saves for them. Filtering sense results is vectorized, so it is usually
+    only worth splitting across processes for sets of hundreds of thousands of boards. Expanding is much slower per
+    board and benefits from the pool sooner.
+
+    Create the pool once and reuse it for every turn:
+
+        >>> pool = BoardSetPool(processes=4)
+        >>> limit = search_limit(seconds_left, turn_number)
+        >>> boards = pool.expand(boards, capture_square, time_limit=limit.time)
+        >>> pool.close()
+
+    :param processes: The number of worker processes. Defaults to the number of cores.
+    :param min_boards_per_process: The smallest number of boards to give each worker process.
+    """
+
+    def __init__(self, processes: int = None, min_boards_per_process: int = 2000):
+        self.processes = processes or os.cpu_count() or 1
+        self.min_boards_per_process = min_boards_per_process
+        self._pool = multiprocessing.Pool(processes=self.processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        self._pool.terminate()
+        self._pool.join()
+
+    def _num_shards(self, board_set: BoardSet) -> int:
+        return max(1, min(self.processes, len(board_set) // max(self.min_boards_per_process, 1)))
+
+    def filter_sense_result(self, board_set: BoardSet, sense_result: List[Tuple[Square, Optional[chess.Piece]]],
+                            time_limit: float = None) -> BoardSet:
+        """
+        Parallel version of :meth:`BoardSet.filter_sense_result`.
+
+        :param board_set: The set to filter.
+        :param sense_result: The sense result passed to :meth:`Player.handle_sense_result`.
+        :param time_limit: Optional number of seconds the workers have to filter their shards.
+        :return: A new set with the boards that are consistent with the sense result.
+        """
+        num_shards = self._num_shards(board_set)
+        if num_shards == 1:
+            return board_set.filter_sense_result(sense_result)
+
+        deadline = time.time() + time_limit if time_limit is not None else None
+        survivors = np.ones(len(board_set), dtype=bool)
+        for shard, mask in self._map(_filter_shard, board_set, num_shards, sense_result, deadline):
+            if mask is not None:
+                survivors[shard::num_shards] = np.unpackbits(mask, count=len(survivors[shard::num_shards])) != 0
+        return board_set.select(survivors)
+
+    def expand(self, board_set: BoardSet, capture_square: Optional[Square], time_limit: float = None) -> BoardSet:
+        """
+        Parallel version of :meth:`BoardSet.expand`. The boards are shared out so that each process gets an equal
+        part of the most likely boards, which it expands first. When the time runs out, the boards that weren't
+        expanded yet are dropped, as are all the boards of a process that doesn't send its results back in time.
+
+        :param board_set: The set to expand.
+        :param capture_square: The square a piece was captured on, or `None` if nothing was captured.
+        :param time_limit: Optional number of seconds the workers have to expand their shards.
+        :return: A new set with the successor boards.
+        """
+        num_shards = self._num_shards(board_set)
+        deadline = time.time() + time_limit if time_limit is not None else None
+        board_set = board_set.most_likely(len(board_set))
+        if num_shards == 1:
+            return _expand_until(board_set, capture_square, deadline)
+
+        results = self._map(_expand_shard, board_set, num_shards, capture_square, deadline)
+        return BoardSet.concatenate(BoardSet._from_arrays(*arrays) for _, arrays in results if arrays is not None)
+
+    def _map(self, function, board_set: BoardSet, num_shards: int, argument, deadline: Optional[float]):
+        # runs function on every shard and returns the (shard, result) of the shards that finished in time
+        memory = None
+        if shared_memory is not None:
+            memory = shared_memory.SharedMemory(create=True, size=_shared_layout(len(board_set))[1])
+            source = memory.name
+            shared_arrays = _shared_arrays(memory.buf, len(board_set))
+            for shared_array, array in zip(shared_arrays, [getattr(board_set, name) for name in _ARRAY_NAMES]):
+                shared_array[:] = array
+            del shared_arrays
+        else:
+            source = [getattr(board_set, name) for name in _ARRAY_NAMES]
+
+        try:
+            pending = [self._pool.apply_async(function, ((source, len(board_set), shard, num_shards, argument,
+                                                          deadline),)) for shard in range(num_shards)]
+            results = []
+            for result in pending:
+                try:
+                    if deadline is None:
+                        results.append(result.get())
+                    else:
+                        results.append(result.get(max(deadline + _DEADLINE_GRACE_SECONDS - time.time(), 0)))
+                except multiprocessing.TimeoutError:
+                    pass
+            return results
+        finally:
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+
+
+def _shared_layout(num_boards: int) -> Tuple[List[Tuple[tuple, type, int]], int]:
+    # the shape, dtype and offset of each array of a BoardSet laid out one after another in shared memory, each
+    # aligned to 8 bytes, and the number of bytes they take
+    layout = []
+    offset = 0
+    for name, dtype in zip(_ARRAY_NAMES, [np.uint64, np.uint8, np.int8, bool, float, np.uint64]):
+        shape = (num_boards, _BLACK + 1) if name == 'bitboards' else (num_boards,)
+        layout.append((shape, dtype, offset))
+        offset += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8
+    return layout, max(offset, 1)
+
+
+def _shared_arrays(buffer, num_boards: int) -> List[np.ndarray]:
+    return [np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            for shape, dtype, offset in _shared_layout(num_boards)[0]]
+
+
+def _attach_shared_memory(name: str):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    # before python 3.13 attaching registers the memory with the resource tracker a second time, which races with the
+    # parent unregistering it when it unlinks the memory
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _load_shard(source, num_boards: int, shard: int, num_shards: int) -> BoardSet:
+    # every num_shards-th board starting at shard
+    if shared_memory is None:
+        return BoardSet._from_arrays(*[array[shard::num_shards].copy() for array in source])
+
+    memory = _attach_shared_memory(source)
+    try:
+        arrays = _shared_arrays(memory.buf, num_boards)
+        board_set = BoardSet._from_arrays(*[array[shard::num_shards].copy() for array in arrays])
+        del arrays
+    finally:
+        memory.close()
+    return board_set
+
+
+def _filter_shard(job) -> Tuple[int, Optional[np.ndarray]]:
+    source, num_boards, shard, num_shards, sense_result, deadline = job
+    board_set = _load_shard(source, num_boards, shard, num_shards)
+    if deadline is not None and time.time() > deadline:
+        return shard, None
+    return shard, np.packbits(board_set._sense_result_mask(sense_result))
+
+
+def _expand_shard(job) -> Tuple[int, Optional[List[np.ndarray]]]:
+    source, num_boards, shard, num_shards, capture_square, deadline = job
+    board_set = _expand_until(_load_shard(source, num_boards, shard, num_shards), capture_square, deadline)
+    return shard, [getattr(board_set, name) for name in _ARRAY_NAMES]
+
+
+def _expand_until(board_set: BoardSet, capture_square: Optional[Square], deadline: Optional[float]) -> BoardSet:
+    # expands the most likely boards first, a chunk at a time, while the next chunk is expected to finish before the
+    # deadline. the first chunk is always expanded
+    board_set = board_set.most_likely(len(board_set))
+    expanded = []
+    chunk_seconds = 0
+    for start in range(0, len(board_set), _EXPAND_CHUNK_SIZE):
+        chunk_start = time.time()
+        if expanded and deadline is not None and chunk_start + chunk_seconds > deadline:
+            break
+        expanded.append(board_set.select(slice(start, start + _EXPAND_CHUNK_SIZE)).expand(capture_square))
+        chunk_seconds = time.time() - chunk_start
+    return BoardSet.concatenate(expanded)
@@ -1,9 +1,15 @@
 import chess.engine
+import chess.polyglot
+import math
 import random
 from reconchess import *
-import os
+from reconchess.engine import EnginePool, default_engine_pool, search_limit, stockfish_path, STOCKFISH_ENV_VAR
+from reconchess.board_set import BoardSet
+from reconchess.sense_planning import best_information_sense
+from reconchess.utilities import consistent_taken_moves, successor_boards
 
-STOCKFISH_ENV_VAR = 'STOCKFISH_EXECUTABLE'
+# how many more boards than max_hypotheses to keep between the opponent's move and the sense result
+EXPANSION_FACTOR = 50
 
 
 class TroutBot(Player):
@@ -11,30 +17,48 @@ class TroutBot(Player):
     TroutBot uses the Stockfish chess engine to choose moves. In order to run TroutBot you'll need to download
     Stockfish from https://stockfishchess.org/download/ and create an environment variable called STOCKFISH_EXECUTABLE
     that is the path to the downloaded Stockfish executable.
+
+    By default TroutBot keeps a single guess of the board. Passing `max_hypotheses` turns on tracking of up to that
+    many plausible boards instead, each with a likelihood. After each opponent move every board is expanded with all
+    the moves the opponent could have taken that match the capture result, and boards that don't match a sense or
+    move result are dropped. When there are more than `max_hypotheses` boards left, the least likely are evicted. The
+    sense with the largest :func:`reconchess.sense_planning.expected_information_gains` over the boards is chosen,
+    unless a capture makes a square more urgent. To choose a move, the most likely boards are searched in one batch
+    with :meth:`EnginePool.play_all` and each board votes for its best move, weighted by its likelihood.
+
+    The search time for a turn comes from :func:`search_limit`. As many boards are searched as fit in that time with
+    each search taking at least `min_search_time` seconds, so raising `max_hypotheses` trades speed for quality only
+    up to the turn's budget.
+
+    :param engine_pool: The :class:`EnginePool` to get engines from. Defaults to the pool shared by the whole process.
+    :param max_hypotheses: The maximum number of boards to track, or `None` to track a single board.
+    :param min_search_time: The shortest search on each board when tracking multiple boards.
     """
 
-    def __init__(self):
+    def __init__(self, engine_pool: EnginePool = None, max_hypotheses: int = None, min_search_time: float = 0.05):
         self.board = None
         self.color = None
         self.my_piece_captured_square = None
 
-        # make sure stockfish environment variable exists
-        if STOCKFISH_ENV_VAR not in os.environ:
-            raise KeyError(
-                'TroutBot requires an environment variable called "{}" pointing to the Stockfish executable'.format(
-                    STOCKFISH_ENV_VAR))
-
-        # make sure there is actually a file
-        stockfish_path = os.environ[STOCKFISH_ENV_VAR]
-        if not os.path.exists(stockfish_path):
-            raise ValueError('No stockfish executable found at "{}"'.format(stockfish_path))
+        self.max_hypotheses = max_hypotheses
+        self.min_search_time = min_search_time
+        self.hypotheses = []
 
-        # initialize the stockfish engine
-        self.engine = chess.engine.SimpleEngine.popen_uci(stockfish_path)
+        # the stockfish engines are shared with other bots and games through an engine pool
+        if engine_pool is None:
+            stockfish_path()
+            engine_pool = default_engine_pool()
+        self.engine_pool = engine_pool
 
     def handle_game_start(self, color: Color, board: chess.Board):
+        self.game = object()
         self.board = board
         self.color = color
+        self.turn_number = 0
+
+        # list of (board, likelihood) pairs, most likely first
+        if self.max_hypotheses is not None:
+            self.hypotheses = [(board.copy(stack=False), 1.0)]
 
     def handle_opponent_move_result(self, captured_my_piece: bool, capture_square: Optional[Square]):
         # if the opponent captured our piece, remove it from our board.
@@ -42,6 +66,9 @@ class TroutBot(Player):
         if captured_my_piece:
             self.board.remove_piece_at(capture_square)
 
+        if self.max_hypotheses is not None:
+            self._expand_hypotheses(capture_square)
+
     def choose_sense(self, sense_actions: List[Square], move_actions: List[chess.Move], seconds_left: float) -> Square:
         # if our piece was just captured, sense where it was captured
         if self.my_piece_captured_square:
@@ -52,6 +79,11 @@ class TroutBot(Player):
         if future_move is not None and self.board.piece_at(future_move.to_square) is not None:
             return future_move.to_square
 
+        # when tracking several boards, sense where the result is expected to rule out the most of them
+        if len(self.hypotheses) > 1:
+            boards, likelihoods = zip(*self.hypotheses)
+            return best_information_sense(BoardSet(boards, likelihoods), sense_actions)
+
         # otherwise, just randomly choose a sense action, but don't sense on a square where our pieces are located
         for square, piece in self.board.piece_map().items():
             if piece.color == self.color:
@@ -59,11 +91,19 @@ class TroutBot(Player):
         return random.choice(sense_actions)
 
     def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+        if self.max_hypotheses is not None:
+            self._filter_hypotheses(lambda board: all(board.piece_at(square) == piece for square, piece in sense_result),
+                                    fallback_updates=sense_result)
+            return
+
         # add the pieces in the sense result to our board
         for square, piece in sense_result:
             self.board.set_piece_at(square, piece)
 
     def choose_move(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
+        if self.max_hypotheses is not None:
+            return self._choose_move_from_hypotheses(move_actions, seconds_left)
+
         # if we might be able to take the king, try to
         enemy_king_square = self.board.king(not self.color)
         if enemy_king_square:
@@ -77,7 +117,9 @@ class TroutBot(Player):
         try:
             self.board.turn = self.color
             self.board.clear_stack()
-            result = self.engine.play(self.board, chess.engine.Limit(time=0.5))
+            # choose_sense also searches for a move, so there are two searches per turn
+            limit = search_limit(seconds_left, self.turn_number, searches_per_turn=2)
+            result = self.engine_pool.play(self.board, limit, game=self.game)
             return result.move
         except (chess.engine.EngineError, chess.engine.EngineTerminatedError) as e:
             print('Engine bad state at "{}"'.format(self.board.fen()))
@@ -87,10 +129,126 @@ class TroutBot(Player):
 
     def handle_move_result(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
                            captured_opponent_piece: bool, capture_square: Optional[Square]):
+        self.turn_number += 1
+
+        if self.max_hypotheses is not None:
+            self._apply_own_move(taken_move, capture_square)
+            return
+
         # if a move was executed, apply it to our board
         if taken_move is not None:
             self.board.push(taken_move)
 
     def handle_game_end(self, winner_color: Optional[Color], win_reason: Optional[WinReason],
                         game_history: GameHistory):
-        self.engine.quit()
+        pass
+
+    def _set_hypotheses(self, weighted_boards, max_hypotheses: int):
+        # keep the most likely boards and renormalize their likelihoods
+        hypotheses = sorted(weighted_boards.values(), key=lambda hypothesis: hypothesis[1], reverse=True)
+        hypotheses = hypotheses[:max_hypotheses]
+        total = sum(likelihood for _, likelihood in hypotheses)
+        self.hypotheses = [(board, likelihood / total) for board, likelihood in hypotheses]
+        self.board = self.hypotheses[0][0].copy(stack=False)
+
+    @staticmethod
+    def _add_hypothesis(weighted_boards, board: chess.Board, likelihood: float):
+        # the same board can be reached in different ways, so merge their likelihoods
+        key = chess.polyglot.zobrist_hash(board)
+        if key in weighted_boards:
+            likelihood += weighted_boards[key][1]
+        weighted_boards[key] = (board, likelihood)
+
+    def _filter_hypotheses(self, is_consistent, fallback_updates: List[Tuple[Square, Optional[chess.Piece]]]):
+        weighted_boards = {}
+        for board, likelihood in self.hypotheses:
+            if is_consistent(board):
+                self._add_hypothesis(weighted_boards, board, likelihood)
+
+        if not weighted_boards:
+            # the true board was evicted, so start over from the most likely board with the new information applied
+            board = self.board.copy(stack=False)
+            for square, piece in fallback_updates:
+                board.set_piece_at(square, piece)
+            self._add_hypothesis(weighted_boards, board, 1.0)
+
+        self._set_hypotheses(weighted_boards, self.max_hypotheses)
+
+    def _expand_hypotheses(self, capture_square: Optional[Square]):
+        # the opponent hasn't moved yet at the start of the game
+        weighted_boards = {}
+        for board, likelihood in self.hypotheses:
+            if board.turn == self.color:
+                self._add_hypothesis(weighted_boards, board, likelihood)
+
+        # every move the opponent could have taken is considered equally likely
+        moved_hypotheses = [(board, likelihood) for board, likelihood in self.hypotheses if board.turn != self.color]
+        successors = successor_boards((board for board, _ in moved_hypotheses), capture_square,
+                                      (likelihood for _, likelihood in moved_hypotheses))
+        for board, likelihood in successors.values():
+            self._add_hypothesis(weighted_boards, board, likelihood)
+
+        if not weighted_boards:
+            # the true board was evicted, so start over from the most likely board
+            board = self.board.copy(stack=False)
+            board.turn = self.color
+            if capture_square is not None:
+                board.remove_piece_at(capture_square)
+            self._add_hypothesis(weighted_boards, board, 1.0)
+
+        # the sense result prunes most of the expanded boards, so only cap them loosely here
+        self._set_hypotheses(weighted_boards, self.max_hypotheses * EXPANSION_FACTOR)
+
+    def _apply_own_move(self, taken_move: Optional[chess.Move], capture_square: Optional[Square]):
+        def is_consistent(board):
+            return taken_move in consistent_taken_moves(board, capture_square)
+
+        self._filter_hypotheses(is_consistent, [(capture_square, None)] if capture_square is not None else [])
+
+        weighted_boards = {}
+        for board, likelihood in self.hypotheses:
+            board = board.copy(stack=False)
+            board.turn = self.color
+            board.push(taken_move if taken_move is not None else chess.Move.null())
+            self._add_hypothesis(weighted_boards, board, likelihood)
+        self._set_hypotheses(weighted_boards, self.max_hypotheses)
+
+    def _choose_move_from_hypotheses(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
+        votes = {}
+
+        # boards where we can take the king vote for that, the rest are searched by the engine
+        boards_to_search = []
+        for board, likelihood in self.hypotheses:
+            enemy_king_square = board.king(not self.color)
+            enemy_king_attackers = None
+            if enemy_king_square is not None:
+                enemy_king_attackers = board.attackers(self.color, enemy_king_square)
+            if enemy_king_attackers:
+                move = chess.Move(enemy_king_attackers.pop(), enemy_king_square)
+                votes[move] = votes.get(move, 0) + likelihood
+            else:
+                boards_to_search.append((board, likelihood))
+
+        # search as many of the most likely boards as fit in this turn's budget
+        limit = search_limit(seconds_left, self.turn_number, searches_per_turn=2)
+        max_boards = max(1, int(limit.time / self.min_search_time)) * self.engine_pool.max_engines
+        boards_to_search = boards_to_search[:max_boards]
+        if boards_to_search:
+            num_batches = math.ceil(len(boards_to_search) / self.engine_pool.max_engines)
+            board_limit = chess.engine.Limit(time=max(limit.time / num_batches, self.min_search_time))
+
+            boards = []
+            for board, _ in boards_to_search:
+                board = board.copy(stack=False)
+                board.turn = self.color
+                boards.append(board)
+
+            results = self.engine_pool.play_all(boards, board_limit, game=self.game)
+            for (_, likelihood), result in zip(boards_to_search, results):
+                if result is not None and result.move is not None:
+                    votes[result.move] = votes.get(result.move, 0) + likelihood
+
+        votes = {move: vote for move, vote in votes.items() if move in move_actions}
+        if not votes:
+            return None
+        return max(votes, key=votes.get)
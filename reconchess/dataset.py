@@ -0,0 +1,187 @@
+import multiprocessing
+import os
+import chess
+import numpy as np
+from typing import Dict
+from .types import *
+from .history import GameHistory, _BINARY_HEADER, _BINARY_MAGIC, _BINARY_READABLE_VERSIONS, _NO_MOVE, _NO_SQUARE
+
+# numpy equivalents of the record structs used by :meth:`GameHistory.to_bytes`
+_SENSE_DTYPE = np.dtype([('square', 'u1'), ('pieces', 'V5')])
+_MOVE_DTYPE = np.dtype([('requested', '<u2'), ('taken', '<u2'), ('capture', 'u1')])
+_POSITION_DTYPE = np.dtype([('pieces', '<u8', (6,)), ('white', '<u8'), ('castling', 'u1'), ('ep_square', 'u1'),
+                            ('turn', 'u1'), ('halfmove_clock', '<u2'), ('fullmove_number', '<u2')])
+
+NUM_PLANES = 12
+"""Number of planes in each board. Planes 0-5 are white pawns through kings, and planes 6-11 are black pawns through
+kings."""
+
+DATASET_KEYS = ['boards', 'senses', 'requested_moves', 'taken_moves', 'capture_squares', 'colors', 'turn_numbers',
+                'game_ids']
+
+
+def load_history(path: str) -> GameHistory:
+    """
+    Loads a :class:`GameHistory` saved with either :meth:`GameHistory.save` or :meth:`GameHistory.save_binary`.
+
+    Binary histories are memory mapped, so call :meth:`GameHistory.close` on the result when done with it.
+
+    :param path: The file to load.
+    :return: The loaded :class:`GameHistory`.
+    """
+    with open(path, 'rb') as fp:
+        is_binary = fp.read(len(_BINARY_MAGIC)) == _BINARY_MAGIC
+    return GameHistory.from_binary_file(path) if is_binary else GameHistory.from_file(path)
+
+
+def find_histories(directory: str, extensions=('.json', '.bin')) -> List[str]:
+    """
+    :param directory: The directory to search.
+    :param extensions: The file extensions of saved histories.
+    :return: Sorted list of paths to the saved histories in `directory`.
+    """
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if os.path.splitext(name)[1] in extensions)
+
+
+def _move_indices(encoded_moves: np.ndarray) -> np.ndarray:
+    # from_square * 64 + to_square, or -1 for a pass. promotions are not included
+    indices = (encoded_moves & 0x3F).astype(np.int16) * 64 + ((encoded_moves >> 6) & 0x3F).astype(np.int16)
+    indices[encoded_moves == _NO_MOVE] = -1
+    return indices
+
+
+def _board_planes(positions: np.ndarray) -> np.ndarray:
+    white = positions['white'][:, np.newaxis]
+    bitboards = np.concatenate([positions['pieces'] & white, positions['pieces'] & ~white], axis=1)
+    bits = np.unpackbits(bitboards.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+    return bits.reshape(len(positions), NUM_PLANES, 8, 8)
+
+
+def history_arrays(data, color: Color = None) -> Dict[str, np.ndarray]:
+    """
+    Extracts the turns of a single game as arrays. Only turns that have a move are included.
+
+    :param data: A :class:`GameHistory`, or the bytes of one encoded with :meth:`GameHistory.to_bytes`.
+    :param color: Optional color to only include the turns of one player.
+    :return: A dictionary with the same keys and layout as :func:`build_dataset`. `game_ids` are all 0.
+    """
+    if isinstance(data, GameHistory):
+        data = data.to_bytes()
+
+    magic, version, *counts = _BINARY_HEADER.unpack_from(data, 0)
+    if magic != _BINARY_MAGIC or version not in _BINARY_READABLE_VERSIONS:
+        raise ValueError('data does not contain a GameHistory')
+
+    offset = _BINARY_HEADER.size
+
+    def read(dtype, count):
+        nonlocal offset
+        records = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += dtype.itemsize * count
+        return records
+
+    senses = [read(_SENSE_DTYPE, count) for count in counts[0:2]]
+    moves = [read(_MOVE_DTYPE, count) for count in counts[2:4]]
+    positions = [read(_POSITION_DTYPE, count) for count in counts[4:6]]
+
+    parts = []
+    for i, turn_color in enumerate(chess.COLORS):
+        if color is not None and turn_color != color:
+            continue
+        num_turns = len(moves[i])
+        sense_squares = senses[i]['square'][:num_turns]
+        sensed = sense_squares != _NO_SQUARE
+        one_hot_senses = np.zeros((num_turns, 64), dtype=np.uint8)
+        one_hot_senses[np.flatnonzero(sensed), sense_squares[sensed]] = 1
+
+        capture_squares = moves[i]['capture'].astype(np.int8)
+        capture_squares[moves[i]['capture'] == _NO_SQUARE] = -1
+
+        parts.append({
+            'boards': _board_planes(positions[i][:num_turns]),
+            'senses': one_hot_senses,
+            'requested_moves': _move_indices(moves[i]['requested']),
+            'taken_moves': _move_indices(moves[i]['taken']),
+            'capture_squares': capture_squares,
+            'colors': np.full(num_turns, turn_color, dtype=bool),
+            'turn_numbers': np.arange(num_turns, dtype=np.int32),
+            'game_ids': np.zeros(num_turns, dtype=np.int32),
+        })
+
+    if not parts:
+        return _empty_arrays()
+    arrays = {key: np.concatenate([part[key] for part in parts]) for key in DATASET_KEYS}
+
+    # put the turns back into the order they were played in
+    order = np.argsort(arrays['turn_numbers'] * 2 + ~arrays['colors'], kind='stable')
+    return {key: value[order] for key, value in arrays.items()}
+
+
+def _empty_arrays() -> Dict[str, np.ndarray]:
+    return {
+        'boards': np.zeros((0, NUM_PLANES, 8, 8), dtype=np.uint8),
+        'senses': np.zeros((0, 64), dtype=np.uint8),
+        'requested_moves': np.zeros(0, dtype=np.int16),
+        'taken_moves': np.zeros(0, dtype=np.int16),
+        'capture_squares': np.zeros(0, dtype=np.int8),
+        'colors': np.zeros(0, dtype=bool),
+        'turn_numbers': np.zeros(0, dtype=np.int32),
+        'game_ids': np.zeros(0, dtype=np.int32),
+    }
+
+
+def _file_arrays(job):
+    path, color = job
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    if not data.startswith(_BINARY_MAGIC):
+        data = GameHistory.from_file(path).to_bytes()
+    return history_arrays(data, color=color)
+
+
+def build_dataset(paths, color: Color = None, processes: int = None) -> Dict[str, np.ndarray]:
+    """
+    Builds training arrays from many saved games. Files are processed in parallel with a pool of worker processes,
+    and each file is converted to arrays without creating :class:`Turn` or :class:`chess.Board` objects.
+
+    Each row of the arrays is one turn that had a move, in the order they were played, with games in the order of
+    `paths`:
+
+    * `boards`: `uint8` array of shape (turns, 12, 8, 8), the truth board before the move. See :data:`NUM_PLANES`.
+      Indexed by [turn, plane, rank, file].
+    * `senses`: `uint8` array of shape (turns, 64), one-hot encoding of the sensed square.
+    * `requested_moves`: `int16` array of shape (turns,), `from_square * 64 + to_square` of the requested move, or
+      -1 if the player passed.
+    * `taken_moves`: `int16` array of shape (turns,), the taken move encoded the same way as `requested_moves`.
+    * `capture_squares`: `int8` array of shape (turns,), the square of the opponent's captured piece, or -1.
+    * `colors`: `bool` array of shape (turns,), the color of the player whose turn it was.
+    * `turn_numbers`: `int32` array of shape (turns,), the player's turn number.
+    * `game_ids`: `int32` array of shape (turns,), the index into `paths` of the game the turn came from.
+
+    Examples:
+        >>> dataset = build_dataset(find_histories('replays'), color=WHITE)
+        >>> dataset['boards'].shape
+        (25302, 12, 8, 8)
+
+    :param paths: Paths to the saved games, or a directory containing them.
+    :param color: Optional color to only include the turns of one player.
+    :param processes: Number of worker processes. Defaults to the number of cores. Use 1 to not use a pool.
+    :return: Dictionary of arrays, see above.
+    """
+    if isinstance(paths, str):
+        paths = find_histories(paths)
+
+    jobs = [(path, color) for path in paths]
+    if processes == 1 or len(jobs) <= 1:
+        results = list(map(_file_arrays, jobs))
+    else:
+        with multiprocessing.Pool(processes=processes) as pool:
+            results = pool.map(_file_arrays, jobs, chunksize=max(1, len(jobs) // (4 * (processes or os.cpu_count()))))
+
+    for game_id, arrays in enumerate(results):
+        arrays['game_ids'][:] = game_id
+
+    if not results:
+        return _empty_arrays()
+    return {key: np.concatenate([arrays[key] for arrays in results]) for key in DATASET_KEYS}
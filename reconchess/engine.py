@@ -0,0 +1,553 @@
+import asyncio
+import atexit
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import os
+import struct
+import tempfile
+import threading
+import chess.engine
+import chess.polyglot
+from .types import *
+from typing import Callable
+
+STOCKFISH_ENV_VAR = 'STOCKFISH_EXECUTABLE'
+
+EVALUATION_CACHE_ENV_VAR = 'RECONCHESS_EVALUATION_CACHE'
+"""Environment variable with the path the cache of :func:`default_evaluation_cache` is loaded from and saved to."""
+
+# magic and number of entries, followed by the entries
+_CACHE_HEADER = struct.Struct('<4sI')
+_CACHE_MAGIC = b'RCEC'
+
+# zobrist hash, turn, uci of the move (empty for no move), score kind, score value, depth (-1 if unknown)
+_CACHE_ENTRY = struct.Struct('<QB5sBih')
+_SCORE_NONE, _SCORE_CP, _SCORE_MATE, _SCORE_MATE_GIVEN = range(4)
+
+
+def stockfish_path() -> str:
+    """
+    :return: The path to the Stockfish executable in the environment variable named by :data:`STOCKFISH_ENV_VAR`.
+    :raises KeyError: If the environment variable doesn't exist.
+    :raises ValueError: If there is no file at the path.
+    """
+    if STOCKFISH_ENV_VAR not in os.environ:
+        raise KeyError(
+            'An environment variable called "{}" pointing to the Stockfish executable is required'.format(
+                STOCKFISH_ENV_VAR))
+
+    path = os.environ[STOCKFISH_ENV_VAR]
+    if not os.path.exists(path):
+        raise ValueError('No stockfish executable found at "{}"'.format(path))
+    return path
+
+
+def popen_stockfish() -> chess.engine.SimpleEngine:
+    """
+    :return: A new Stockfish engine process, using the executable from :func:`stockfish_path`.
+    """
+    return chess.engine.SimpleEngine.popen_uci(stockfish_path())
+
+
+def search_limit(seconds_left: float, turn_number: int, searches_per_turn: int = 1, expected_turns: int = 60,
+                 min_turns_left: int = 20, reserve_seconds: float = 10, min_time: float = 0.01,
+                 max_time: float = 10) -> chess.engine.Limit:
+    """
+    Splits the time left on a player's clock between the turns it still has to play, to get the time limit for an
+    engine search. The game is expected to last `expected_turns` turns, but the remaining time is always divided
+    between at least `min_turns_left` turns, so the budget shrinks geometrically in long games instead of running
+    out. `reserve_seconds` are held back for everything else the player does during a turn.
+
+    Examples:
+        >>> search_limit(900, 0)
+        Limit(time=10)
+        >>> search_limit(900, 0, searches_per_turn=2)
+        Limit(time=7.416666666666667)
+        >>> search_limit(30, 80)
+        Limit(time=1.0)
+
+    :param seconds_left: The seconds left on the player's clock, as passed to :meth:`Player.choose_move`.
+    :param turn_number: The number of turns the player has already played.
+    :param searches_per_turn: The number of engine searches the player makes each turn.
+    :param expected_turns: The number of turns a player is expected to play in a game.
+    :param min_turns_left: The smallest number of turns to divide the remaining time between.
+    :param reserve_seconds: Seconds of the clock to never spend on searches.
+    :param min_time: The smallest time limit to return, used when the player is almost out of time.
+    :param max_time: The largest time limit to return.
+    :return: :class:`chess.engine.Limit` with the time for one search.
+    """
+    turns_left = max(expected_turns - turn_number, min_turns_left)
+    budget = (seconds_left - reserve_seconds) / (turns_left * searches_per_turn)
+    return chess.engine.Limit(time=min(max(budget, min_time), max_time))
+
+
+class EvaluationCache(object):
+    """
+    A bounded cache of engine searches, so that positions that come up again, in another hypothesis, turn or game,
+    don't have to be searched again. Each entry holds the best move, the score and the depth of a search, keyed by the
+    :func:`chess.polyglot.zobrist_hash` of the position and the side to move. When the cache is full, the least
+    recently used entry is evicted.
+
+    Give the cache to an :class:`EnginePool` to have :meth:`EnginePool.play` check it before searching. Every
+    :meth:`get` counts as a hit or a miss, see :attr:`hit_rate`.
+
+    The cache can be saved to a file with :meth:`save` and loaded again, e.g. to keep it between tournament runs. The
+    cache is thread safe, but processes don't share entries except through the file.
+
+    Examples:
+        >>> cache = EvaluationCache(max_entries=10000, path='evaluations.rcec')
+        >>> pool = EnginePool(max_engines=4, cache=cache)
+        >>> result = pool.play(chess.Board(), chess.engine.Limit(time=0.1))
+        >>> result = pool.play(chess.Board(), chess.engine.Limit(time=0.1))
+        >>> cache.hits, cache.misses
+        (1, 1)
+        >>> cache.save()
+
+    :param max_entries: The maximum number of positions to keep.
+    :param path: Optional file to load the cache from, if it exists, and to :meth:`save` it to.
+    """
+
+    def __init__(self, max_entries: int = 100000, path: str = None):
+        if max_entries < 1:
+            raise ValueError('EvaluationCache needs at least one entry, got max_entries={}'.format(max_entries))
+
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        # (zobrist hash, turn) -> (move, score relative to the side to move, depth), least recently used first
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of calls to :meth:`get` that found a result, or 0 before the first call."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @staticmethod
+    def _key(board: chess.Board) -> Tuple[int, bool]:
+        return chess.polyglot.zobrist_hash(board), board.turn
+
+    def get(self, board: chess.Board, min_depth: int = None) -> Optional[chess.engine.PlayResult]:
+        """
+        Looks up the search of a position.
+
+        :param board: The position.
+        :param min_depth: Optional depth the search must have reached. Searches of unknown depth don't count.
+        :return: The cached :class:`chess.engine.PlayResult`, with the `score` and `depth` in its `info` when they are
+            known, or `None` if there is no search of the position that is deep enough.
+        """
+        key = self._key(board)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (min_depth is not None and (entry[2] is None or entry[2] < min_depth)):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        move, score, depth = entry
+        info = {}
+        if score is not None:
+            info['score'] = chess.engine.PovScore(score, board.turn)
+        if depth is not None:
+            info['depth'] = depth
+        return chess.engine.PlayResult(move, None, info)
+
+    def put(self, board: chess.Board, result: chess.engine.PlayResult):
+        """
+        Adds the search of a position. A search that didn't go as deep as the one already cached is ignored.
+
+        :param board: The position that was searched.
+        :param result: The engine's :class:`chess.engine.PlayResult`. Its `info` should have the `score` and `depth`,
+            see :data:`chess.engine.INFO_BASIC` and :data:`chess.engine.INFO_SCORE`.
+        """
+        score = result.info.get('score')
+        self._put(self._key(board), result.move, score.relative if score is not None else None,
+                  result.info.get('depth'))
+
+    def _put(self, key: Tuple[int, bool], move: Optional[chess.Move], score: Optional[chess.engine.Score],
+             depth: Optional[int]):
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous[2] is not None and (depth is None or depth < previous[2]):
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = (move, score, depth)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes every entry and resets the hit and miss counts.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def save(self, path: str = None):
+        """
+        Writes the cache to a file. The file is replaced in one step, so a reader never sees a partly written cache.
+
+        :param path: The file to write. Defaults to the `path` the cache was created with.
+        """
+        path = path if path is not None else self.path
+        if path is None:
+            raise ValueError('EvaluationCache has no path to save to')
+
+        with self._lock:
+            entries = list(self._entries.items())
+        data = [_CACHE_HEADER.pack(_CACHE_MAGIC, len(entries))]
+        for (zobrist_hash, turn), (move, score, depth) in entries:
+            score_kind, score_value = _pack_score(score)
+            data.append(_CACHE_ENTRY.pack(zobrist_hash, turn, move.uci().encode('ascii') if move else b'',
+                                          score_kind, score_value, depth if depth is not None else -1))
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(b''.join(data))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def load(self, path: str):
+        """
+        Adds the entries saved in a file by :meth:`save`, in the order they were used. Entries beyond `max_entries`
+        evict the least recently used ones as usual.
+
+        :param path: The file to read.
+        """
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        if len(data) < _CACHE_HEADER.size:
+            raise ValueError('No evaluation cache found in "{}"'.format(path))
+        magic, num_entries = _CACHE_HEADER.unpack_from(data)
+        if magic != _CACHE_MAGIC:
+            raise ValueError('No evaluation cache found in "{}"'.format(path))
+        if len(data) < _CACHE_HEADER.size + num_entries * _CACHE_ENTRY.size:
+            raise ValueError('Evaluation cache "{}" ends in the middle of an entry'.format(path))
+
+        for zobrist_hash, turn, uci, score_kind, score_value, depth in _CACHE_ENTRY.iter_unpack(
+                data[_CACHE_HEADER.size:_CACHE_HEADER.size + num_entries * _CACHE_ENTRY.size]):
+            uci = uci.rstrip(b'\0')
+            self._put((zobrist_hash, bool(turn)), chess.Move.from_uci(uci.decode('ascii')) if uci else None,
+                      _unpack_score(score_kind, score_value), depth if depth >= 0 else None)
+
+
+def _pack_score(score: Optional[chess.engine.Score]) -> Tuple[int, int]:
+    if score is None:
+        return _SCORE_NONE, 0
+    if score == chess.engine.MateGiven:
+        return _SCORE_MATE_GIVEN, 0
+    if score.is_mate():
+        return _SCORE_MATE, score.mate()
+    return _SCORE_CP, score.score()
+
+
+def _unpack_score(kind: int, value: int) -> Optional[chess.engine.Score]:
+    if kind == _SCORE_CP:
+        return chess.engine.Cp(value)
+    if kind == _SCORE_MATE:
+        return chess.engine.Mate(value)
+    if kind == _SCORE_MATE_GIVEN:
+        return chess.engine.MateGiven
+    return None
+
+
+class EnginePool(object):
+    """
+    A pool of UCI engine processes that are kept running and shared between bots and games, so that each game doesn't
+    pay the startup cost of the engine. Engines are leased from the pool for a single search at a time, and at most
+    `max_engines` are running at once. Callers that need an engine while all of them are leased wait for one to be
+    returned.
+
+    Pass a `game` to :meth:`play` or :meth:`analyse` to tell the engine which game a position is from. The engine is
+    sent `ucinewgame` whenever it searches a position from a different game than its last search, so state from other
+    games (like the hash table) doesn't leak into the search. A new `object()` created in
+    :meth:`Player.handle_game_start` works well as the game.
+
+    Engines that crash with :class:`chess.engine.EngineTerminatedError` are discarded and replaced with a new engine
+    from `engine_factory`, and the search is retried once on the new engine.
+
+    With a `cache`, :meth:`play` (and so :meth:`play_all`) returns the cached search of a position instead of
+    searching it again. A cached search is used if it is at least as deep as the `depth` of the limit, or always when
+    the limit has no depth.
+
+    Examples:
+        >>> pool = EnginePool(max_engines=4)
+        >>> result = pool.play(chess.Board(), chess.engine.Limit(time=0.1), game=game)
+        >>> with pool.engine() as engine:
+        ...     info = engine.analyse(chess.Board(), chess.engine.Limit(depth=10))
+        >>> pool.close()
+
+    :param engine_factory: Function that starts a new engine. Defaults to :func:`popen_stockfish`.
+    :param max_engines: The maximum number of engines to run at once.
+    :param cache: Optional :class:`EvaluationCache` of searches, which can be shared with other pools.
+    """
+
+    def __init__(self, engine_factory: Callable[[], chess.engine.SimpleEngine] = None, max_engines: int = 1,
+                 cache: EvaluationCache = None):
+        if max_engines < 1:
+            raise ValueError('EnginePool needs at least one engine, got max_engines={}'.format(max_engines))
+
+        self.engine_factory = engine_factory or popen_stockfish
+        self.max_engines = max_engines
+        self.cache = cache
+
+        self._idle_engines = []
+        self._num_engines = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def num_engines(self) -> int:
+        """The number of engines currently running, including leased engines."""
+        return self._num_engines
+
+    def acquire(self, timeout: float = None) -> chess.engine.SimpleEngine:
+        """
+        Leases an engine from the pool, starting a new one if none are idle and fewer than `max_engines` are running.
+        Engines must be given back with :meth:`release`. Prefer :meth:`engine`, which releases automatically.
+
+        :param timeout: The maximum number of seconds to wait for an engine, or `None` to wait forever.
+        :return: The leased engine.
+        :raises TimeoutError: If no engine became available within `timeout` seconds.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._closed or self._idle_engines or self._num_engines < self.max_engines, timeout):
+                raise TimeoutError('No engine became available within {} seconds'.format(timeout))
+            if self._closed:
+                raise ValueError('EnginePool is closed')
+
+            if self._idle_engines:
+                return self._idle_engines.pop()
+
+            # reserve the slot before starting the engine so other threads don't go over max_engines
+            self._num_engines += 1
+
+        try:
+            return self.engine_factory()
+        except BaseException:
+            self._discard(None)
+            raise
+
+    def release(self, engine: chess.engine.SimpleEngine, terminated: bool = False):
+        """
+        Returns a leased engine to the pool.
+
+        :param engine: The engine returned by :meth:`acquire`.
+        :param terminated: Whether the engine crashed. Crashed engines are shut down instead of being reused.
+        """
+        if terminated:
+            self._discard(engine)
+            return
+
+        with self._condition:
+            if not self._closed:
+                self._idle_engines.append(engine)
+                self._condition.notify()
+                return
+
+        # the pool was closed while the engine was leased
+        self._discard(engine)
+
+    def _discard(self, engine: Optional[chess.engine.SimpleEngine]):
+        if engine is not None:
+            _quit_quietly(engine)
+        with self._condition:
+            self._num_engines -= 1
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def engine(self, timeout: float = None):
+        """
+        Context manager that leases an engine for the duration of the `with` block. If the engine crashes inside the
+        block it is discarded instead of being returned to the pool.
+
+        :param timeout: See :meth:`acquire`.
+        """
+        engine = self.acquire(timeout)
+        try:
+            yield engine
+        except chess.engine.EngineTerminatedError:
+            self.release(engine, terminated=True)
+            raise
+        except BaseException:
+            self.release(engine)
+            raise
+        else:
+            self.release(engine)
+
+    def _run(self, search: Callable[[chess.engine.SimpleEngine], object]):
+        try:
+            with self.engine() as engine:
+                return search(engine)
+        except chess.engine.EngineTerminatedError:
+            # the crashed engine was discarded, so this will run on a freshly started engine
+            with self.engine() as engine:
+                return search(engine)
+
+    def play(self, board: chess.Board, limit: chess.engine.Limit, game: object = None,
+             **kwargs) -> chess.engine.PlayResult:
+        """
+        Leases an engine and plays a move with it. See :meth:`chess.engine.SimpleEngine.play`. Positions in the
+        pool's cache aren't searched again, unless keyword arguments other than `info` are given.
+
+        :param board: The position to search.
+        :param limit: The search limit.
+        :param game: The game `board` is from.
+        :param kwargs: Other keyword arguments to :meth:`chess.engine.SimpleEngine.play`.
+        :return: The engine's :class:`chess.engine.PlayResult`.
+        """
+        if self.cache is None or kwargs.keys() - {'info'}:
+            return self._run(lambda engine: engine.play(board, limit, game=game, **kwargs))
+
+        result = self.cache.get(board, limit.depth)
+        if result is not None:
+            return result
+
+        # the score and depth are needed for the cache
+        info = kwargs.get('info', chess.engine.INFO_NONE) | chess.engine.INFO_BASIC | chess.engine.INFO_SCORE
+        result = self._run(lambda engine: engine.play(board, limit, game=game, info=info))
+        self.cache.put(board, result)
+        return result
+
+    def analyse(self, board: chess.Board, limit: chess.engine.Limit, game: object = None, **kwargs):
+        """
+        Leases an engine and analyses a position with it. See :meth:`chess.engine.SimpleEngine.analyse`.
+
+        :param board: The position to search.
+        :param limit: The search limit.
+        :param game: The game `board` is from.
+        :param kwargs: Other keyword arguments to :meth:`chess.engine.SimpleEngine.analyse`.
+        :return: The engine's :class:`chess.engine.InfoDict`.
+        """
+        return self._run(lambda engine: engine.analyse(board, limit, game=game, **kwargs))
+
+    async def play_async(self, board: chess.Board, limit: chess.engine.Limit, game: object = None,
+                         **kwargs) -> chess.engine.PlayResult:
+        """
+        Coroutine version of :meth:`play` for use in an :class:`AsyncPlayer`. The search runs on a thread of the event
+        loop's default executor, so other coroutines keep running while the engine searches.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, functools.partial(self.play, board, limit, game=game, **kwargs))
+
+    def play_all(self, boards: List[chess.Board], limit: chess.engine.Limit, game: object = None,
+                 **kwargs) -> List[Optional[chess.engine.PlayResult]]:
+        """
+        Plays a move on each of `boards` in one batch, running up to `max_engines` searches at once. Searching `n`
+        boards takes about `ceil(n / max_engines)` times the time in `limit`.
+
+        :param boards: The positions to search.
+        :param limit: The search limit for each position.
+        :param game: The game the boards are from.
+        :param kwargs: Other keyword arguments to :meth:`chess.engine.SimpleEngine.play`.
+        :return: The engine's :class:`chess.engine.PlayResult` for each board, in the same order as `boards`. The result
+            is `None` for boards that the engine failed to search.
+        """
+        def play(board):
+            try:
+                return self.play(board, limit, game=game, **kwargs)
+            except (chess.engine.EngineError, chess.engine.EngineTerminatedError):
+                return None
+
+        if self.max_engines == 1 or len(boards) <= 1:
+            return [play(board) for board in boards]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_engines, len(boards))) as executor:
+            return list(executor.map(play, boards))
+
+    def close(self):
+        """
+        Shuts down the idle engines. Engines that are currently leased are shut down when they are released.
+        """
+        with self._condition:
+            self._closed = True
+            idle_engines, self._idle_engines = self._idle_engines, []
+            self._condition.notify_all()
+
+        for engine in idle_engines:
+            self._discard(engine)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _quit_quietly(engine: chess.engine.SimpleEngine):
+    try:
+        engine.quit()
+    except (chess.engine.EngineError, chess.engine.EngineTerminatedError, TimeoutError):
+        pass
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_evaluation_cache() -> EvaluationCache:
+    """
+    Gets the :class:`EvaluationCache` shared by all bots in this process, creating it the first time it is used. If
+    the environment variable named by :data:`EVALUATION_CACHE_ENV_VAR` is set, the cache is loaded from that path and
+    saved back to it when the process exits, so it carries over between runs.
+
+    :return: The shared :class:`EvaluationCache`.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EvaluationCache(path=os.environ.get(EVALUATION_CACHE_ENV_VAR))
+            if _default_cache.path is not None:
+                atexit.register(_default_cache.save)
+        return _default_cache
+
+
+def default_engine_pool() -> EnginePool:
+    """
+    Gets the :class:`EnginePool` shared by all bots in this process, creating it the first time it is used. The pool
+    runs Stockfish from :func:`stockfish_path`, with at most one engine per core, and caches its searches in
+    :func:`default_evaluation_cache`.
+
+    :return: The shared :class:`EnginePool`.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = EnginePool(max_engines=os.cpu_count() or 1, cache=default_evaluation_cache())
+            atexit.register(_default_pool.close)
+        return _default_pool
+
+
+def set_default_engine_pool(pool: Optional[EnginePool]):
+    """
+    Replaces the :class:`EnginePool` returned by :func:`default_engine_pool`, for example to change its concurrency
+    limit or use a different engine. The previous pool is closed.
+
+    :param pool: The new pool, or `None` to create a new default pool on next use.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        previous, _default_pool = _default_pool, pool
+    if previous is not None and previous is not pool:
+        previous.close()
@@ -1,7 +1,10 @@
+import os
+import threading
+import time
 from abc import abstractmethod
-from datetime import datetime
+import requests
 from .utilities import *
-from .history import GameHistory
+from .history import GameHistory, TURN_PHASES
 
 
 class Game(object):
@@ -128,6 +131,17 @@ class Game(object):
 class LocalGame(Game):
     """
     The local implementation of :class:`Game`. Used to run games locally instead of remotely via a server.
+
+    The clock uses :func:`time.perf_counter_ns`, so it isn't affected by changes to the system clock. Each turn is
+    split into the phases in :data:`TURN_PHASES`, and their durations are stored in the game history (see
+    :meth:`GameHistory.phase_durations`):
+
+    * `sense`: from the start of the turn until :meth:`sense` is called, i.e. the time the player takes to choose a
+      sense.
+    * `move`: from the end of :meth:`sense` until :meth:`move` is called, i.e. the time the player takes to choose a
+      move.
+    * `bookkeeping`: the rest of the turn, i.e. the time spent inside :meth:`sense` and :meth:`move` and handling the
+      move result before :meth:`end_turn`.
     """
 
     def __init__(self, seconds_per_player: float = 900):
@@ -138,17 +152,39 @@ class LocalGame(Game):
 
         self._is_finished = False
         self.seconds_left_by_color = {chess.WHITE: seconds_per_player, chess.BLACK: seconds_per_player}
+
+        # times are from time.perf_counter_ns
         self.current_turn_start_time = None
+        self._phase_start_time = None
+        self._phase_durations = dict.fromkeys(TURN_PHASES, 0)
 
         self.move_results = None
 
+        # move actions are cached per position, see :meth:`move_actions`
+        self._move_actions_key = None
+        self._move_actions = None
+        self._move_actions_set = None
+
     def start(self):
         """
         Starts off the clock for the first player.
 
         :return: None.
         """
-        self.current_turn_start_time = datetime.now()
+        self._start_turn_clock()
+
+    def _start_turn_clock(self):
+        self.current_turn_start_time = time.perf_counter_ns()
+        self._phase_start_time = self.current_turn_start_time
+        self._phase_durations = dict.fromkeys(TURN_PHASES, 0)
+
+    def _end_phase(self, phase: str) -> int:
+        # adds the time since the last phase ended to `phase`, and starts the next phase
+        now = time.perf_counter_ns()
+        if self._phase_start_time is not None:
+            self._phase_durations[phase] += now - self._phase_start_time
+        self._phase_start_time = now
+        return now
 
     def end(self):
         """
@@ -162,8 +198,8 @@ class LocalGame(Game):
         """
         :return: The amount of seconds left for the current player.
         """
-        if not self._is_finished and self.current_turn_start_time:
-            elapsed_since_turn_start = (datetime.now() - self.current_turn_start_time).total_seconds()
+        if not self._is_finished and self.current_turn_start_time is not None:
+            elapsed_since_turn_start = (time.perf_counter_ns() - self.current_turn_start_time) / 1e9
             return self.seconds_left_by_color[self.turn] - elapsed_since_turn_start
         else:
             return self.seconds_left_by_color[self.turn]
@@ -178,32 +214,53 @@ class LocalGame(Game):
         """
         :return: List of moves that are possible with only knowledge of your pieces
         """
-        return None if self._is_finished else moves_without_opponent_pieces(self.board) + pawn_capture_moves_on(self.board)
+        if self._is_finished:
+            return None
+        self._update_move_actions()
+        return list(self._move_actions)
+
+    def _update_move_actions(self):
+        # the cache is cleared in :meth:`move`, but the board can also be modified directly (e.g. in tests), so it is
+        # keyed by the board's public state too
+        board = self.board
+        key = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+               board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK], board.turn, board.castling_rights,
+               board.ep_square)
+        if key != self._move_actions_key:
+            self._move_actions = moves_without_opponent_pieces(self.board) + pawn_capture_moves_on(self.board)
+            self._move_actions_set = frozenset(self._move_actions)
+            self._move_actions_key = key
+
+    def _clear_move_actions(self):
+        self._move_actions_key = None
+        self._move_actions = None
+        self._move_actions_set = None
 
     def opponent_move_results(self) -> Optional[Square]:
         return self.move_results
 
     def sense(self, square: Square) -> List[Tuple[Square, Optional[chess.Piece]]]:
+        self._end_phase('sense')
+
         if square not in self.sense_actions():
             raise ValueError('LocalGame::sense({}): {} is not a valid square.'.format(square, square))
 
-        rank, file = chess.square_rank(square), chess.square_file(square)
-        sense_result = []
-        for delta_rank in [1, 0, -1]:
-            for delta_file in [-1, 0, 1]:
-                if 0 <= rank + delta_rank <= 7 and 0 <= file + delta_file <= 7:
-                    sense_square = chess.square(file + delta_file, rank + delta_rank)
-                    sense_result.append((sense_square, self.board.piece_at(sense_square)))
+        sense_result = [(sense_square, self.board.piece_at(sense_square)) for sense_square in SENSE_WINDOWS[square]]
 
-        self.__game_history.store_sense(self.turn, square, sense_result)
+        self._record_sense(square, sense_result)
 
+        self._end_phase('bookkeeping')
         return sense_result
 
+    def _record_sense(self, square: Square, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+        self.__game_history.store_sense(self.turn, square, sense_result)
+
     def move(self, requested_move: Optional[chess.Move]) \
             -> Tuple[Optional[chess.Move], Optional[chess.Move], Optional[Square]]:
-            
         if self._is_finished:
             return requested_move, None, None
+
+        self._end_phase('move')
         if requested_move is None:
             # pass move
             taken_move = None
@@ -213,7 +270,8 @@ class LocalGame(Game):
         else:
             # add in a queen promotion if the move doesn't have one but could have one
             move = add_pawn_queen_promotion(self.board, requested_move)
-            if move not in self.move_actions():
+            self._update_move_actions()
+            if move not in self._move_actions_set:
                 raise ValueError('Requested move {} was not in move_actions()'.format(requested_move))
 
             # calculate taken move
@@ -222,37 +280,27 @@ class LocalGame(Game):
             # calculate capture square
             opt_capture_square = capture_square_of_move(self.board, taken_move)
 
-        # store move information before the move is pushed, as pushing a move
-        # will change the turn over to the opponent
-        self.__game_history.store_move(self.turn, requested_move, taken_move, opt_capture_square)
-        self.__game_history.store_fen_before_move(self.turn, self.board.fen())
-
-        # apply move
-        self.board.push(taken_move if taken_move is not None else chess.Move.null())
-
-        self.__game_history.store_fen_after_move(self.turn, self.board.fen())
+        self._push_move(requested_move, taken_move, opt_capture_square)
+        self._clear_move_actions()
 
         # store results of move for notifying other player
         self.move_results = opt_capture_square
 
+        self._end_phase('bookkeeping')
         return requested_move, taken_move, opt_capture_square
 
-    def _revise_move(self, move):
-        # if its a legal move, don't change it at all. note that board.generate_psuedo_legal_moves() does not
-        # include psuedo legal castles
-        if move in self.board.generate_pseudo_legal_moves() or is_psuedo_legal_castle(self.board, move):
-            return move
-
-        # note: if there are pieces in the way, we DONT capture them
-        if is_illegal_castle(self.board, move):
-            return None
+    def _push_move(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                   opt_capture_square: Optional[Square]):
+        # store move information before the move is pushed, as pushing a move
+        # will change the turn over to the opponent
+        self.__game_history.store_move(self.turn, requested_move, taken_move, opt_capture_square)
+        self.__game_history.store_board_before_move(self.turn, self.board)
 
-        # if the piece is a sliding piece, slide it as far as it can go
-        piece = self.board.piece_at(move.from_square)
-        if piece.piece_type in [chess.PAWN, chess.ROOK, chess.BISHOP, chess.QUEEN]:
-            move = slide_move(self.board, move)
+        # apply move
+        self.board.push(taken_move if taken_move is not None else chess.Move.null())
 
-        return move if move in self.board.generate_pseudo_legal_moves() else None
+    def _revise_move(self, move):
+        return revise_move(self.board, move)
 
     def end_turn(self):
         """
@@ -264,11 +312,12 @@ class LocalGame(Game):
 
         :return: None
         """
-        elapsed = datetime.now() - self.current_turn_start_time
-        self.seconds_left_by_color[self.turn] -= elapsed.total_seconds()
+        now = self._end_phase('bookkeeping')
+        self.seconds_left_by_color[self.turn] -= (now - self.current_turn_start_time) / 1e9
+        self.__game_history.store_phase_durations(self.turn, self._phase_durations)
 
         self.turn = not self.turn
-        self.current_turn_start_time = datetime.now()
+        self._start_turn_clock()
 
     def get_game_history(self) -> Optional[GameHistory]:
         return self.__game_history if self.is_over() else None
@@ -309,32 +358,208 @@ class LocalGame(Game):
         return None
 
 
+class SimulatedGame(LocalGame):
+    """
+    A :class:`LocalGame` for simulations, such as self-play data generation or Monte Carlo rollouts, that skips the
+    work a real game needs but a simulation doesn't. The rules are exactly the same as :class:`LocalGame`, but:
+
+    * The clock is virtual: it doesn't measure anything, and instead every turn costs `seconds_per_turn` seconds. With
+      the default of 0 the game can only end with a king capture.
+    * Phase durations aren't recorded in the history.
+    * With `record_history=False`, nothing is recorded at all and :meth:`get_game_history` always returns `None`.
+
+    Examples:
+        >>> game = SimulatedGame(seconds_per_turn=1)
+        >>> winner_color, win_reason, history = play_local_game(RandomBot(), RandomBot(), game=game)
+
+    :param seconds_per_player: The number of seconds each player has to play the entire game.
+    :param seconds_per_turn: The number of seconds each turn takes off the clock of the player who played it.
+    :param record_history: Whether to record the history of the game.
+    """
+
+    def __init__(self, seconds_per_player: float = 900, seconds_per_turn: float = 0, record_history: bool = True):
+        super().__init__(seconds_per_player=seconds_per_player)
+        self.seconds_per_turn = seconds_per_turn
+        self.record_history = record_history
+
+    def _start_turn_clock(self):
+        pass
+
+    def _end_phase(self, phase: str) -> int:
+        return 0
+
+    def get_seconds_left(self) -> float:
+        return self.seconds_left_by_color[self.turn]
+
+    def _record_sense(self, square: Square, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+        if self.record_history:
+            super()._record_sense(square, sense_result)
+
+    def _push_move(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                   opt_capture_square: Optional[Square]):
+        if self.record_history:
+            super()._push_move(requested_move, taken_move, opt_capture_square)
+        else:
+            self.board.push(taken_move if taken_move is not None else chess.Move.null())
+
+    def end_turn(self):
+        """
+        Takes `seconds_per_turn` off the current player's clock and ends their turn.
+
+        :return: None
+        """
+        self.seconds_left_by_color[self.turn] -= self.seconds_per_turn
+        self.turn = not self.turn
+
+    def get_game_history(self) -> Optional[GameHistory]:
+        return super().get_game_history() if self.record_history else None
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def remote_session(server_url: str) -> requests.Session:
+    """
+    Gets the HTTP session shared by every :class:`RemoteGame` on `server_url`. The session keeps connections to the
+    server alive and pools them, so requests don't pay for a new connection each time.
+
+    :param server_url: The URL of the server.
+    :return: The shared :class:`requests.Session`.
+    """
+    # sessions are per process, so processes forked after a session was made don't share its sockets
+    key = (os.getpid(), server_url)
+    with _sessions_lock:
+        if key not in _sessions:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=64)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+        return _sessions[key]
+
+
 class RemoteGame(Game):
     """
     The remote implementation of :class:`Game`. Used to play games remotely via a server.
 
     All the methods implemented are pass-throughs to the server. Each method submits a HTTP request to the corresponding
-    end point on the server.
+    end point on the server, except for the turn information. :meth:`wait_for_turn` long-polls the server until it is
+    the player's turn, and the response contains the opponent's move results, the sense actions, the move actions
+    and the seconds left, which are then returned by the corresponding methods without another request. The server
+    ends the turn when the move is made.
+
+    :param game_id: The id of the game on the server.
+    :param server_url: The URL of the server.
+    :param session: The :class:`requests.Session` to make requests with. Defaults to :func:`remote_session`.
+    :param long_poll_seconds: The longest time to wait for a response to a single long-poll request.
     """
 
-    def __init__(self, game_id):
+    def __init__(self, game_id, server_url: str = 'http://localhost:5000', session: requests.Session = None,
+                 long_poll_seconds: float = 30):
         super().__init__()
         self.game_id = game_id
+        self.server_url = server_url.rstrip('/')
+        self.session = session or remote_session(self.server_url)
+        self.long_poll_seconds = long_poll_seconds
+
+        self.name = None
         self.latest_status = None
+        self.latest_status_time = None
+
+    def _request(self, method: str, endpoint: str, timeout: float = 30, **kwargs) -> requests.Response:
+        url = '{}/api/game/{}/{}'.format(self.server_url, self.game_id, endpoint)
+        response = self.session.request(method, url, timeout=timeout, **kwargs)
+        if response.status_code >= 400:
+            try:
+                message = response.json()['error']
+            except (ValueError, KeyError):
+                message = response.text
+            raise ValueError('RemoteGame::{}: {}'.format(endpoint, message))
+        return response
+
+    def _get(self, endpoint: str, **params) -> dict:
+        return self._request('GET', endpoint, params=params).json()
+
+    def _post(self, endpoint: str, **data) -> dict:
+        return self._request('POST', endpoint, json=dict(data, name=self.name)).json()
+
+    def get_player_color(self, name) -> Color:
+        """
+        :param name: The name of the player.
+        :return: The :class:`Color` that `name` is playing as. Actions on this game are made as `name` from now on.
+        """
+        self.name = name
+        return self._get('color', name=name)['color']
 
-    def get_player_color(self, name):
-        """Would request the color of the player from the server"""
-        return chess.WHITE
+    def get_starting_board(self) -> chess.Board:
+        return chess.Board(self._get('starting_board')['fen'])
 
-    def get_starting_board(self):
-        return chess.Board()
+    def start(self):
+        """
+        Tells the server the player is ready. The clock starts once both players are ready.
+        """
+        self._post('start')
 
     def wait_for_turn(self, name):
         """
-        Would request turn information from the server, and return when its the player's turn.
-        Could either do:
-        1. Busy wait, where server instantly returns response indicating the turn
-        2. Server wait, where server doesn't send response until its the turn. Not sure if this would run into timeout
-        issues.
+        Returns when it is the player's turn or the game is over. The server holds each request open until one of
+        those happens, instead of the client repeatedly asking.
         """
-        pass
+        self.name = name
+        while True:
+            status = self._request('GET', 'wait_for_turn', timeout=self.long_poll_seconds + 30,
+                                   params={'name': name, 'timeout': self.long_poll_seconds}).json()
+            if status['is_my_turn'] or status['is_over']:
+                self.latest_status = status
+                self.latest_status_time = time.monotonic()
+                return
+
+    def _turn_status(self, key):
+        if self.latest_status is None or not self.latest_status['is_my_turn']:
+            raise ValueError('RemoteGame::{}: it is not your turn, call wait_for_turn() first'.format(key))
+        return self.latest_status[key]
+
+    def sense_actions(self) -> List[Square]:
+        return self._turn_status('sense_actions')
+
+    def move_actions(self) -> List[chess.Move]:
+        return [chess.Move.from_uci(move) for move in self._turn_status('move_actions')]
+
+    def get_seconds_left(self) -> float:
+        elapsed = time.monotonic() - self.latest_status_time
+        return self._turn_status('seconds_left') - elapsed
+
+    def opponent_move_results(self) -> Optional[Square]:
+        return self._turn_status('opponent_move_results')
+
+    def sense(self, square: Square) -> List[Tuple[Square, Optional[chess.Piece]]]:
+        sense_result = self._post('sense', square=square)['sense_result']
+        return [(sense_square, None if symbol is None else chess.Piece.from_symbol(symbol))
+                for sense_square, symbol in sense_result]
+
+    def move(self, requested_move: Optional[chess.Move]) \
+            -> Tuple[Optional[chess.Move], Optional[chess.Move], Optional[Square]]:
+        result = self._post('move', requested_move=None if requested_move is None else requested_move.uci())
+        taken_move = None if result['taken_move'] is None else chess.Move.from_uci(result['taken_move'])
+        return requested_move, taken_move, result['capture_square']
+
+    def end_turn(self):
+        # the server already ended the turn when the move was made
+        self.latest_status = None
+
+    def is_over(self) -> bool:
+        if self.latest_status is not None:
+            return self.latest_status['is_over']
+        return self._get('result')['is_over']
+
+    def get_winner_color(self) -> Optional[Color]:
+        return self._get('result')['winner_color']
+
+    def get_win_reason(self) -> Optional[WinReason]:
+        win_reason = self._get('result')['win_reason']
+        return None if win_reason is None else WinReason[win_reason]
+
+    def get_game_history(self) -> Optional[GameHistory]:
+        response = self._request('GET', 'history')
+        return GameHistory.from_bytes(response.content)
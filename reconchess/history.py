@@ -1,18 +1,36 @@
+import collections
 import chess
 from .types import *
-from typing import Callable, TypeVar, Iterable, Mapping
+from .utilities import SENSE_WINDOWS
+from typing import Callable, Dict, TypeVar, Iterable, Mapping
+from collections.abc import Sequence
 import json
 import math
+import mmap
+import os
+import struct
 
 T = TypeVar('T')
 
+TURN_PHASES = ('sense', 'move', 'bookkeeping')
+"""The phases of a turn that :class:`LocalGame` times, see :meth:`GameHistory.phase_durations`."""
+
+# the truth board is only stored every this many moves, see :meth:`GameHistory.store_board_before_move`
+_CHECKPOINT_INTERVAL = 16
+
+# the number of rebuilt truth boards each history keeps
+_BOARD_CACHE_SIZE = 32
+
 
 class Turn(object):
     """
     The representation of a single turn in a game. Contains the color of the player who played this turn, as well
-    as the number of turns the player has taken so far.
+    as the number of turns the player has taken so far. Turns are hashable, so they can be used in sets and as
+    dictionary keys.
     """
 
+    __slots__ = ('color', 'turn_number')
+
     def __init__(self, color: Color, turn_number: int):
         self.color = color
         self.turn_number = turn_number
@@ -37,6 +55,9 @@ class Turn(object):
 
         return self.color == other.color and self.turn_number == other.turn_number
 
+    def __hash__(self):
+        return hash((self.color, self.turn_number))
+
     def __lt__(self, other):
         if not isinstance(other, Turn):
             return NotImplemented
@@ -116,6 +137,33 @@ class GameHistory(object):
         self._capture_squares = {chess.WHITE: [], chess.BLACK: []}
         self._fens_before_move = {chess.WHITE: [], chess.BLACK: []}
         self._fens_after_move = {chess.WHITE: [], chess.BLACK: []}
+        self._phase_durations = {chess.WHITE: [], chess.BLACK: []}
+
+        # the checkpoints the fens are rebuilt from, if they are stored with :meth:`store_board_before_move`
+        self._move_log = None
+
+        # the memory map opened by :meth:`from_binary_file`, if any
+        self._mmap = None
+
+    def close(self):
+        """
+        Closes the memory map of a history opened with :meth:`from_binary_file`. The history can't be queried after it
+        is closed. Does nothing for other histories.
+
+        Histories can also be used as context managers, which close them on exit: ::
+
+            with GameHistory.from_binary_file('game.bin') as history:
+                board = history.truth_board_before_move(history.last_turn())
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def save(self, filename):
         """
@@ -142,8 +190,17 @@ class GameHistory(object):
         history._requested_moves = obj['requested_moves']
         history._taken_moves = obj['taken_moves']
         history._capture_squares = obj['capture_squares']
-        history._fens_before_move = obj['fens_before_move']
-        history._fens_after_move = obj['fens_after_move']
+        if 'fen_checkpoints' in obj:
+            move_log = _MoveLog(history._taken_moves, {ply: fen for ply, fen in obj['fen_checkpoints']})
+            for color in chess.COLORS:
+                move_log.num_boards[color] = len(history._taken_moves[color])
+            history._use_move_log(move_log)
+        else:
+            history._fens_before_move = obj['fens_before_move']
+            history._fens_after_move = obj['fens_after_move']
+        # histories saved before turns were timed don't have phase durations
+        if 'phase_durations' in obj:
+            history._phase_durations = obj['phase_durations']
 
         for color, sense_results in history._sense_results.items():
             for result in sense_results:
@@ -151,6 +208,136 @@ class GameHistory(object):
                     result[i] = tuple(result[i])
         return history
 
+    def save_binary(self, filename):
+        """
+        Save the game history to a file using the compact binary format. See :meth:`to_bytes`.
+
+        :param filename: The file to save to.
+        """
+        with open(filename, 'wb') as fp:
+            fp.write(self.to_bytes())
+
+    @classmethod
+    def from_binary_file(cls, filename):
+        """
+        Opens a file saved with :meth:`save_binary`. The file is memory mapped and decoded lazily, so querying a
+        single turn (e.g. :meth:`truth_board_before_move`) only decodes that turn's record. The returned object is
+        read only.
+
+        The memory map holds a file descriptor until it is closed with :meth:`close` (or by using the history as a
+        context manager), so close histories when loading many files.
+
+        :param filename: The binary file to load the :class:`GameHistory` object from.
+        :return: The :class:`GameHistory` object that was originally saved to the file using :meth:`save_binary`.
+        """
+        with open(filename, 'rb') as fp:
+            # mmap can't map empty files
+            if os.fstat(fp.fileno()).st_size == 0:
+                raise ValueError('No GameHistory object found in {}'.format(filename))
+            buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            history = cls.from_bytes(buffer)
+        except ValueError:
+            buffer.close()
+            raise ValueError('No GameHistory object found in {}'.format(filename))
+        history._mmap = buffer
+        return history
+
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the game history in a compact binary format. Moves are stored as 16 bit integers, sense results as
+        9 packed 4 bit piece codes, and truth boards as bitboards instead of fen strings. Every record has a fixed
+        size, so any turn can be looked up without decoding the rest of the game. For histories recorded with
+        :meth:`store_board_before_move`, the truth board after each move is the one before the next move, so only the
+        board after the last move is stored separately.
+
+        Sense results must be the 3x3 windows produced by :meth:`LocalGame.sense`. Phase durations (see
+        :meth:`phase_durations`) are not encoded.
+
+        :return: The encoded game history.
+        """
+        counts = []
+        for collection in [self._senses, self._requested_moves, self._fens_before_move, self._fens_after_move]:
+            counts.extend([len(collection[chess.WHITE]), len(collection[chess.BLACK])])
+
+        after_follows_before = self._move_log is not None or isinstance(self._fens_after_move[chess.WHITE],
+                                                                        _FollowingFens)
+        version = _BINARY_VERSION if after_follows_before else 1
+
+        parts = [_BINARY_HEADER.pack(_BINARY_MAGIC, version, *counts)]
+        for color in chess.COLORS:
+            for square, sense_result in zip(self._senses[color], self._sense_results[color]):
+                parts.append(_encode_sense(square, sense_result))
+        for color in chess.COLORS:
+            for requested_move, taken_move, capture_square in zip(
+                    self._requested_moves[color], self._taken_moves[color], self._capture_squares[color]):
+                parts.append(_BINARY_MOVE.pack(_encode_move(requested_move), _encode_move(taken_move),
+                                               _encode_square(capture_square)))
+        for fens in [self._fens_before_move] if after_follows_before else [self._fens_before_move,
+                                                                              self._fens_after_move]:
+            for color in chess.COLORS:
+                for i in range(len(fens[color])):
+                    parts.append(_encode_board(_board_at(fens[color], i)))
+        if after_follows_before and len(self._fens_after_move[chess.WHITE]) > 0:
+            last_color = chess.WHITE if len(self._fens_after_move[chess.WHITE]) > len(
+                self._fens_after_move[chess.BLACK]) else chess.BLACK
+            parts.append(_encode_board(_board_at(self._fens_after_move[last_color], -1)))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, buffer, offset: int = 0):
+        """
+        Decodes a game history encoded with :meth:`to_bytes`. Records are decoded lazily from `buffer` as they are
+        queried, so `buffer` must stay open while the returned object is used.
+
+        :param buffer: The encoded game history, e.g. `bytes` or a :class:`mmap.mmap`.
+        :param offset: The position in `buffer` where the encoded game history starts.
+        :return: A read only :class:`GameHistory` object.
+        """
+        if len(buffer) < offset + _BINARY_HEADER.size:
+            raise ValueError('Buffer is too small to contain a GameHistory')
+        magic, version, *counts = _BINARY_HEADER.unpack_from(buffer, offset)
+        if magic != _BINARY_MAGIC or version not in _BINARY_READABLE_VERSIONS:
+            raise ValueError('Buffer does not contain a GameHistory')
+        num_senses, num_moves, num_fens_before, num_fens_after = [
+            {chess.WHITE: counts[i], chess.BLACK: counts[i + 1]} for i in range(0, 8, 2)]
+
+        history = cls()
+        offset += _BINARY_HEADER.size
+
+        def sections(counts_by_color, record_struct, decode):
+            nonlocal offset
+            by_color = {}
+            for color in chess.COLORS:
+                by_color[color] = _BinarySection(buffer, offset, counts_by_color[color], record_struct.size, decode)
+                offset += record_struct.size * counts_by_color[color]
+            return by_color
+
+        senses = sections(num_senses, _BINARY_SENSE, _decode_sense)
+        moves = sections(num_moves, _BINARY_MOVE, _BINARY_MOVE.unpack_from)
+        history._fens_before_move = sections(num_fens_before, _BINARY_POSITION, _decode_fen)
+        if version == 1:
+            history._fens_after_move = sections(num_fens_after, _BINARY_POSITION, _decode_fen)
+        else:
+            # only the board after the last move is stored, the others are the boards before the next move
+            num_last = 1 if num_fens_after[chess.WHITE] else 0
+            last = _BinarySection(buffer, offset, num_last, _BINARY_POSITION.size, _decode_fen)
+            offset += _BINARY_POSITION.size * num_last
+            history._fens_after_move = {color: _FollowingFens(history._fens_before_move, color,
+                                                              num_fens_after[color], last)
+                                        for color in chess.COLORS}
+
+        if len(buffer) < offset:
+            raise ValueError('Buffer is too small to contain the GameHistory')
+
+        for color in chess.COLORS:
+            history._senses[color] = senses[color].map(lambda record: record[0])
+            history._sense_results[color] = senses[color].map(lambda record: record[1])
+            history._requested_moves[color] = moves[color].map(lambda record: _decode_move(record[0]))
+            history._taken_moves[color] = moves[color].map(lambda record: _decode_move(record[1]))
+            history._capture_squares[color] = moves[color].map(lambda record: _decode_square(record[2]))
+        return history
+
     def store_sense(self, color: Color, square: Square,
                     sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
         self._senses[color].append(square)
@@ -168,6 +355,34 @@ class GameHistory(object):
     def store_fen_after_move(self, color: Color, fen: str):
         self._fens_after_move[color].append(fen)
 
+    def store_board_before_move(self, color: Color, board: chess.Board):
+        """
+        Alternative to :meth:`store_fen_before_move` and :meth:`store_fen_after_move` for histories of real games,
+        where the truth board after a move is the truth board before the next one. Only the board before every 16th
+        move is stored, and the other fens are rebuilt on demand by replaying the taken moves (see :meth:`store_move`)
+        from the closest stored board. The most recently rebuilt boards are cached, so querying turns in order only
+        replays one move per turn.
+
+        Must be called after :meth:`store_move` for every move of the game, in order, and can't be mixed with
+        :meth:`store_fen_before_move` and :meth:`store_fen_after_move`.
+
+        :param color: The color of the player about to move.
+        :param board: The truth board before the move.
+        """
+        if self._move_log is None:
+            if any(self._fens_before_move[c] or self._fens_after_move[c] for c in chess.COLORS):
+                raise ValueError('Boards can only be stored in a GameHistory without fens')
+            self._use_move_log(_MoveLog(self._taken_moves))
+        self._move_log.store(color, board)
+
+    def _use_move_log(self, move_log):
+        self._move_log = move_log
+        self._fens_before_move = {color: _ReplayedFens(move_log, color, 0) for color in chess.COLORS}
+        self._fens_after_move = {color: _ReplayedFens(move_log, color, 1) for color in chess.COLORS}
+
+    def store_phase_durations(self, color: Color, durations: Mapping[str, int]):
+        self._phase_durations[color].append(dict(durations))
+
     def is_empty(self) -> bool:
         """
         Get whether or not the game had any turns in it.
@@ -199,9 +414,19 @@ class GameHistory(object):
         :return: The number of turns saved in this object. If `color` is specified, get the number of turns for that
             player.
         """
-        return len(list(self.turns(color=color)))
+        return len(self.turns(color=color))
 
-    def turns(self, color: Color = None, start=0, stop=math.inf) -> Iterable[Turn]:
+    def _last_ply(self) -> int:
+        # the ply of the last turn, or -1 if there are no turns
+        if self.is_empty():
+            return -1
+        num_white_turns = len(self._senses[chess.WHITE])
+        num_black_turns = len(self._senses[chess.BLACK])
+        if num_white_turns > num_black_turns:
+            return 2 * (num_white_turns - 1)
+        return 2 * num_black_turns - 1
+
+    def turns(self, color: Color = None, start=0, stop=math.inf) -> Sequence:
         """
         Get all the turns that happened in the game in order. Optionally specify a single player to get only that
         player's turns.
@@ -228,22 +453,25 @@ class GameHistory(object):
             >>> list(history.turns(start=1, stop=2))
             [Turn(WHITE, 1), Turn(BLACK, 1)]
 
+        The turns are a read only sequence that is computed from the number of turns, so it can be indexed and sliced
+        without going through the turns before: ::
+
+            >>> history.turns()[-1]
+            Turn(BLACK, 23)
+
+            >>> list(history.turns(WHITE)[10:12])
+            [Turn(WHITE, 10), Turn(WHITE, 11)]
+
         :param color: Optional player color indicating which player's turns to return.
         :param start: Optional starting turn number.
         :param stop: Optional stopping turn number.
-        :return: An iterable of :class:`Turn` objects that are in the same order as they occurred in the game. If
+        :return: A sequence of :class:`Turn` objects that are in the same order as they occurred in the game. If
             `color` is specified, gets the turns only for that player.
         """
-        if self.is_empty():
-            return
-
-        turn = Turn(color if color is not None else chess.WHITE, start)
-        stop_turn = Turn(color if color is not None else chess.WHITE, stop)
-        last_turn = self.last_turn()
-        while turn <= last_turn and turn < stop_turn:
-            if color is None or turn.color == color:
-                yield turn
-            turn = turn.next
+        stop_ply = self._last_ply() + 1
+        if color is None:
+            return _TurnRange(range(2 * start, int(min(2 * stop, stop_ply))))
+        return _TurnRange(range(_ply(color, start), int(min(_ply(color, stop), stop_ply)), 2))
 
     def is_first_turn(self, turn: Turn):
         """
@@ -522,7 +750,7 @@ class GameHistory(object):
         :return: A :class:`chess.Board` object.
         """
         self._validate_turn(turn, self._fens_before_move)
-        board = chess.Board(self._fens_before_move[turn.color][turn.turn_number])
+        board = _board_at(self._fens_before_move[turn.color], turn.turn_number)
         board.turn = turn.color
         return board
 
@@ -562,15 +790,47 @@ class GameHistory(object):
         :return: A :class:`chess.Board` object.
         """
         self._validate_turn(turn, self._fens_after_move)
-        board = chess.Board(self._fens_after_move[turn.color][turn.turn_number])
+        board = _board_at(self._fens_after_move[turn.color], turn.turn_number)
         board.turn = turn.color
         return board
 
+    def has_phase_durations(self, turn: Turn) -> bool:
+        """
+        Checks whether the durations of the phases of a turn were recorded. :class:`LocalGame` records them at the end
+        of every turn, but they aren't kept in the binary format (see :meth:`to_bytes`) or in json files saved before
+        turns were timed.
+
+        :param turn: The :class:`Turn` in question.
+        :return: `True` if :meth:`phase_durations` can be called on `turn`, `False` otherwise.
+        """
+        return turn.turn_number < len(self._phase_durations[turn.color])
+
+    def phase_durations(self, turn: Turn) -> Dict[str, int]:
+        """
+        Get how long each phase of a turn took, in nanoseconds. The phases are in :data:`TURN_PHASES`, see
+        :class:`LocalGame` for what each of them covers.
+
+        Phase durations depend on the machine a game was played on, so they are not compared by `==`.
+
+        Examples:
+            >>> history.phase_durations(Turn(WHITE, 0))
+            {'sense': 1503211, 'move': 25049877, 'bookkeeping': 120533}
+
+            >>> sum(history.phase_durations(turn)['move'] for turn in history.turns(WHITE)) / 1e9
+            12.5
+
+        :param turn: The :class:`Turn` in question.
+        :return: Dictionary from phase name to its duration in nanoseconds.
+        """
+        self._validate_turn(turn, self._phase_durations)
+        return dict(self._phase_durations[turn.color][turn.turn_number])
+
     def collect(self, get_turn_data_fn: Callable[[Turn], T], turns: Iterable[Turn]) -> Iterable[T]:
         """
         Collect data from multiple turns using any of :meth:`sense`, :meth:`sense_result`, :meth:`requested_move`,
         :meth:`taken_move`, :meth:`capture_square`, :meth:`move_result`, :meth:`truth_fen_before_move`,
-        :meth:`truth_board_before_move`, :meth:`truth_fen_after_move`, or :meth:`truth_board_after_move`.
+        :meth:`truth_board_before_move`, :meth:`truth_fen_after_move`, :meth:`truth_board_after_move`, or
+        :meth:`phase_durations`.
 
         Examples:
             >>> history.collect(history.sense, [Turn(WHITE, 0), Turn(BLACK, 0)])
@@ -585,7 +845,8 @@ class GameHistory(object):
         """
         if get_turn_data_fn not in [self.sense, self.sense_result, self.requested_move, self.taken_move,
                                     self.capture_square, self.move_result, self.truth_board_before_move,
-                                    self.truth_board_after_move, self.truth_fen_before_move, self.truth_fen_after_move]:
+                                    self.truth_board_after_move, self.truth_fen_before_move, self.truth_fen_after_move,
+                                    self.phase_durations]:
             raise ValueError('get_turn_data_fn must be one of the history getter functions')
         for turn in turns:
             yield get_turn_data_fn(turn)
@@ -598,22 +859,28 @@ class GameHistory(object):
         moves_equal = self._requested_moves == other._requested_moves and self._taken_moves == other._taken_moves and self._capture_squares == other._capture_squares
         fens_equal = self._fens_before_move == other._fens_before_move and self._fens_after_move == other._fens_after_move
 
+        # phase durations are timings of a particular run, so they don't make histories different
         return senses_equal and moves_equal and fens_equal
 
 
 class GameHistoryEncoder(json.JSONEncoder):
     def default(self, o):
         if isinstance(o, GameHistory):
-            return {
+            obj = {
                 'type': 'GameHistory',
                 'senses': o._senses,
                 'sense_results': o._sense_results,
                 'requested_moves': o._requested_moves,
                 'taken_moves': o._taken_moves,
                 'capture_squares': o._capture_squares,
-                'fens_before_move': o._fens_before_move,
-                'fens_after_move': o._fens_after_move,
+                'phase_durations': o._phase_durations,
             }
+            if o._move_log is not None:
+                obj['fen_checkpoints'] = sorted(o._move_log.checkpoints.items())
+            else:
+                obj['fens_before_move'] = {color: list(fens) for color, fens in o._fens_before_move.items()}
+                obj['fens_after_move'] = {color: list(fens) for color, fens in o._fens_after_move.items()}
+            return obj
         elif isinstance(o, chess.Piece):
             return {
                 'type': 'Piece',
@@ -640,3 +907,318 @@ class GameHistoryDecoder(json.JSONDecoder):
         elif 'true' in obj and 'false' in obj and len(obj) == 2:
             return {True: obj['true'], False: obj['false']}
         return obj
+
+
+_BINARY_MAGIC = b'RCGH'
+
+# version 1 stores the truth boards before and after every move, version 2 only stores the boards after the last move
+_BINARY_VERSION = 2
+_BINARY_READABLE_VERSIONS = (1, 2)
+
+# magic, version, then white & black counts of senses, moves, fens before move, and fens after move
+_BINARY_HEADER = struct.Struct('<4sB8I')
+
+# sense square, 9 packed 4 bit piece codes
+_BINARY_SENSE = struct.Struct('<B5s')
+
+# requested move, taken move, capture square
+_BINARY_MOVE = struct.Struct('<HHB')
+
+# pawns, knights, bishops, rooks, queens, kings, white pieces, castling rooks, en passant square, turn,
+# halfmove clock, fullmove number. black pieces are all the pieces that aren't white
+_BINARY_POSITION = struct.Struct('<7QBBBHH')
+
+_NO_MOVE = 0xFFFF
+_NO_SQUARE = 0xFF
+
+# piece code 0 is an empty square
+_PIECES_BY_CODE = [None] + [chess.Piece(piece_type, color) for color in [chess.WHITE, chess.BLACK]
+                            for piece_type in chess.PIECE_TYPES]
+_CODES_BY_PIECE = {piece: code for code, piece in enumerate(_PIECES_BY_CODE) if piece is not None}
+
+# castling rights can only be on the corners, so they are stored as 4 bits
+_CASTLING_SQUARES = [chess.A1, chess.H1, chess.A8, chess.H8]
+
+
+def _encode_square(square: Optional[Square]) -> int:
+    return _NO_SQUARE if square is None else square
+
+
+def _decode_square(value: int) -> Optional[Square]:
+    return None if value == _NO_SQUARE else value
+
+
+def _encode_move(move: Optional[chess.Move]) -> int:
+    if move is None:
+        return _NO_MOVE
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def _decode_move(value: int) -> Optional[chess.Move]:
+    if value == _NO_MOVE:
+        return None
+    return chess.Move(value & 0x3F, (value >> 6) & 0x3F, (value >> 12) or None)
+
+
+def _encode_sense(square: Optional[Square], sense_result: List[Tuple[Square, Optional[chess.Piece]]]) -> bytes:
+    if square is None:
+        return _BINARY_SENSE.pack(_NO_SQUARE, bytes(5))
+
+    if [result_square for result_square, _ in sense_result] != list(SENSE_WINDOWS[square]):
+        raise ValueError('Sense result for {} is not a 3x3 sense window'.format(chess.SQUARE_NAMES[square]))
+
+    packed = 0
+    for i, (_, piece) in enumerate(sense_result):
+        if piece is not None:
+            packed |= _CODES_BY_PIECE[piece] << (4 * i)
+    return _BINARY_SENSE.pack(square, packed.to_bytes(5, 'little'))
+
+
+def _decode_sense(buffer, offset: int) -> Tuple[Optional[Square], List[Tuple[Square, Optional[chess.Piece]]]]:
+    square, packed = _BINARY_SENSE.unpack_from(buffer, offset)
+    if square == _NO_SQUARE:
+        return None, []
+    packed = int.from_bytes(packed, 'little')
+    return square, [(sense_square, _PIECES_BY_CODE[(packed >> (4 * i)) & 0xF])
+                    for i, sense_square in enumerate(SENSE_WINDOWS[square])]
+
+
+def _encode_board(board: chess.Board) -> bytes:
+    castling = 0
+    for i, square in enumerate(_CASTLING_SQUARES):
+        if board.castling_rights & chess.BB_SQUARES[square]:
+            castling |= 1 << i
+    return _BINARY_POSITION.pack(board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+                                 board.occupied_co[chess.WHITE], castling, _encode_square(board.ep_square),
+                                 board.turn, board.halfmove_clock, board.fullmove_number)
+
+
+def _decode_board(buffer, offset: int) -> chess.Board:
+    pawns, knights, bishops, rooks, queens, kings, white, castling, ep_square, turn, \
+        halfmove_clock, fullmove_number = _BINARY_POSITION.unpack_from(buffer, offset)
+
+    board = chess.Board(None)
+    board.pawns, board.knights, board.bishops = pawns, knights, bishops
+    board.rooks, board.queens, board.kings = rooks, queens, kings
+    board.occupied = pawns | knights | bishops | rooks | queens | kings
+    board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK] = white, board.occupied & ~white
+    board.castling_rights = chess.BB_EMPTY
+    for i, square in enumerate(_CASTLING_SQUARES):
+        if castling & (1 << i):
+            board.castling_rights |= chess.BB_SQUARES[square]
+    board.ep_square = _decode_square(ep_square)
+    board.turn = bool(turn)
+    board.halfmove_clock = halfmove_clock
+    board.fullmove_number = fullmove_number
+    return board
+
+
+def _decode_fen(buffer, offset: int) -> str:
+    return _decode_board(buffer, offset).fen()
+
+
+def _board_at(fens: Sequence, index: int) -> chess.Board:
+    # skip the round trip through a fen string where possible
+    if isinstance(fens, _BinarySection) and fens.decode is _decode_fen:
+        return _decode_board(fens.buffer, fens.record_offset(index))
+    if isinstance(fens, _FollowingFens):
+        fens, index = fens.locate(index)
+        return _board_at(fens, index)
+    if isinstance(fens, _ReplayedFens):
+        board = fens.board(index).copy(stack=False)
+        # fens only keep en passant squares that can be captured on legally, so match boards made from fens
+        if board.ep_square is not None and not board.has_legal_en_passant():
+            board.ep_square = None
+        return board
+    return chess.Board(fens[index])
+
+
+def _ply(color: Color, turn_number: int) -> int:
+    return 2 * turn_number + (0 if color == chess.WHITE else 1)
+
+
+class _TurnRange(Sequence):
+    """A read only sequence of the turns at a range of plies, which creates :class:`Turn` objects as they are used."""
+
+    __slots__ = ('plies',)
+
+    def __init__(self, plies: range):
+        self.plies = plies
+
+    def __len__(self):
+        return len(self.plies)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return _TurnRange(self.plies[index])
+        ply = self.plies[index]
+        return Turn(ply % 2 == 0, ply // 2)
+
+    def __iter__(self):
+        for ply in self.plies:
+            yield Turn(ply % 2 == 0, ply // 2)
+
+    def __contains__(self, turn):
+        return isinstance(turn, Turn) and _ply(turn.color, turn.turn_number) in self.plies
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class _MoveLog(object):
+    """
+    The truth boards of a game, stored as the fen before every `_CHECKPOINT_INTERVAL`-th move plus the taken moves.
+    Boards are indexed by ply, the number of moves made before them. Boards between checkpoints are rebuilt by
+    replaying taken moves, and the most recently used ones are kept in an LRU cache.
+    """
+
+    def __init__(self, taken_moves: Mapping[Color, Sequence], checkpoints: Dict[int, str] = None):
+        self.taken_moves = taken_moves
+        self.checkpoints = checkpoints if checkpoints is not None else {}
+        self.num_boards = {chess.WHITE: 0, chess.BLACK: 0}
+        self._last_ply = None
+        self._cache = collections.OrderedDict()
+
+    def store(self, color: Color, board: chess.Board):
+        ply = _ply(color, self.num_boards[color])
+        if ply % _CHECKPOINT_INTERVAL == 0 or self._last_ply != ply - 1:
+            # en passant squares are kept even if they can't be captured on legally, which replaying moves needs
+            self.checkpoints[ply] = board.fen(en_passant='fen')
+        self.num_boards[color] += 1
+        self._last_ply = ply
+
+    def board(self, ply: int) -> chess.Board:
+        # the returned board is shared with the cache, so it must not be modified
+        board = self._cache.get(ply)
+        if board is not None:
+            self._cache.move_to_end(ply)
+            return board
+
+        start = ply
+        while start not in self._cache and start not in self.checkpoints:
+            if start <= 0:
+                raise ValueError('No truth board stored before ply {}'.format(ply))
+            start -= 1
+        if start in self._cache:
+            board = self._cache[start].copy(stack=False)
+        else:
+            board = chess.Board(self.checkpoints[start])
+
+        for replayed_ply in range(start, ply):
+            taken_move = self.taken_moves[replayed_ply % 2 == 0][replayed_ply // 2]
+            board.push(taken_move if taken_move is not None else chess.Move.null())
+        board.clear_stack()
+
+        self._cache[ply] = board
+        if len(self._cache) > _BOARD_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return board
+
+
+class _ReplayedFens(Sequence):
+    """The fens before (`offset` 0) or after (`offset` 1) each of a player's moves, rebuilt from a :class:`_MoveLog`."""
+
+    def __init__(self, move_log: _MoveLog, color: Color, offset: int):
+        self.move_log = move_log
+        self.color = color
+        self.offset = offset
+
+    def board(self, index: int) -> chess.Board:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('fen index out of range')
+        return self.move_log.board(_ply(self.color, index) + self.offset)
+
+    def __len__(self):
+        return self.move_log.num_boards[self.color]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.board(index).fen()
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+
+class _BinarySection(Sequence):
+    """A read only sequence of fixed size records in a buffer, which are decoded when accessed."""
+
+    def __init__(self, buffer, offset: int, count: int, record_size: int,
+                 decode: Callable[[object, int], T], transform: Callable[[T], object] = None):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.record_size = record_size
+        self.decode = decode
+        self.transform = transform
+
+    def map(self, transform: Callable[[T], object]):
+        return _BinarySection(self.buffer, self.offset, self.count, self.record_size, self.decode, transform)
+
+    def record_offset(self, index: int) -> int:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('record index out of range')
+        return self.offset + index * self.record_size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        value = self.decode(self.buffer, self.record_offset(index))
+        return value if self.transform is None else self.transform(value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+
+class _FollowingFens(Sequence):
+    """
+    The fens after each of a player's moves, which are the fens before the next move in `fens_before`, or the single
+    fen in `last` after the last move of the game.
+    """
+
+    def __init__(self, fens_before: Mapping[Color, Sequence], color: Color, count: int, last: Sequence):
+        self.fens_before = fens_before
+        self.color = color
+        self.count = count
+        self.last = last
+
+    def locate(self, index: int) -> Tuple[Sequence, int]:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('fen index out of range')
+        next_ply = _ply(self.color, index) + 1
+        next_fens = self.fens_before[next_ply % 2 == 0]
+        if next_ply // 2 < len(next_fens):
+            return next_fens, next_ply // 2
+        return self.last, 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        fens, index = self.locate(index)
+        return fens[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
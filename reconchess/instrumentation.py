@@ -0,0 +1,208 @@
+import collections
+import json
+import time
+import chess
+import numpy as np
+from typing import Dict
+from .types import *
+
+TURN_STEPS = ('sense_actions', 'move_actions', 'handle_opponent_move_result', 'choose_sense', 'sense',
+              'handle_sense_result', 'choose_move', 'move', 'handle_move_result', 'end_turn')
+"""The steps of :func:`reconchess.play_turn` that are timed in :attr:`TurnEvent.durations`, in the order they run."""
+
+
+class TurnEvent(object):
+    """
+    Everything that happened in one turn played by :func:`reconchess.play_turn`, and how long each step of it took.
+
+    :param durations: The nanoseconds each step in :data:`TURN_STEPS` took.
+    :param num_sense_actions: The number of sense actions the player could choose from.
+    :param num_move_actions: The number of move actions the player could choose from.
+    :param opponent_capture_square: The square the opponent captured a piece on last turn, or `None`.
+    :param sense: The square the player sensed, or `None`.
+    :param requested_move: The move the player requested, or `None`.
+    :param taken_move: The move that was actually taken, or `None`.
+    :param capture_square: The square the player captured a piece on, or `None`.
+    """
+
+    def __init__(self, durations: Dict[str, int], num_sense_actions: int, num_move_actions: int,
+                 opponent_capture_square: Optional[Square], sense: Optional[Square],
+                 requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                 capture_square: Optional[Square]):
+        self.durations = durations
+        self.num_sense_actions = num_sense_actions
+        self.num_move_actions = num_move_actions
+        self.opponent_capture_square = opponent_capture_square
+        self.sense = sense
+        self.requested_move = requested_move
+        self.taken_move = taken_move
+        self.capture_square = capture_square
+
+    @property
+    def revised_move(self) -> bool:
+        """`True` if the game changed the requested move, e.g. a slide cut short by an unseen piece."""
+        return self.requested_move != self.taken_move
+
+    @property
+    def captured_piece(self) -> bool:
+        """`True` if the player captured a piece this turn."""
+        return self.capture_square is not None
+
+    @property
+    def total_duration(self) -> int:
+        """The nanoseconds the whole turn took."""
+        return sum(self.durations.values())
+
+
+class GameObserver(object):
+    """
+    Base class for watching games as they are played. Pass an instance to :func:`reconchess.play_local_game` or
+    :func:`reconchess.play_remote_game`, and override the methods for the events you care about. The same observer
+    can watch any number of games, one after another.
+
+    Observers are called between the steps of a turn, so the time they take isn't included in the durations they
+    are given, but it does count against the player's clock.
+    """
+
+    def handle_game_start(self, color: Color, player):
+        """
+        Called once for each player in the game, before its first turn.
+
+        :param color: The color `player` is playing.
+        :param player: The :class:`reconchess.Player` playing the game.
+        """
+        pass
+
+    def handle_turn(self, player, event: TurnEvent):
+        """
+        Called at the end of every turn.
+
+        :param player: The :class:`reconchess.Player` who played the turn.
+        :param event: What happened in the turn.
+        """
+        pass
+
+    def handle_game_end(self, winner_color: Optional[Color], win_reason: Optional[WinReason], game_history):
+        """
+        Called once when the game is over, after the players have been told the results.
+
+        :param winner_color: The color of the winner, or `None` for a draw.
+        :param win_reason: The reason the game ended, or `None`.
+        :param game_history: The :class:`reconchess.GameHistory` of the game.
+        """
+        pass
+
+
+def _timed(durations: Dict[str, int], step: str, function, *args):
+    start = time.perf_counter_ns()
+    result = function(*args)
+    durations[step] = time.perf_counter_ns() - start
+    return result
+
+
+def play_observed_turn(game, player, observer: GameObserver):
+    """
+    Version of :func:`reconchess.play_turn` that times each step of the turn and passes a :class:`TurnEvent` to
+    `observer` at the end of it. :func:`reconchess.play_turn` calls this when it is given an observer.
+
+    :param game: The :class:`reconchess.Game` that `player` is playing in.
+    :param player: The :class:`reconchess.Player` whose turn it is.
+    :param observer: The :class:`GameObserver` to tell about the turn.
+    """
+    durations = {}
+
+    sense_actions = _timed(durations, 'sense_actions', game.sense_actions)
+    move_actions = _timed(durations, 'move_actions', game.move_actions)
+
+    opt_capture_square = game.opponent_move_results()
+    _timed(durations, 'handle_opponent_move_result', player.handle_opponent_move_result,
+           opt_capture_square is not None, opt_capture_square)
+
+    sense = _timed(durations, 'choose_sense', player.choose_sense, sense_actions, move_actions,
+                   game.get_seconds_left())
+    sense_result = _timed(durations, 'sense', game.sense, sense)
+    _timed(durations, 'handle_sense_result', player.handle_sense_result, sense_result)
+
+    move = _timed(durations, 'choose_move', player.choose_move, move_actions, game.get_seconds_left())
+    requested_move, taken_move, opt_enemy_capture_square = _timed(durations, 'move', game.move, move)
+    _timed(durations, 'handle_move_result', player.handle_move_result, requested_move, taken_move,
+           opt_enemy_capture_square is not None, opt_enemy_capture_square)
+
+    _timed(durations, 'end_turn', game.end_turn)
+
+    observer.handle_turn(player, TurnEvent(durations, len(sense_actions), len(move_actions), opt_capture_square,
+                                           sense, requested_move, taken_move, opt_enemy_capture_square))
+
+
+class LatencyAggregator(GameObserver):
+    """
+    Collects the step durations of every turn across any number of games, grouped by bot, and summarizes them as
+    percentiles. Bots are named after their class, so two copies of the same bot are counted together.
+
+    Examples:
+        >>> aggregator = LatencyAggregator()
+        >>> for _ in range(10):
+        ...     play_local_game(RandomBot(), TroutBot(), observer=aggregator)
+        >>> aggregator.write_summary('latency.json')
+
+    :param percentiles: The percentiles of each step's duration to report.
+    """
+
+    def __init__(self, percentiles: Tuple[float, ...] = (50, 90, 99)):
+        self.percentiles = percentiles
+        self.durations = collections.defaultdict(lambda: collections.defaultdict(list))
+        self.counts = collections.defaultdict(collections.Counter)
+
+    def handle_game_start(self, color: Color, player):
+        self.counts[type(player).__name__]['games'] += 1
+
+    def handle_turn(self, player, event: TurnEvent):
+        name = type(player).__name__
+        for step, duration in event.durations.items():
+            self.durations[name][step].append(duration)
+        self.durations[name]['turn'].append(event.total_duration)
+
+        counts = self.counts[name]
+        counts['turns'] += 1
+        counts['move_actions'] += event.num_move_actions
+        counts['revised_moves'] += event.revised_move
+        counts['captures'] += event.captured_piece
+        counts['pieces_lost'] += event.opponent_capture_square is not None
+
+    def summary(self) -> dict:
+        """
+        Summarizes the turns played by each bot so far. For each bot name there is a dictionary with the number of
+        `games` and `turns`, the `mean_move_actions` per turn, the number of `revised_moves`, `captures` and
+        `pieces_lost`, and the `durations` of each step in :data:`TURN_STEPS` plus the whole `turn`. Each step has its
+        `count`, `mean` and `max`, and a `p<percentile>` entry for each of the percentiles, all in nanoseconds.
+
+        :return: The summary, keyed by bot name.
+        """
+        summary = {}
+        for name, counts in self.counts.items():
+            bot_summary = {
+                'games': counts['games'],
+                'turns': counts['turns'],
+                'mean_move_actions': counts['move_actions'] / counts['turns'] if counts['turns'] else 0.0,
+                'revised_moves': counts['revised_moves'],
+                'captures': counts['captures'],
+                'pieces_lost': counts['pieces_lost'],
+                'durations': {},
+            }
+            for step, durations in self.durations[name].items():
+                durations = np.array(durations)
+                step_summary = {'count': len(durations), 'mean': float(durations.mean()), 'max': int(durations.max())}
+                for percentile, value in zip(self.percentiles, np.percentile(durations, self.percentiles)):
+                    step_summary['p{:g}'.format(percentile)] = float(value)
+                bot_summary['durations'][step] = step_summary
+            summary[name] = bot_summary
+        return summary
+
+    def write_summary(self, path: str):
+        """
+        Writes :meth:`summary` to `path` as JSON.
+
+        :param path: The path of the file to write.
+        """
+        with open(path, 'w') as fp:
+            json.dump(self.summary(), fp, indent=4)
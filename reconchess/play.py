@@ -1,11 +1,16 @@
+import asyncio
+import inspect
 import chess
 from .types import *
-from .player import Player
-from .game import Game, LocalGame, RemoteGame
+from typing import Union
+from .player import Player, AsyncPlayer
+from .game import Game, LocalGame, SimulatedGame, RemoteGame
 from .history import GameHistory
+from .instrumentation import GameObserver, play_observed_turn
 
 
-def play_local_game(white_player: Player, black_player: Player, seconds_per_player: float = 900) -> Tuple[
+def play_local_game(white_player: Player, black_player: Player, seconds_per_player: float = 900,
+                    observer: GameObserver = None, game: LocalGame = None) -> Tuple[
     Optional[Color], Optional[WinReason], GameHistory]:
     """
     Plays a game between the two players passed in. Uses :class:`LocalGame` to run the game, and just calls
@@ -14,20 +19,47 @@ def play_local_game(white_player: Player, black_player: Player, seconds_per_play
         while not game.is_over():
             play_turn(game, player)
 
+    If either player is an :class:`AsyncPlayer`, the game is played with :func:`async_play_local_game` on a new event
+    loop.
+
+    To time the players and count what happens in each turn, pass a
+    :class:`~reconchess.instrumentation.GameObserver`, such as a
+    :class:`~reconchess.instrumentation.LatencyAggregator`.
+
     :param white_player: The white :class:`Player`.
     :param black_player: The black :class:`Player`.
+    :param seconds_per_player: The number of seconds each player has to play the entire game.
+    :param observer: Optional :class:`~reconchess.instrumentation.GameObserver` to tell about the game as it is played.
+        Not supported with :class:`AsyncPlayer`.
+    :param game: Optional :class:`LocalGame` to play in, such as a :class:`SimulatedGame`. If given,
+        `seconds_per_player` is ignored. Not supported with :class:`AsyncPlayer`.
     :return: The results of the game, also passed to each player via :meth:`Player.handle_game_end`.
     """
+    if isinstance(white_player, AsyncPlayer) or isinstance(black_player, AsyncPlayer):
+        if observer is not None:
+            raise ValueError('Observers are not supported in games with an AsyncPlayer')
+        if game is not None:
+            raise ValueError('Custom games are not supported in games with an AsyncPlayer')
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(async_play_local_game(white_player, black_player, seconds_per_player))
+        finally:
+            loop.close()
+
     players = [black_player, white_player]
 
-    game = LocalGame(seconds_per_player=seconds_per_player)
+    if game is None:
+        game = LocalGame(seconds_per_player=seconds_per_player)
 
     white_player.handle_game_start(chess.WHITE, game.board.copy())
     black_player.handle_game_start(chess.BLACK, game.board.copy())
+    if observer is not None:
+        observer.handle_game_start(chess.WHITE, white_player)
+        observer.handle_game_start(chess.BLACK, black_player)
     game.start()
 
     while not game.is_over():
-        play_turn(game, players[game.turn])
+        play_turn(game, players[game.turn], observer)
 
     game.end()
     winner_color = game.get_winner_color()
@@ -36,28 +68,54 @@ def play_local_game(white_player: Player, black_player: Player, seconds_per_play
 
     white_player.handle_game_end(winner_color, win_reason, game_history)
     black_player.handle_game_end(winner_color, win_reason, game_history)
+    if observer is not None:
+        observer.handle_game_end(winner_color, win_reason, game_history)
 
     return winner_color, win_reason, game_history
 
 
-def play_remote_game(name, game_id, player: Player):
-    game = RemoteGame(game_id)
+def play_remote_game(name, game_id, player: Player, server_url: str = 'http://localhost:5000',
+                     long_poll_seconds: float = 30, observer: GameObserver = None) -> Tuple[
+    Optional[Color], Optional[WinReason], GameHistory]:
+    """
+    Plays a game hosted on a server as `name`. Uses :class:`RemoteGame` to talk to the server, waiting for each of
+    the player's turns with :meth:`RemoteGame.wait_for_turn` and then calling :func:`play_turn`.
+
+    :param name: The name of the player on the server.
+    :param game_id: The id of the game on the server.
+    :param player: The :class:`Player` to play the game with.
+    :param server_url: The URL of the server.
+    :param long_poll_seconds: The longest time to wait for a response to a single long-poll request.
+    :param observer: Optional :class:`~reconchess.instrumentation.GameObserver` to tell about the player's turns.
+    :return: The results of the game, also passed to the player via :meth:`Player.handle_game_end`.
+    """
+    game = RemoteGame(game_id, server_url=server_url, long_poll_seconds=long_poll_seconds)
 
     color = game.get_player_color(name)
 
     player.handle_game_start(color, game.get_starting_board())
+    if observer is not None:
+        observer.handle_game_start(color, player)
     game.start()
 
-    while not game.is_over():
+    while True:
         game.wait_for_turn(name)
-        play_turn(game, player)
+        if game.is_over():
+            break
+        play_turn(game, player, observer)
 
-    # TODO get win reason here
+    winner_color = game.get_winner_color()
+    win_reason = game.get_win_reason()
+    game_history = game.get_game_history()
 
-    player.handle_game_end(game.get_winner_color(), game.get_game_history())
+    player.handle_game_end(winner_color, win_reason, game_history)
+    if observer is not None:
+        observer.handle_game_end(winner_color, win_reason, game_history)
+
+    return winner_color, win_reason, game_history
 
 
-def play_turn(game: Game, player: Player):
+def play_turn(game: Game, player: Player, observer: GameObserver = None):
     """
     Coordinates playing a turn for `player` in `game`. Does the following sequentially:
 
@@ -66,9 +124,17 @@ def play_turn(game: Game, player: Player):
     #. :func:`play_move`
     #. :meth:`Game.end_turn`
 
+    If an `observer` is given, the turn is played with :func:`~reconchess.instrumentation.play_observed_turn`
+    instead, which does the same steps but times each of them.
+
     :param game: The :class:`Game` that `player` is playing in.
     :param player: The :class:`Player` whose turn it is.
+    :param observer: Optional :class:`~reconchess.instrumentation.GameObserver` to tell about the turn.
     """
+    if observer is not None:
+        play_observed_turn(game, player, observer)
+        return
+
     sense_actions = game.sense_actions()
     move_actions = game.move_actions()
 
@@ -129,3 +195,122 @@ def play_move(game: Game, player: Player, move_actions: List[chess.Move]):
     requested_move, taken_move, opt_enemy_capture_square = game.move(move)
     player.handle_move_result(requested_move, taken_move,
                               opt_enemy_capture_square is not None, opt_enemy_capture_square)
+
+
+async def _call(player, method_name: str, *args):
+    # lets the async game loop drive both :class:`Player` and :class:`AsyncPlayer`
+    result = getattr(player, method_name)(*args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def async_play_local_game(white_player: Union[Player, AsyncPlayer], black_player: Union[Player, AsyncPlayer],
+                                seconds_per_player: float = 900) -> Tuple[Optional[Color], Optional[WinReason],
+                                                                          GameHistory]:
+    """
+    Coroutine version of :func:`play_local_game`. Each player can be either an :class:`AsyncPlayer`, whose methods are
+    awaited, or a :class:`Player`, whose methods are called directly.
+
+    Many games can be played concurrently on one event loop, so while one player is waiting on an engine or the
+    network, the other games keep going. Between turns the game yields to the other games on the loop, and the next
+    player's clock only starts once the game resumes, so players aren't charged for the time other games spend on
+    the loop. Time spent awaiting a player's own coroutines still counts against the player.
+
+    Example of playing 100 games at once: ::
+
+        async def play_games():
+            return await asyncio.gather(*[async_play_local_game(MyAsyncBot(), MyAsyncBot()) for _ in range(100)])
+
+        results = asyncio.get_event_loop().run_until_complete(play_games())
+
+    :param white_player: The white player.
+    :param black_player: The black player.
+    :param seconds_per_player: The number of seconds each player has to play the entire game.
+    :return: The results of the game, also passed to each player via :meth:`Player.handle_game_end`.
+    """
+    players = [black_player, white_player]
+
+    game = LocalGame(seconds_per_player=seconds_per_player)
+
+    await _call(white_player, 'handle_game_start', chess.WHITE, game.board.copy())
+    await _call(black_player, 'handle_game_start', chess.BLACK, game.board.copy())
+    game.start()
+
+    while not game.is_over():
+        await async_play_turn(game, players[game.turn])
+
+        # let other games run between turns, even if neither player awaited anything
+        await asyncio.sleep(0)
+
+        # restart the clock of the player to move, since it was running while the other games had the loop
+        game.start()
+
+    game.end()
+    winner_color = game.get_winner_color()
+    win_reason = game.get_win_reason()
+    game_history = game.get_game_history()
+
+    await _call(white_player, 'handle_game_end', winner_color, win_reason, game_history)
+    await _call(black_player, 'handle_game_end', winner_color, win_reason, game_history)
+
+    return winner_color, win_reason, game_history
+
+
+async def async_play_turn(game: Game, player: Union[Player, AsyncPlayer]):
+    """
+    Coroutine version of :func:`play_turn`.
+
+    :param game: The :class:`Game` that `player` is playing in.
+    :param player: The :class:`Player` or :class:`AsyncPlayer` whose turn it is.
+    """
+    sense_actions = game.sense_actions()
+    move_actions = game.move_actions()
+
+    await async_notify_opponent_move_results(game, player)
+
+    await async_play_sense(game, player, sense_actions, move_actions)
+
+    await async_play_move(game, player, move_actions)
+
+    game.end_turn()
+
+
+async def async_notify_opponent_move_results(game: Game, player: Union[Player, AsyncPlayer]):
+    """
+    Coroutine version of :func:`notify_opponent_move_results`.
+
+    :param game: The :class:`Game` that `player` is playing in.
+    :param player: The :class:`Player` or :class:`AsyncPlayer` whose turn it is.
+    """
+    opt_capture_square = game.opponent_move_results()
+    await _call(player, 'handle_opponent_move_result', opt_capture_square is not None, opt_capture_square)
+
+
+async def async_play_sense(game: Game, player: Union[Player, AsyncPlayer], sense_actions: List[Square],
+                           move_actions: List[chess.Move]):
+    """
+    Coroutine version of :func:`play_sense`.
+
+    :param game: The :class:`Game` that `player` is playing in.
+    :param player: The :class:`Player` or :class:`AsyncPlayer` whose turn it is.
+    :param sense_actions: The possible sense actions for `player`.
+    :param move_actions: The possible move actions for `player`.
+    """
+    sense = await _call(player, 'choose_sense', sense_actions, move_actions, game.get_seconds_left())
+    sense_result = game.sense(sense)
+    await _call(player, 'handle_sense_result', sense_result)
+
+
+async def async_play_move(game: Game, player: Union[Player, AsyncPlayer], move_actions: List[chess.Move]):
+    """
+    Coroutine version of :func:`play_move`.
+
+    :param game: The :class:`Game` that `player` is playing in.
+    :param player: The :class:`Player` or :class:`AsyncPlayer` whose turn it is.
+    :param move_actions: The possible move actions for `player`.
+    """
+    move = await _call(player, 'choose_move', move_actions, game.get_seconds_left())
+    requested_move, taken_move, opt_enemy_capture_square = game.move(move)
+    await _call(player, 'handle_move_result', requested_move, taken_move,
+                opt_enemy_capture_square is not None, opt_enemy_capture_square)
@@ -5,6 +5,7 @@ import inspect
 from abc import abstractmethod
 import chess
 from .types import *
+from typing import Union
 from .history import GameHistory
 
 
@@ -172,9 +173,65 @@ class Player(object):
         pass
 
 
-def load_player(source_path: str) -> Tuple[str, Type[Player]]:
+class AsyncPlayer(object):
     """
-    Loads a subclass of the Player class that is contained in a python source file or python module.
+    Base class of a player whose methods are coroutines. It has the same methods as :class:`Player`, called in the
+    same order, but each one is defined with `async def`. This lets a player wait on I/O, like an engine search or a
+    network request, without blocking the other games running on the same event loop. See
+    :func:`async_play_local_game`.
+
+    Example implementation: ::
+
+        class MyAsyncBot(AsyncPlayer):
+            async def choose_move(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
+                result = await self.engine_pool.play_async(self.board, chess.engine.Limit(time=0.5))
+                return result.move
+
+    See :class:`Player` for documentation of each of the methods.
+    """
+
+    @abstractmethod
+    async def handle_game_start(self, color: Color, board: chess.Board):
+        """See :meth:`Player.handle_game_start()`."""
+        pass
+
+    @abstractmethod
+    async def handle_opponent_move_result(self, captured_my_piece: bool, capture_square: Optional[Square]):
+        """See :meth:`Player.handle_opponent_move_result()`."""
+        pass
+
+    @abstractmethod
+    async def choose_sense(self, sense_actions: List[Square], move_actions: List[chess.Move],
+                           seconds_left: float) -> Square:
+        """See :meth:`Player.choose_sense()`."""
+        pass
+
+    @abstractmethod
+    async def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+        """See :meth:`Player.handle_sense_result()`."""
+        pass
+
+    @abstractmethod
+    async def choose_move(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
+        """See :meth:`Player.choose_move()`."""
+        pass
+
+    @abstractmethod
+    async def handle_move_result(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                                 captured_opponent_piece: bool, capture_square: Optional[Square]):
+        """See :meth:`Player.handle_move_result()`."""
+        pass
+
+    @abstractmethod
+    async def handle_game_end(self, winner_color: Optional[Color], win_reason: Optional[WinReason],
+                              game_history: GameHistory):
+        """See :meth:`Player.handle_game_end()`."""
+        pass
+
+
+def load_player(source_path: str) -> Tuple[str, Union[Type[Player], Type[AsyncPlayer]]]:
+    """
+    Loads a subclass of the Player or AsyncPlayer class that is contained in a python source file or python module.
     There should only be 1 such subclass in the file or module. If there are more than 1 subclasses, then you have
     to define a function named `get_player` in the same module that returns the subclass to use.
 
@@ -232,7 +289,8 @@ def load_player(source_path: str) -> Tuple[str, Type[Player]]:
         module_name = source_path
 
     module = importlib.import_module(module_name)
-    players = inspect.getmembers(module, lambda o: inspect.isclass(o) and issubclass(o, Player) and o != Player)
+    players = inspect.getmembers(module, lambda o: inspect.isclass(o) and issubclass(o, (Player, AsyncPlayer))
+                                                   and o not in (Player, AsyncPlayer))
     get_player_fns = inspect.getmembers(module, lambda o: inspect.isfunction(o) and o.__name__ == 'get_player')
     if len(players) == 0:
         raise RuntimeError('{} did not contain any subclasses of {}'.format(source_path, Player))
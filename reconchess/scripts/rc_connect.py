@@ -1,20 +1,143 @@
 import argparse
 import multiprocessing
-from reconchess import load_player
-from reconchess import play_remote_game
+import time
+import chess
+import requests
+from typing import List
+from reconchess import load_player, play_remote_game
+from reconchess.game import remote_session
 
-parser = argparse.ArgumentParser()
-parser.add_argument('server', help='url to the server')
-parser.add_argument('auth_file', help='path to the file that contains auth information')
-parser.add_argument('bot_path', help='path to white bot source file')
-parser.add_argument('--max_games', type=int, help='the maximum number of bots to start up')
-args = parser.parse_args()
+# the player class loaded by each worker process, see _init_worker
+_worker_player_cls = None
 
-bot_name, bot_cls = load_player(args.white_bot_path)
 
+def _init_worker(bot_path):
+    # runs once in each worker process, so the bot module (and anything it sets up on import) is only loaded once
+    global _worker_player_cls
+    _, _worker_player_cls = load_player(bot_path)
 
-def spawn_bot(game_id):
-    player = bot_cls()
-    multiprocessing.Process(target=play_remote_game, args=(bot_name, game_id, player))
 
-# TODO make requests to server to see if any games are open for this player. if so, call spawn_bot()
+def _play_game(job):
+    name, game_id, server_url = job
+    try:
+        winner_color, win_reason, history = play_remote_game(name, game_id, _worker_player_cls(),
+                                                             server_url=server_url)
+    except Exception as e:
+        return game_id, None, None, repr(e)
+    return game_id, winner_color, win_reason, None
+
+
+class BotConnector(object):
+    """
+    Connects a bot to a server and plays every challenge sent to it, with at most `max_games` games at once. Games
+    are played in a pool of `max_games` worker processes that are started once and reused for every game. Each worker
+    loads the bot with :func:`load_player` when it starts, so games don't pay for importing the bot, and engines the
+    bot starts on import (e.g. with :func:`reconchess.engine.default_engine_pool`) stay warm between games.
+
+    Challenges are only accepted while a worker is free, so challenges beyond `max_games` wait on the server until a
+    game finishes.
+
+    :param server_url: The URL of the server.
+    :param name: The name of the player on the server.
+    :param bot_path: The path to the bot source file or module, see :func:`load_player`.
+    :param max_games: The maximum number of games to play at once.
+    """
+
+    def __init__(self, server_url: str, name: str, bot_path: str, max_games: int = 1):
+        self.server_url = server_url.rstrip('/')
+        self.name = name
+        self.bot_path = bot_path
+        self.max_games = max_games
+        self.session = remote_session(self.server_url)
+        self.game_ids = set()
+        self.results = []
+
+        # load the bot here too, so a bad path fails before any workers start
+        load_player(bot_path)
+
+        self.pool = multiprocessing.Pool(processes=max_games, initializer=_init_worker, initargs=(bot_path,))
+
+    def _request(self, method: str, endpoint: str, **kwargs) -> dict:
+        response = self.session.request(method, '{}/api/{}'.format(self.server_url, endpoint), timeout=30, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def _game_over(self, result):
+        game_id, winner_color, win_reason, error = result
+        self.results.append(result)
+        self.game_ids.discard(game_id)
+
+    def poll(self) -> List[int]:
+        """
+        Accepts open challenges while there are free workers, and starts playing their games.
+
+        :return: The ids of the games that were started.
+        """
+        started_game_ids = []
+        challenges = self._request('GET', 'challenge/get', params={'name': self.name})['challenges']
+        for challenge in challenges:
+            if len(self.game_ids) >= self.max_games:
+                break
+
+            game_id = self._request('POST', 'challenge/accept', json={
+                'name': self.name, 'challenge_id': challenge['challenge_id']})['game_id']
+            self.game_ids.add(game_id)
+            started_game_ids.append(game_id)
+            self.pool.apply_async(_play_game, ((self.name, game_id, self.server_url),), callback=self._game_over)
+        return started_game_ids
+
+    def run(self, poll_seconds: float = 5):
+        """
+        Polls the server for challenges every `poll_seconds` seconds until interrupted.
+        """
+        while True:
+            try:
+                for game_id in self.poll():
+                    print('Playing game {}'.format(game_id))
+            except requests.RequestException as e:
+                print('Failed to reach the server: {}'.format(e))
+
+            while self.results:
+                game_id, winner_color, win_reason, error = self.results.pop(0)
+                if error is not None:
+                    print('Game {} failed with {}'.format(game_id, error))
+                elif winner_color is None:
+                    print('Game {} over: draw'.format(game_id))
+                else:
+                    print('Game {} over: {} won because of {}'.format(
+                        game_id, chess.COLOR_NAMES[winner_color], win_reason))
+
+            time.sleep(poll_seconds)
+
+    def close(self):
+        """
+        Waits for the games in progress to finish and stops the workers.
+        """
+        self.pool.close()
+        self.pool.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Connects a bot to a server and plays the challenges sent to it.')
+    parser.add_argument('server', help='url to the server')
+    parser.add_argument('auth_file', help='path to the file that contains auth information. The first line is the name '
+                                          'to play as on the server.')
+    parser.add_argument('bot_path', help='path to bot source file or bot module')
+    parser.add_argument('--max_games', type=int, default=1, help='the maximum number of games to play at once')
+    parser.add_argument('--poll_seconds', type=float, default=5, help='seconds between checks for new challenges')
+    args = parser.parse_args()
+
+    with open(args.auth_file) as fp:
+        name = fp.readline().strip()
+
+    connector = BotConnector(args.server, name, args.bot_path, max_games=args.max_games)
+    print('Connected to {} as {}, playing up to {} games at once'.format(args.server, name, args.max_games))
+    try:
+        connector.run(args.poll_seconds)
+    except KeyboardInterrupt:
+        print('Waiting for the games in progress to finish...')
+        connector.close()
+
+
+if __name__ == '__main__':
+    main()
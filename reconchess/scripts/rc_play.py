@@ -3,6 +3,7 @@ import argparse
 import random
 import contextlib
 from reconchess import *
+from reconchess.utilities import SENSE_WINDOWS
 import datetime
 
 # block output from pygame
@@ -170,7 +171,7 @@ class UIPlayer(Player):
             if self.window.mouse_on_board():
                 square = self.window.coords_to_square(*pygame.mouse.get_pos())
                 if square in sense_actions:
-                    sense_area = self._squares_in_sense_around(square)
+                    sense_area = SENSE_WINDOWS[square]
                 else:
                     sense_area = []
             else:
@@ -184,16 +185,6 @@ class UIPlayer(Player):
                 if square in sense_actions:
                     return square
 
-    def _squares_in_sense_around(self, center):
-        rank, file = chess.square_rank(center), chess.square_file(center)
-        squares = []
-        for dr in [-1, 0, 1]:
-            for df in [-1, 0, 1]:
-                r, f = rank + dr, file + df
-                if 0 <= r < 8 and 0 <= f < 8:
-                    squares.append(chess.square(f, r))
-        return squares
-
     def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
         for square, piece in sense_result:
             self.board.set_piece_at(square, piece)
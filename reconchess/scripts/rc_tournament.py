@@ -0,0 +1,184 @@
+import argparse
+import collections
+import itertools
+import multiprocessing
+import os
+import chess
+from reconchess import load_player, play_local_game, WinReason
+from reconchess.archive import HistoryArchive
+
+
+def round_robin_schedule(bot_paths, num_games):
+    """
+    Every bot plays every other bot `num_games` times, alternating which bot plays white.
+
+    :return: List of (white bot path, black bot path) tuples.
+    """
+    schedule = []
+    for bot_a, bot_b in itertools.combinations(bot_paths, 2):
+        for i in range(num_games):
+            schedule.append((bot_a, bot_b) if i % 2 == 0 else (bot_b, bot_a))
+    return schedule
+
+
+def gauntlet_schedule(bot_paths, num_games):
+    """
+    The first bot plays every other bot `num_games` times, alternating which bot plays white.
+
+    :return: List of (white bot path, black bot path) tuples.
+    """
+    challenger, opponents = bot_paths[0], bot_paths[1:]
+    schedule = []
+    for opponent in opponents:
+        for i in range(num_games):
+            schedule.append((challenger, opponent) if i % 2 == 0 else (opponent, challenger))
+    return schedule
+
+
+SCHEDULES = {
+    'round_robin': round_robin_schedule,
+    'gauntlet': gauntlet_schedule,
+}
+
+
+# bots loaded in this process, by path, so each worker loads each bot once
+_players_by_path = {}
+
+
+def load_cached_player(bot_path):
+    """
+    :return: The (name, player class) tuple from :func:`load_player`, loading each path only once per process.
+    """
+    if bot_path not in _players_by_path:
+        _players_by_path[bot_path] = load_player(bot_path)
+    return _players_by_path[bot_path]
+
+
+def play_scheduled_game(job):
+    """
+    Plays a single game of the tournament and saves its history, either to its own file in the replay directory or
+    to the end of a :class:`HistoryArchive`. Runs inside a pool worker, so bots are loaded from their paths here with
+    :func:`load_cached_player`. Errors while loading, playing or saving are returned instead of raised, so that one
+    failed game doesn't stop the tournament.
+
+    :param job: Tuple of (game number, white bot path, black bot path, seconds per player, replay directory, archive
+        path). The archive path is `None` to save to the replay directory instead.
+    :return: Tuple of (game number, white bot path, black bot path, winner color, win reason, replay path, error).
+    """
+    game_number, white_bot_path, black_bot_path, seconds_per_player, replay_dir, archive_path = job
+
+    try:
+        white_bot_name, white_player_cls = load_cached_player(white_bot_path)
+        black_bot_name, black_player_cls = load_cached_player(black_bot_path)
+
+        winner_color, win_reason, history = play_local_game(white_player_cls(), black_player_cls(),
+                                                            seconds_per_player=seconds_per_player)
+
+        winner = 'Draw' if winner_color is None else chess.COLOR_NAMES[winner_color]
+        if archive_path is not None:
+            HistoryArchive(archive_path).append(history, {
+                'game_number': game_number, 'white': white_bot_name, 'black': black_bot_name, 'winner': winner,
+                'win_reason': None if win_reason is None else win_reason.name,
+            })
+            replay_path = archive_path
+        else:
+            replay_path = os.path.join(replay_dir, '{}-{}-{}-{}.json'.format(
+                white_bot_name, black_bot_name, winner, game_number))
+            history.save(replay_path)
+    except Exception as e:
+        return game_number, white_bot_path, black_bot_path, None, None, None, repr(e)
+
+    return game_number, white_bot_path, black_bot_path, winner_color, win_reason, replay_path, None
+
+
+class TournamentResults(object):
+    """
+    Win/loss/draw/timeout tallies for each pairing of bots. Pairings are unordered, so the games where A was white
+    and the games where B was white are tallied together.
+    """
+
+    def __init__(self):
+        self.tallies = collections.OrderedDict()
+
+    def _tally(self, bot_a, bot_b):
+        key = tuple(sorted([bot_a, bot_b]))
+        if key not in self.tallies:
+            self.tallies[key] = {'wins': collections.Counter(), 'draws': 0, 'timeouts': 0, 'errors': 0}
+        return self.tallies[key]
+
+    def add(self, white_bot, black_bot, winner_color, win_reason, error=None):
+        tally = self._tally(white_bot, black_bot)
+        if error is not None:
+            tally['errors'] += 1
+            return
+
+        if winner_color is None:
+            tally['draws'] += 1
+        else:
+            tally['wins'][white_bot if winner_color == chess.WHITE else black_bot] += 1
+
+        if win_reason == WinReason.TIMEOUT:
+            tally['timeouts'] += 1
+
+    def summary_lines(self, names):
+        lines = []
+        for (bot_a, bot_b), tally in self.tallies.items():
+            lines.append('{} vs {}: {}-{} wins, {} draws, {} timeouts, {} errors'.format(
+                names[bot_a], names[bot_b], tally['wins'][bot_a], tally['wins'][bot_b],
+                tally['draws'], tally['timeouts'], tally['errors']))
+        return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plays many games between bots in parallel using a process pool.')
+    parser.add_argument('bot_paths', nargs='+', help='paths to bot source files or bot modules')
+    parser.add_argument('--schedule', default='round_robin', choices=sorted(SCHEDULES.keys()),
+                        help='round_robin plays every pair of bots, gauntlet plays the first bot against the rest.')
+    parser.add_argument('--num_games', default=2, type=int,
+                        help='number of games to play for each pairing of bots.')
+    parser.add_argument('--seconds_per_player', default=900, type=float,
+                        help='number of seconds each player has to play the entire game.')
+    parser.add_argument('--processes', default=None, type=int,
+                        help='number of worker processes to use. Defaults to the number of cores.')
+    parser.add_argument('--replay_dir', default='.', help='directory to save replays to.')
+    parser.add_argument('--archive', default=None,
+                        help='path of a history archive to append every game to, instead of saving each game to its '
+                             'own file in replay_dir.')
+    args = parser.parse_args()
+
+    if len(args.bot_paths) < 2:
+        parser.error('at least two bots are required')
+
+    # load each bot once up front so bad paths are reported before any games start
+    names = {bot_path: load_cached_player(bot_path)[0] for bot_path in args.bot_paths}
+
+    if args.archive is None:
+        os.makedirs(args.replay_dir, exist_ok=True)
+
+    schedule = SCHEDULES[args.schedule](args.bot_paths, args.num_games)
+    jobs = [(game_number, white_bot_path, black_bot_path, args.seconds_per_player, args.replay_dir, args.archive)
+            for game_number, (white_bot_path, black_bot_path) in enumerate(schedule)]
+
+    print('Playing {} games on {} processes...'.format(len(jobs), args.processes or multiprocessing.cpu_count()))
+
+    results = TournamentResults()
+    with multiprocessing.Pool(processes=args.processes) as pool:
+        for result in pool.imap_unordered(play_scheduled_game, jobs):
+            game_number, white_bot_path, black_bot_path, winner_color, win_reason, replay_path, error = result
+            results.add(white_bot_path, black_bot_path, winner_color, win_reason, error)
+
+            white_bot_name, black_bot_name = names[white_bot_path], names[black_bot_path]
+            if error is not None:
+                print('Game {}: {} vs {} failed with {}'.format(game_number, white_bot_name, black_bot_name, error))
+            else:
+                winner = 'Draw' if winner_color is None else (white_bot_name if winner_color else black_bot_name)
+                print('Game {}: {} vs {} -> {} ({}), saved to {}'.format(
+                    game_number, white_bot_name, black_bot_name, winner, win_reason, replay_path))
+
+    print('Tournament Over!')
+    for line in results.summary_lines(names):
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
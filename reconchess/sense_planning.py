@@ -0,0 +1,99 @@
+import chess
+import chess.polyglot
+import numpy as np
+from .types import *
+from .board_set import BoardSet
+
+# observations are hashed to this many bits, and each sense has a bucket for every key. any two distinct observations
+# of a sense share a key with probability 2 ** -_KEY_BITS, which merges them and underestimates the information gain
+# of the sense. a sense that can see k distinct observations has about k ** 2 / 2 ** (_KEY_BITS + 1) such merges
+_KEY_BITS = 14
+
+# _OBSERVATION_KEYS[column, rank, file] is xored into the key of every sense covering the square at rank and file
+# when it is set in that column of BoardSet.bitboards
+_OBSERVATION_KEYS = (np.array(chess.polyglot.POLYGLOT_RANDOM_ARRAY[:7 * 64], dtype=np.uint64) >>
+                     np.uint64(64 - _KEY_BITS)).astype(np.uint16).reshape(7, 8, 8, 1)
+
+_BIT_SHIFTS = np.arange(8, dtype=np.uint8).reshape(1, 1, 8, 1)
+
+_SENSE_OFFSETS = (np.arange(64, dtype=np.intp) << _KEY_BITS).reshape(64, 1)
+
+
+def observation_keys(board_set: BoardSet) -> np.ndarray:
+    """
+    Hashes what every sense would see on every board of a set, i.e. the pieces in its 3x3 window. Two boards that
+    look the same to a sense always get the same key for it, and two boards that look different almost always get
+    different keys.
+
+    :param board_set: The boards.
+    :return: Array of shape (64, n) with the key of the sense centered on each :class:`Square` for each board.
+    """
+    num_boards = len(board_set)
+    bitboards = np.ascontiguousarray(board_set.bitboards.T)
+    ranks = np.empty(bitboards.shape[:1] + (8, num_boards), dtype=np.uint8)
+    for rank in range(8):
+        np.copyto(ranks[:, rank], bitboards >> np.uint64(8 * rank), casting='unsafe')
+
+    # the key of each square is the xor of the keys of the bitboards it is set in, then the keys of each window are
+    # combined a row at a time. boards are along the last axis so every xor runs over contiguous memory
+    bits = (ranks[:, :, np.newaxis, :] >> _BIT_SHIFTS) & 1
+    square_keys = bits[0] * _OBSERVATION_KEYS[0]
+    for column in range(1, len(bits)):
+        square_keys ^= bits[column] * _OBSERVATION_KEYS[column]
+
+    row_keys = square_keys.copy()
+    row_keys[:, 1:] ^= square_keys[:, :-1]
+    row_keys[:, :-1] ^= square_keys[:, 1:]
+    window_keys = row_keys.copy()
+    window_keys[1:] ^= row_keys[:-1]
+    window_keys[:-1] ^= row_keys[1:]
+    return window_keys.reshape(64, num_boards)
+
+
+def expected_information_gains(board_set: BoardSet) -> np.ndarray:
+    """
+    Computes how much every sense is expected to reduce the entropy of a weighted set of candidate boards, treating
+    the normalized weights as the probability of each board being the true board. A sense result is determined by the
+    true board, so the expected reduction is the entropy of the distribution of its results: the boards are bucketed
+    by the key of what they show the sense (see :func:`observation_keys`), and a sense that splits the weight evenly
+    between many buckets gains the most.
+
+    Boards that look different to a sense can share a key, so the gains are estimates that are never too large. The
+    estimates are exact for most sets of candidate boards, and a sense that can see hundreds of different results is
+    underestimated by a few hundredths of a bit. An edge sense covers a subset of the squares of the sense next to
+    it, so it can't be expected to gain more than that sense.
+
+    Examples:
+        >>> gains = expected_information_gains(BoardSet([chess.Board()]).expand(None))
+        >>> float(gains[chess.E7]), float(gains[chess.E2])
+        (0.0, 1.854...)
+
+    :param board_set: The candidate boards, with their weights.
+    :return: Array with the expected information gain in bits of the sense centered on each :class:`Square`.
+    """
+    total_weight = board_set.weights.sum()
+    if len(board_set) == 0 or total_weight <= 0:
+        return np.zeros(64)
+
+    buckets = observation_keys(board_set) + _SENSE_OFFSETS
+    bucket_weights = np.bincount(buckets.ravel(), weights=np.tile(board_set.weights, 64),
+                                 minlength=64 << _KEY_BITS).reshape(64, -1)
+    bucket_weights = np.where(bucket_weights > 0, bucket_weights, 1)
+    gains = np.log2(total_weight) - (bucket_weights * np.log2(bucket_weights)).sum(axis=1) / total_weight
+    return np.maximum(gains, 0)
+
+
+def best_information_sense(board_set: BoardSet, candidates: List[Square] = None) -> Square:
+    """
+    Gets the sense with the largest :func:`expected_information_gains`. Ties go to the first candidate.
+
+    :param board_set: The candidate boards, with their weights.
+    :param candidates: Optional list of the :class:`Square` that can be chosen, such as the `sense_actions` passed to
+        :meth:`Player.choose_sense`. Defaults to every square.
+    :return: The center :class:`Square` of the best sense.
+    """
+    gains = expected_information_gains(board_set)
+    if candidates is None:
+        return int(gains.argmax())
+    candidates = np.asarray(candidates)
+    return int(candidates[gains[candidates].argmax()])
@@ -1,8 +1,33 @@
+import itertools
 import chess
+import chess.polyglot
+from typing import Dict, Iterable
 from .types import *
 
 BACK_RANKS = list(chess.SquareSet(chess.BB_BACKRANKS))
 
+PROMOTION_PIECE_TYPES = chess.PIECE_TYPES[1:-1]
+
+
+def _sense_window(square: Square) -> Tuple[Square, ...]:
+    rank, file = chess.square_rank(square), chess.square_file(square)
+    return tuple(chess.square(file + delta_file, rank + delta_rank)
+                 for delta_rank in [1, 0, -1] for delta_file in [-1, 0, 1]
+                 if 0 <= rank + delta_rank <= 7 and 0 <= file + delta_file <= 7)
+
+
+SENSE_WINDOWS = [_sense_window(square) for square in chess.SQUARES]
+"""The squares in the 3x3 sense centered on each square, in the order they appear in a sense result (top row
+first, left to right)."""
+
+SENSE_WINDOW_MASKS = [sum(chess.BB_SQUARES[window_square] for window_square in window) for window in SENSE_WINDOWS]
+"""Bitboard of the squares in the 3x3 sense centered on each square."""
+
+CASTLING_MOVES = [chess.Move(chess.E1, chess.G1), chess.Move(chess.E1, chess.C1),
+                  chess.Move(chess.E8, chess.G8), chess.Move(chess.E8, chess.C8)]
+"""The king moves of every castle. python-chess only generates these when the king doesn't pass through check, but in
+reconnaissance chess a castle only needs the castling rights and empty squares, see :func:`is_psuedo_legal_castle`."""
+
 
 def add_pawn_queen_promotion(board: chess.Board, move: chess.Move) -> chess.Move:
     piece = board.piece_at(move.from_square)
@@ -29,8 +54,7 @@ def is_illegal_castle(board: chess.Board, move: chess.Move) -> bool:
 
     # illegal if any pieces are between king & rook
     rook_square = chess.square(7 if board.is_kingside_castling(move) else 0, chess.square_rank(move.from_square))
-    between_squares = chess.SquareSet(chess.BB_BETWEEN[move.from_square][rook_square])
-    if any(map(lambda s: board.piece_at(s), between_squares)):
+    if board.occupied & chess.BB_BETWEEN[move.from_square][rook_square]:
         return True
 
     # its legal
@@ -38,16 +62,49 @@ def is_illegal_castle(board: chess.Board, move: chess.Move) -> bool:
 
 
 def slide_move(board: chess.Board, move: chess.Move) -> Optional[chess.Move]:
-    psuedo_legal_moves = list(board.generate_pseudo_legal_moves())
-    squares = list(chess.SquareSet(chess.BB_BETWEEN[move.from_square][move.to_square])) + [move.to_square]
-    squares = sorted(squares, key=lambda s: chess.square_distance(s, move.from_square), reverse=True)
-    for slide_square in squares:
+    slide_mask = chess.BB_BETWEEN[move.from_square][move.to_square] | chess.BB_SQUARES[move.to_square]
+
+    # only generate the moves of the piece being slid. note: to_mask can't be used to restrict these further since
+    # python-chess applies it to the rook square for castling moves
+    psuedo_legal_moves = set(board.generate_pseudo_legal_moves(from_mask=chess.BB_SQUARES[move.from_square]))
+
+    # squares along a ray are ordered by index, so scan from the far end of the path back towards the piece
+    slide_squares = chess.scan_reversed(slide_mask) if move.to_square > move.from_square \
+        else chess.scan_forward(slide_mask)
+    for slide_square in slide_squares:
         revised = chess.Move(move.from_square, slide_square, move.promotion)
         if revised in psuedo_legal_moves:
             return revised
     return None
 
 
+def revise_move(board: chess.Board, move: chess.Move) -> Optional[chess.Move]:
+    """
+    Gets the move that is actually taken when the player to move on `board` requests `move`, which must be one of
+    the game's move actions. Sliding pieces stop at the first piece in their way (capturing it if it is an opponent
+    piece), pawns can't capture on empty squares or move forward into pieces, and castles through pieces aren't taken.
+
+    :param board: The true board.
+    :param move: The requested move, with any queen promotion already added by :func:`add_pawn_queen_promotion`.
+    :return: The taken move, or `None` if the move has no effect.
+    """
+    # if its a legal move, don't change it at all. note that board.generate_psuedo_legal_moves() does not
+    # include psuedo legal castles
+    if move in board.generate_pseudo_legal_moves() or is_psuedo_legal_castle(board, move):
+        return move
+
+    # note: if there are pieces in the way, we DONT capture them
+    if is_illegal_castle(board, move):
+        return None
+
+    # if the piece is a sliding piece, slide it as far as it can go
+    piece = board.piece_at(move.from_square)
+    if piece.piece_type in [chess.PAWN, chess.ROOK, chess.BISHOP, chess.QUEEN]:
+        move = slide_move(board, move)
+
+    return move if move in board.generate_pseudo_legal_moves() else None
+
+
 def capture_square_of_move(board: chess.Board, move: Optional[chess.Move]) -> Optional[Square]:
     capture_square = None
     if move is not None and board.is_capture(move):
@@ -62,10 +119,18 @@ def capture_square_of_move(board: chess.Board, move: Optional[chess.Move]) -> Op
 
 def without_opponent_pieces(board: chess.Board) -> chess.Board:
     """Returns a copy of `board` with the opponent's pieces removed."""
-    b = board.copy()
-    for piece_type in chess.PIECE_TYPES:
-        for sq in b.pieces(piece_type, not board.turn):
-            b.remove_piece_at(sq)
+    # removing pieces clears the move stack, so there is no need to copy it
+    b = board.copy(stack=False)
+    keep_mask = ~b.occupied_co[not b.turn]
+    b.pawns &= keep_mask
+    b.knights &= keep_mask
+    b.bishops &= keep_mask
+    b.rooks &= keep_mask
+    b.queens &= keep_mask
+    b.kings &= keep_mask
+    b.promoted &= keep_mask
+    b.occupied &= keep_mask
+    b.occupied_co[not b.turn] = chess.BB_EMPTY
     return b
 
 
@@ -78,19 +143,239 @@ def pawn_capture_moves_on(board: chess.Board) -> List[chess.Move]:
     """Generates all pawn captures on `board`, even if there is no piece to capture. All promotion moves are included."""
     pawn_capture_moves = []
 
-    no_opponents_board = without_opponent_pieces(board)
-
-    for pawn_square in board.pieces(chess.PAWN, board.turn):
-        for attacked_square in board.attacks(pawn_square):
-            # skip this square if one of our own pieces are on the square
-            if no_opponents_board.piece_at(attacked_square):
-                continue
+    own_pieces = board.occupied_co[board.turn]
+    pawn_attacks = chess.BB_PAWN_ATTACKS[board.turn]
 
+    for pawn_square in chess.scan_forward(board.pawns & own_pieces):
+        # skip squares where one of our own pieces are
+        for attacked_square in chess.scan_forward(pawn_attacks[pawn_square] & ~own_pieces):
             pawn_capture_moves.append(chess.Move(pawn_square, attacked_square))
 
             # add in promotion moves
-            if attacked_square in chess.SquareSet(chess.BB_BACKRANKS):
-                for piece_type in chess.PIECE_TYPES[1:-1]:
+            if chess.BB_SQUARES[attacked_square] & chess.BB_BACKRANKS:
+                for piece_type in PROMOTION_PIECE_TYPES:
                     pawn_capture_moves.append(chess.Move(pawn_square, attacked_square, promotion=piece_type))
 
     return pawn_capture_moves
+
+
+def possible_taken_moves(board: chess.Board) -> List[Optional[chess.Move]]:
+    """
+    Gets every move that the player to move on `board` could end up taking, i.e. every result of :func:`revise_move`
+    for the player's move actions. These are the pseudo legal moves, the pseudo legal castles and passing (`None`).
+
+    :param board: The board, with the player to move.
+    :return: The distinct moves that could be taken.
+    """
+    moves = list(board.generate_pseudo_legal_moves())
+    moves.extend(_pseudo_legal_castles(board, moves))
+    moves.append(None)
+    return moves
+
+
+def consistent_taken_moves(board: chess.Board, capture_square: Optional[Square]) -> List[Optional[chess.Move]]:
+    """
+    Gets the moves in :func:`possible_taken_moves` that capture on `capture_square`, i.e. the moves the player to move
+    on `board` could have taken given what its opponent is told by :meth:`Game.opponent_move_results`. Only moves to
+    the capture square are generated, so this is much faster than filtering :func:`possible_taken_moves`.
+
+    Examples:
+        >>> board = chess.Board('4k3/8/8/3p4/4P3/8/8/4K3 b - - 0 1')
+        >>> consistent_taken_moves(board, chess.E4)
+        [Move.from_uci('d5e4')]
+
+    :param board: The board, with the player to move.
+    :param capture_square: The square a piece was captured on, or `None` if nothing was captured.
+    :return: The distinct moves that could have been taken.
+    """
+    opponent_pieces = board.occupied_co[not board.turn]
+
+    if capture_square is None:
+        # castles and passes never capture. pieces can't move onto their own pieces, so the only captures on squares
+        # without opponent pieces are en passant
+        moves = [move for move in board.generate_pseudo_legal_moves(to_mask=~opponent_pieces)
+                 if not board.is_en_passant(move)]
+        moves.extend(_pseudo_legal_castles(board, moves))
+        moves.append(None)
+        return moves
+
+    if not opponent_pieces & chess.BB_SQUARES[capture_square]:
+        return []
+
+    to_mask = chess.BB_SQUARES[capture_square]
+    if board.ep_square is not None and board.ep_square + (-8 if board.turn == chess.WHITE else 8) == capture_square:
+        to_mask |= chess.BB_SQUARES[board.ep_square]
+    return [move for move in board.generate_pseudo_legal_moves(to_mask=to_mask)
+            if capture_square_of_move(board, move) == capture_square]
+
+
+def successor_boards(boards: Iterable[chess.Board], capture_square: Optional[Square],
+                     weights: Iterable[float] = None) -> Dict[int, Tuple[chess.Board, float]]:
+    """
+    Gets every board that could follow one of `boards` after the player to move takes a move, given only whether
+    (and where) that move captured a piece. This is how a player updates its hypotheses about the true board when it
+    is told the result of its opponent's move. Moves are revised the same way :class:`LocalGame` does it (see
+    :func:`possible_taken_moves`), and every move is assumed to be equally likely.
+
+    Boards reached from several boards, or by several moves, are merged by their Zobrist hash
+    (:func:`chess.polyglot.zobrist_hash`) and their weights are added up. Each board's weight is split evenly between
+    all the moves in :func:`possible_taken_moves`, so the total weight of the successors is the probability of
+    `capture_square` under the weights of `boards`.
+
+    Examples:
+        >>> successors = successor_boards([chess.Board()], None)
+        >>> len(successors)
+        21
+        >>> board, weight = successors[chess.polyglot.zobrist_hash(chess.Board(
+        ...     'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1'))]
+        >>> weight
+        0.047619047619047616
+
+    :param boards: The boards before the move, with the player who moves to move. They aren't modified.
+    :param capture_square: The square a piece was captured on, or `None` if nothing was captured.
+    :param weights: Optional weight of each board, such as its likelihood. Defaults to 1 for each board.
+    :return: Dictionary from the Zobrist hash of each successor board to the board and its weight.
+    """
+    if weights is None:
+        weights = itertools.repeat(1.0)
+
+    successors = {}
+    for board, weight in zip(boards, weights):
+        moves = consistent_taken_moves(board, capture_square)
+        if not moves:
+            continue
+
+        move_weight = weight / _num_possible_taken_moves(board, moves, capture_square)
+        hasher = _SuccessorHasher(board)
+        for move in moves:
+            # most successors are reached from several boards, so they are only made once they are known to be new
+            key = hasher.hash(move)
+            if key in successors:
+                successor, successor_weight = successors[key]
+                successors[key] = (successor, successor_weight + move_weight)
+            else:
+                successor = board.copy(stack=False)
+                successor.push(move if move is not None else chess.Move.null())
+                successors[key] = (successor, move_weight)
+    return successors
+
+
+def _pseudo_legal_castles(board: chess.Board, moves: List[chess.Move]) -> List[chess.Move]:
+    # the castles that aren't in `moves` already. is_castling() doesn't check whose king it is, so the opponent's
+    # castles are skipped here
+    own_pieces = board.occupied_co[board.turn]
+    return [move for move in CASTLING_MOVES if own_pieces & chess.BB_SQUARES[move.from_square]
+            and move not in moves and is_psuedo_legal_castle(board, move)]
+
+
+def _num_possible_taken_moves(board: chess.Board, consistent_moves: List[Optional[chess.Move]],
+                              capture_square: Optional[Square]) -> int:
+    # same as len(possible_taken_moves(board)), but without generating the moves that were already generated
+    if capture_square is None:
+        captures = board.generate_pseudo_legal_moves(to_mask=board.occupied_co[not board.turn])
+        return len(consistent_moves) + sum(1 for _ in captures) + sum(1 for _ in board.generate_pseudo_legal_ep())
+    return len(possible_taken_moves(board))
+
+
+# _ZOBRIST_PIECES[color][piece_type][square] is the part of the Zobrist hash for that piece on that square
+_ZOBRIST_PIECES = [[None] + [[chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * ((piece_type - 1) * 2 + color) + square]
+                               for square in chess.SQUARES] for piece_type in chess.PIECE_TYPES]
+                   for color in [chess.BLACK, chess.WHITE]]
+_ZOBRIST_CASTLING = chess.polyglot.POLYGLOT_RANDOM_ARRAY[768:772]
+_ZOBRIST_EP_FILES = chess.polyglot.POLYGLOT_RANDOM_ARRAY[772:780]
+_ZOBRIST_WHITE_TURN = chess.polyglot.POLYGLOT_RANDOM_ARRAY[780]
+
+# the rook moves of the castles in CASTLING_MOVES, by the king's destination
+_CASTLING_ROOK_MOVES = {chess.G1: (chess.H1, chess.F1), chess.C1: (chess.A1, chess.D1),
+                        chess.G8: (chess.H8, chess.F8), chess.C8: (chess.A8, chess.D8)}
+
+
+class _SuccessorHasher(object):
+    """
+    Calculates :func:`chess.polyglot.zobrist_hash` of the boards after moves on `board` without making them. The hash
+    of the pieces is updated with only the pieces that move, and the castling rights and en passant square are
+    updated the same way :meth:`chess.Board.push` does it.
+    """
+
+    def __init__(self, board: chess.Board):
+        self.board = board
+        self.pieces_hash = 0
+        for color in chess.COLORS:
+            for piece_type, pieces in zip(chess.PIECE_TYPES, [board.pawns, board.knights, board.bishops, board.rooks,
+                                                              board.queens, board.kings]):
+                piece_keys = _ZOBRIST_PIECES[color][piece_type]
+                for square in chess.scan_forward(pieces & board.occupied_co[color]):
+                    self.pieces_hash ^= piece_keys[square]
+
+        # push() saves the board state before it updates the castling rights, so they are never cleaned
+        self.castling_rights = board.castling_rights
+        self.king_masks = [board.kings & board.occupied_co[color] & backrank & ~board.promoted
+                           for color, backrank in [(chess.BLACK, chess.BB_RANK_8), (chess.WHITE, chess.BB_RANK_1)]]
+        self.turn_hash = _ZOBRIST_WHITE_TURN if board.turn == chess.BLACK else 0
+        self.null_move_hash = self.pieces_hash ^ self.turn_hash ^ _castling_hash(self.castling_rights,
+                                                                                self.king_masks)
+
+    def hash(self, move: Optional[chess.Move]) -> int:
+        if move is None:
+            return self.null_move_hash
+
+        board = self.board
+        mover = board.turn
+        from_bb, to_bb = chess.BB_SQUARES[move.from_square], chess.BB_SQUARES[move.to_square]
+        piece_type = board.piece_type_at(move.from_square)
+        mover_keys = _ZOBRIST_PIECES[mover]
+        opponent_keys = _ZOBRIST_PIECES[not mover]
+        key = self.pieces_hash ^ mover_keys[piece_type][move.from_square] ^ self.turn_hash
+        king_masks = self.king_masks
+
+        captured_piece_type = None
+        if board.occupied_co[not mover] & to_bb:
+            captured_piece_type = board.piece_type_at(move.to_square)
+            key ^= opponent_keys[captured_piece_type][move.to_square]
+        elif piece_type == chess.PAWN and move.to_square == board.ep_square and \
+                abs(move.to_square - move.from_square) in [7, 9]:
+            key ^= opponent_keys[chess.PAWN][board.ep_square + (-8 if mover == chess.WHITE else 8)]
+
+        if piece_type == chess.KING and board.is_castling(move):
+            rook_from, rook_to = _CASTLING_ROOK_MOVES[move.to_square]
+            key ^= mover_keys[chess.KING][move.to_square] ^ mover_keys[chess.ROOK][rook_from] ^ \
+                mover_keys[chess.ROOK][rook_to]
+        else:
+            key ^= mover_keys[move.promotion or piece_type][move.to_square]
+
+        castling_rights = self.castling_rights & ~from_bb & ~to_bb
+        if piece_type == chess.KING and not board.promoted & from_bb:
+            castling_rights &= ~(chess.BB_RANK_1 if mover == chess.WHITE else chess.BB_RANK_8)
+        elif captured_piece_type == chess.KING and not board.promoted & to_bb:
+            if mover == chess.WHITE and chess.square_rank(move.to_square) == 7:
+                castling_rights &= ~chess.BB_RANK_8
+            elif mover == chess.BLACK and chess.square_rank(move.to_square) == 0:
+                castling_rights &= ~chess.BB_RANK_1
+        if captured_piece_type == chess.KING:
+            king_masks = list(king_masks)
+            king_masks[not mover] &= ~to_bb
+        if castling_rights:
+            key ^= _castling_hash(castling_rights, king_masks)
+
+        # the en passant square is only hashed if a pawn can capture on it
+        if piece_type == chess.PAWN and abs(move.to_square - move.from_square) == 16:
+            neighbors = chess.shift_left(to_bb) | chess.shift_right(to_bb)
+            if neighbors & board.pawns & board.occupied_co[not mover]:
+                key ^= _ZOBRIST_EP_FILES[chess.square_file(move.to_square)]
+
+        return key
+
+
+def _castling_hash(castling_rights: chess.Bitboard, king_masks: List[chess.Bitboard]) -> int:
+    # same as chess.polyglot.ZobristHasher.hash_castling() for a board with a move stack (so the castling rights
+    # aren't cleaned), given its castling rights and the kings on each back rank
+    key = 0
+    for color, backrank, kingside_index in [(chess.WHITE, chess.BB_RANK_1, 0), (chess.BLACK, chess.BB_RANK_8, 2)]:
+        king_mask = king_masks[color]
+        rights = castling_rights & backrank
+        if king_mask and rights:
+            if rights & ~((king_mask << 1) - 1):
+                key ^= _ZOBRIST_CASTLING[kingside_index]
+            if rights & (king_mask - 1):
+                key ^= _ZOBRIST_CASTLING[kingside_index + 1]
+    return key
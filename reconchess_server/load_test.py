@@ -0,0 +1,101 @@
+import argparse
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+from reconchess import play_remote_game
+from reconchess.bots.random_bot import RandomBot
+from reconchess.game import remote_session
+from . import server
+from .store import GameStore
+
+
+def play_remote_match(server_url: str, game_number: int, seconds_per_player: float, player_cls=RandomBot,
+                      long_poll_seconds: float = 30):
+    """
+    Creates a game on the server and plays both sides of it with `player_cls`, each on its own thread.
+
+    :return: The results of the game, see :func:`play_remote_game`.
+    """
+    white_name, black_name = 'white-{}'.format(game_number), 'black-{}'.format(game_number)
+    response = remote_session(server_url).post(server_url + '/api/game/new', json={
+        'white': white_name, 'black': black_name, 'seconds_per_player': seconds_per_player})
+    response.raise_for_status()
+    game_id = response.json()['game_id']
+
+    black_results = []
+    black_thread = threading.Thread(target=lambda: black_results.append(play_remote_game(
+        black_name, game_id, player_cls(), server_url=server_url, long_poll_seconds=long_poll_seconds)))
+    black_thread.start()
+    results = play_remote_game(white_name, game_id, player_cls(), server_url=server_url,
+                               long_poll_seconds=long_poll_seconds)
+    black_thread.join()
+    return results
+
+
+def run_load_test(server_url: str, num_games: int, concurrent_games: int, seconds_per_player: float = 900,
+                  player_cls=RandomBot) -> dict:
+    """
+    Plays `num_games` games on the server, with up to `concurrent_games` of them in progress at once.
+
+    :return: A dictionary with the number of `games` and `turns` played, the `elapsed` seconds, and a
+        :class:`collections.Counter` of the `win_reasons`.
+    """
+    win_reasons = collections.Counter()
+    num_turns = 0
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrent_games) as executor:
+        futures = [executor.submit(play_remote_match, server_url, game_number, seconds_per_player, player_cls)
+                   for game_number in range(num_games)]
+        for future in concurrent.futures.as_completed(futures):
+            winner_color, win_reason, history = future.result()
+            win_reasons[win_reason] += 1
+            num_turns += history.num_turns()
+    elapsed = time.perf_counter() - start
+    return {'games': num_games, 'turns': num_turns, 'elapsed': elapsed, 'win_reasons': win_reasons}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Simulates many bots playing against the game server at once and reports the throughput.')
+    parser.add_argument('--num_games', default=200, type=int, help='number of games to play.')
+    parser.add_argument('--concurrent_games', default=100, type=int,
+                        help='maximum number of games in progress at once.')
+    parser.add_argument('--seconds_per_player', default=900, type=float,
+                        help='number of seconds each player has to play the entire game.')
+    parser.add_argument('--server_url', default=None,
+                        help='URL of a running server. By default a server is started in this process.')
+    parser.add_argument('--history_dir', default=None,
+                        help='directory the in-process server saves histories to. By default they are kept in memory.')
+    args = parser.parse_args()
+
+    http_server = None
+    server_url = args.server_url
+    if server_url is None:
+        from werkzeug.serving import make_server
+
+        # don't print a line for every request
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+        server.game_store = GameStore(history_dir=args.history_dir)
+        http_server = make_server('127.0.0.1', 0, server.app, threaded=True)
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        server_url = 'http://127.0.0.1:{}'.format(http_server.server_port)
+
+    print('Playing {} games, {} at a time, against {}...'.format(args.num_games, args.concurrent_games, server_url))
+    try:
+        results = run_load_test(server_url, args.num_games, args.concurrent_games, args.seconds_per_player)
+    finally:
+        if http_server is not None:
+            http_server.shutdown()
+
+    print('Played {} games ({} turns) in {:.2f} seconds: {:.1f} games/s, {:.1f} turns/s'.format(
+        results['games'], results['turns'], results['elapsed'], results['games'] / results['elapsed'],
+        results['turns'] / results['elapsed']))
+    for win_reason, count in results['win_reasons'].most_common():
+        print('{}: {}'.format(win_reason, count))
+
+
+if __name__ == '__main__':
+    main()
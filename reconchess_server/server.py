@@ -1,10 +1,51 @@
-from flask import Flask, request
-from reconchess import Game
+import os
+import chess
+from flask import Flask, request, jsonify, Response
+from .store import GameStore, Challenges, RequestError
 
 app = Flask(__name__)
 
-last_game_id = 0
-game_by_id = {}
+LONG_POLL_SECONDS = 30
+"""The longest time a request to wait_for_turn is held open before the client has to ask again."""
+
+HISTORY_DIR_ENV_VAR = 'RECONCHESS_HISTORY_DIR'
+
+game_store = GameStore(history_dir=os.environ.get(HISTORY_DIR_ENV_VAR))
+"""The games hosted by this server. Histories of finished games are saved to the directory in the environment variable
+named by :data:`HISTORY_DIR_ENV_VAR`, if it is set."""
+
+challenges = Challenges()
+
+
+@app.errorhandler(RequestError)
+def handle_request_error(error):
+    response = jsonify({'error': str(error)})
+    response.status_code = error.status_code
+    return response
+
+
+def get_game(game_id: int):
+    return game_store.get(game_id)
+
+
+def request_json() -> dict:
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise RequestError('Expected a JSON object')
+    return data
+
+
+def required(data: dict, key: str):
+    if key not in data:
+        raise RequestError('Missing "{}"'.format(key))
+    return data[key]
+
+
+def move_from_uci(uci):
+    try:
+        return None if uci is None else chess.Move.from_uci(uci)
+    except ValueError:
+        raise RequestError('{} is not a valid move'.format(uci))
 
 
 @app.route('/api/player/register')
@@ -12,78 +53,124 @@ def api_player_register():
     pass
 
 
-@app.route('/api/game/new')
+@app.route('/api/game/new', methods=['POST'])
 def api_game_new():
     """
-    Start a game. contents should be json array with name of players the game should be between
-    :return: game id
+    Creates a game between two players. The request should be a JSON object with the names of the players as `white`
+    and `black`, and optionally `seconds_per_player`.
+
+    :return: JSON object with the `game_id` of the new game.
     """
-    global last_game_id
-    last_game_id += 1
-    game_by_id[last_game_id] = Game()
-    return last_game_id
+    data = request_json()
+    game_id = game_store.new_game(required(data, 'white'), required(data, 'black'),
+                                  data.get('seconds_per_player', 900))
+    return jsonify({'game_id': game_id})
 
 
 @app.route('/api/challenge/get')
 def api_challenge_get():
-    pass
+    """
+    :return: JSON object with the open `challenges` sent to the player `name`, oldest first.
+    """
+    return jsonify({'challenges': challenges.open_challenges(request.args.get('name'))})
 
 
-@app.route('/api/challenge/invite')
+@app.route('/api/challenge/<int:challenge_id>')
+def api_challenge(challenge_id):
+    """
+    :return: JSON object of the challenge, whose `game_id` is set once it's accepted.
+    """
+    return jsonify(challenges.get(challenge_id))
+
+
+@app.route('/api/challenge/invite', methods=['POST'])
 def api_challenge_invite():
-    pass
+    """
+    Challenges another player to a game. The request should be a JSON object with the `name` of the challenger, who
+    plays white, the `opponent`, and optionally `seconds_per_player`.
 
+    :return: JSON object with the `challenge_id`.
+    """
+    data = request_json()
+    challenge_id = challenges.invite(required(data, 'name'), required(data, 'opponent'),
+                                     data.get('seconds_per_player', 900))
+    return jsonify({'challenge_id': challenge_id})
 
-@app.route('/api/challenge/accept')
-def api_challenge_accept():
-    pass
 
+@app.route('/api/challenge/accept', methods=['POST'])
+def api_challenge_accept():
+    """
+    Accepts a challenge. The request should be a JSON object with the `name` of the player and the `challenge_id`.
 
-@app.route('/api/game/<game_id>/is_over')
-def api_game_is_over(game_id):
-    pass
+    :return: JSON object with the `game_id` of the new game.
+    """
+    data = request_json()
+    game_id = challenges.accept(required(data, 'name'), required(data, 'challenge_id'), game_store)
+    return jsonify({'game_id': game_id})
 
 
-@app.route('/api/game/<game_id>/sense_actions')
-def api_game_sense_actions(game_id):
-    pass
+@app.route('/api/game/<int:game_id>/color')
+def api_game_color(game_id):
+    game = get_game(game_id)
+    return jsonify({'color': game.color_of(request.args.get('name'))})
 
 
-@app.route('/api/game/<game_id>/move_actions')
-def api_game_move_actions(game_id):
-    pass
+@app.route('/api/game/<int:game_id>/starting_board')
+def api_game_starting_board(game_id):
+    return jsonify({'fen': get_game(game_id).starting_fen})
 
 
-@app.route('/api/game/<game_id>/start_turn')
-def api_game_start_turn(game_id):
-    pass
+@app.route('/api/game/<int:game_id>/start', methods=['POST'])
+def api_game_start(game_id):
+    """
+    Marks a player as ready. The clock starts once both players are ready.
+    """
+    get_game(game_id).start(required(request_json(), 'name'))
+    return jsonify({})
 
 
-@app.route('/api/game/<game_id>/opponent_move_results')
-def api_game_opponent_move_results(game_id):
-    pass
+@app.route('/api/game/<int:game_id>/wait_for_turn')
+def api_game_wait_for_turn(game_id):
+    """
+    Long-polls until it is the player's turn, the game is over, or `timeout` seconds pass. When it's the player's
+    turn, the response also has the opponent's move results, the sense actions, the move actions and the seconds left,
+    so a player needs one request to start its turn.
+    """
+    timeout = min(float(request.args.get('timeout', LONG_POLL_SECONDS)), LONG_POLL_SECONDS)
+    return jsonify(get_game(game_id).wait_for_turn(request.args.get('name'), timeout))
 
 
-@app.route('/api/game/<game_id>/sense')
+@app.route('/api/game/<int:game_id>/sense', methods=['POST'])
 def api_game_sense(game_id):
-    pass
+    data = request_json()
+    sense_result = get_game(game_id).sense(required(data, 'name'), required(data, 'square'))
+    return jsonify({'sense_result': [[square, None if piece is None else piece.symbol()]
+                                     for square, piece in sense_result]})
 
 
-@app.route('/api/game/<game_id>/move')
+@app.route('/api/game/<int:game_id>/move', methods=['POST'])
 def api_game_move(game_id):
-    pass
-
-
-@app.route('/api/game/<game_id>/end_turn')
-def api_game_end_turn(game_id):
-    pass
+    """
+    Applies a move and ends the player's turn.
+    """
+    data = request_json()
+    requested_move = move_from_uci(required(data, 'requested_move'))
+    requested_move, taken_move, capture_square = get_game(game_id).move(required(data, 'name'), requested_move)
+    return jsonify({
+        'requested_move': None if requested_move is None else requested_move.uci(),
+        'taken_move': None if taken_move is None else taken_move.uci(),
+        'capture_square': capture_square,
+    })
 
 
-@app.route('/api/game/<game_id>/color')
-def api_game_color(game_id):
-    pass
+@app.route('/api/game/<int:game_id>/result')
+def api_game_result(game_id):
+    return jsonify(get_game(game_id).result())
 
 
-@app.route('/api/game/<game_id>/wait_for_turn')
-def wait_for_turn(game_id):
-    pass
+@app.route('/api/game/<int:game_id>/history')
+def api_game_history(game_id):
+    """
+    :return: The game history encoded with :meth:`GameHistory.to_bytes`, once the game is over.
+    """
+    return Response(get_game(game_id).history_bytes(), mimetype='application/octet-stream')
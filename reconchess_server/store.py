@@ -0,0 +1,350 @@
+import collections
+import itertools
+import os
+import threading
+import time
+import chess
+from reconchess import LocalGame, WinReason
+from reconchess.types import *
+
+
+class RequestError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class HostedGame(object):
+    """
+    A :class:`LocalGame` played by two remote players. Every action on the game holds its lock, and players waiting
+    for their turn are woken up through its condition whenever the turn changes or the game ends.
+
+    :param white_name: The name of the white player.
+    :param black_name: The name of the black player.
+    :param seconds_per_player: The number of seconds each player has to play the entire game.
+    :param on_finish: Function called with the game once when it ends, while the game's lock is held.
+    """
+
+    def __init__(self, white_name: str, black_name: str, seconds_per_player: float, on_finish=None):
+        self.game = LocalGame(seconds_per_player=seconds_per_player)
+        self.starting_fen = self.game.board.fen()
+        self.names = {chess.WHITE: white_name, chess.BLACK: black_name}
+        self.ready = set()
+        self.condition = threading.Condition()
+        self.on_finish = on_finish
+
+    def color_of(self, name: str) -> chess.Color:
+        for color, player_name in self.names.items():
+            if player_name == name:
+                return color
+        raise RequestError('{} is not playing in this game'.format(name), 403)
+
+    def is_started(self) -> bool:
+        return len(self.ready) == 2
+
+    def _check_over(self) -> bool:
+        # the clock runs out without any requests, so the end of the game is detected lazily. LocalGame only updates
+        # the clock at the end of a turn, so the player to move is flagged here. end() records the negative time left,
+        # which makes the win reason a timeout
+        if self.is_started() and not self.game._is_finished:
+            if self.game.get_seconds_left() <= 0 or self.game.is_over():
+                self.game.end()
+                self.condition.notify_all()
+                if self.on_finish is not None:
+                    self.on_finish(self)
+        return self.game.is_over()
+
+    def start(self, name: str):
+        with self.condition:
+            self.ready.add(self.color_of(name))
+            if self.is_started() and self.game.current_turn_start_time is None:
+                self.game.start()
+                self.condition.notify_all()
+
+    def turn_info(self, color: chess.Color) -> dict:
+        """
+        Everything a player needs to play its turn, so that it only takes one request to get.
+        """
+        is_over = self._check_over()
+        is_my_turn = self.is_started() and not is_over and self.game.turn == color
+        info = {'is_over': is_over, 'is_my_turn': is_my_turn}
+        if is_my_turn:
+            info['seconds_left'] = self.game.get_seconds_left()
+            info['opponent_move_results'] = self.game.opponent_move_results()
+            info['sense_actions'] = self.game.sense_actions()
+            info['move_actions'] = [move.uci() for move in self.game.move_actions()]
+        return info
+
+    def wait_for_turn(self, name: str, timeout: float) -> dict:
+        color = self.color_of(name)
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                info = self.turn_info(color)
+                remaining = deadline - time.monotonic()
+                if info['is_my_turn'] or info['is_over'] or remaining <= 0:
+                    return info
+
+                # wake up in time to notice the opponent running out of time
+                if self.is_started():
+                    remaining = min(remaining, self.game.get_seconds_left())
+                self.condition.wait(remaining)
+
+    def _check_turn(self, color: chess.Color):
+        if self._check_over():
+            raise RequestError('The game is over', 409)
+        if not self.is_started() or self.game.turn != color:
+            raise RequestError('It is not your turn', 409)
+
+    def sense(self, name: str, square: chess.Square):
+        with self.condition:
+            self._check_turn(self.color_of(name))
+            try:
+                return self.game.sense(square)
+            except ValueError as e:
+                raise RequestError(str(e))
+
+    def move(self, name: str, requested_move):
+        with self.condition:
+            self._check_turn(self.color_of(name))
+            try:
+                result = self.game.move(requested_move)
+            except ValueError as e:
+                raise RequestError(str(e))
+
+            # the turn ends with the move, which saves the client a request
+            self.game.end_turn()
+            self._check_over()
+            self.condition.notify_all()
+            return result
+
+    def result(self) -> dict:
+        with self.condition:
+            is_over = self._check_over()
+            win_reason = self.game.get_win_reason()
+            return {
+                'is_over': is_over,
+                'winner_color': self.game.get_winner_color(),
+                'win_reason': None if win_reason is None else win_reason.name,
+            }
+
+    def history_bytes(self) -> bytes:
+        """
+        :return: The game history encoded with :meth:`GameHistory.to_bytes`.
+        :raises RequestError: If the game is not over.
+        """
+        with self.condition:
+            if not self._check_over():
+                raise RequestError('The game is not over', 409)
+            return self.game.get_game_history().to_bytes()
+
+
+class FinishedGame(object):
+    """
+    What's left of a :class:`HostedGame` once it is evicted from memory: the players, the result and where to find
+    the history. Players can keep asking for the result and history of the game, but can't act in it anymore.
+
+    :param game: The finished game.
+    :param history_path: The file the history was saved to, or `None` to keep the encoded history in memory.
+    """
+
+    def __init__(self, game: HostedGame, history_path: str = None):
+        self.names = game.names
+        self.starting_fen = game.starting_fen
+        self.winner_color = game.game.get_winner_color()
+        self.win_reason = game.game.get_win_reason()
+        self.history_path = history_path
+        self._history_bytes = None
+
+        data = game.game.get_game_history().to_bytes()
+        if history_path is None:
+            self._history_bytes = data
+        else:
+            with open(history_path, 'wb') as fp:
+                fp.write(data)
+
+    color_of = HostedGame.color_of
+
+    def start(self, name: str):
+        self.color_of(name)
+
+    def wait_for_turn(self, name: str, timeout: float) -> dict:
+        self.color_of(name)
+        return {'is_over': True, 'is_my_turn': False}
+
+    def sense(self, name: str, square: chess.Square):
+        raise RequestError('The game is over', 409)
+
+    def move(self, name: str, requested_move):
+        raise RequestError('The game is over', 409)
+
+    def result(self) -> dict:
+        return {
+            'is_over': True,
+            'winner_color': self.winner_color,
+            'win_reason': None if self.win_reason is None else self.win_reason.name,
+        }
+
+    def history_bytes(self) -> bytes:
+        if self._history_bytes is not None:
+            return self._history_bytes
+        with open(self.history_path, 'rb') as fp:
+            return fp.read()
+
+
+class _Shard(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.finished = collections.OrderedDict()
+
+
+class GameStore(object):
+    """
+    Thread-safe store of the games hosted by a server. Games are spread over `num_shards` shards by id, each with its
+    own lock, so requests for different games rarely wait on each other.
+
+    Each game is a :class:`HostedGame` backed by its own :class:`LocalGame` while it is being played. As soon as a
+    game ends its history is saved to `history_dir` (as `<game id>.bin`, see :meth:`GameHistory.save_binary`) and the
+    game is replaced by a small :class:`FinishedGame` record, so memory only grows with the number of games in
+    progress. At most `max_finished_games` records are kept; the oldest are dropped first.
+
+    Examples:
+        >>> store = GameStore(history_dir='histories')
+        >>> game_id = store.new_game('white bot', 'black bot', seconds_per_player=900)
+        >>> store.get(game_id).start('white bot')
+
+    :param history_dir: The directory to save finished histories to, or `None` to keep them in memory.
+    :param num_shards: The number of shards to split the games between.
+    :param max_finished_games: The maximum number of finished games to remember.
+    """
+
+    def __init__(self, history_dir: str = None, num_shards: int = 16, max_finished_games: int = 10000):
+        if history_dir is not None:
+            os.makedirs(history_dir, exist_ok=True)
+        self.history_dir = history_dir
+        self.max_finished_games = max_finished_games
+        self._shards = [_Shard() for _ in range(num_shards)]
+        self._game_ids = itertools.count(1)
+        self._game_ids_lock = threading.Lock()
+
+    def _shard(self, game_id: int) -> _Shard:
+        return self._shards[game_id % len(self._shards)]
+
+    def new_game(self, white_name: str, black_name: str, seconds_per_player: float = 900) -> int:
+        """
+        Creates a game between two players.
+
+        :return: The id of the new game.
+        """
+        with self._game_ids_lock:
+            game_id = next(self._game_ids)
+        game = HostedGame(white_name, black_name, seconds_per_player,
+                          on_finish=lambda finished_game: self._evict(game_id, finished_game))
+        shard = self._shard(game_id)
+        with shard.lock:
+            shard.active[game_id] = game
+        return game_id
+
+    def get(self, game_id: int):
+        """
+        :return: The :class:`HostedGame` with id `game_id`, or its :class:`FinishedGame` if it is over.
+        :raises RequestError: If there is no game with that id.
+        """
+        shard = self._shard(game_id)
+        with shard.lock:
+            if game_id in shard.active:
+                return shard.active[game_id]
+            if game_id in shard.finished:
+                return shard.finished[game_id]
+        raise RequestError('No game with id {}'.format(game_id), 404)
+
+    def _evict(self, game_id: int, game: HostedGame):
+        # called with the game's lock held, so the history can't change while it is being saved. lock order is always
+        # game then shard
+        history_path = None
+        if self.history_dir is not None:
+            history_path = os.path.join(self.history_dir, '{}.bin'.format(game_id))
+        finished_game = FinishedGame(game, history_path)
+
+        shard = self._shard(game_id)
+        max_finished_per_shard = max(1, self.max_finished_games // len(self._shards))
+        with shard.lock:
+            shard.active.pop(game_id, None)
+            shard.finished[game_id] = finished_game
+            while len(shard.finished) > max_finished_per_shard:
+                shard.finished.popitem(last=False)
+
+    def num_active_games(self) -> int:
+        """The number of games that are not over yet."""
+        return sum(len(shard.active) for shard in self._shards)
+
+    def num_finished_games(self) -> int:
+        """The number of finished games that are remembered."""
+        return sum(len(shard.finished) for shard in self._shards)
+
+
+class Challenges(object):
+    """
+    Thread-safe list of the challenges between players. A challenge is an invitation from one player to another to
+    play a game, with the challenger playing white. Accepting a challenge creates the game in a :class:`GameStore`.
+
+    Challenges are dictionaries with the `challenge_id`, the `challenger` and `opponent` names, the
+    `seconds_per_player`, and the `game_id` once the challenge is accepted (`None` before).
+    """
+
+    def __init__(self):
+        self._challenges = collections.OrderedDict()
+        self._challenge_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def invite(self, challenger: str, opponent: str, seconds_per_player: float = 900) -> int:
+        """
+        :return: The id of the new challenge.
+        """
+        with self._lock:
+            challenge_id = next(self._challenge_ids)
+            self._challenges[challenge_id] = {
+                'challenge_id': challenge_id,
+                'challenger': challenger,
+                'opponent': opponent,
+                'seconds_per_player': seconds_per_player,
+                'game_id': None,
+            }
+        return challenge_id
+
+    def get(self, challenge_id: int) -> dict:
+        """
+        :raises RequestError: If there is no challenge with that id.
+        """
+        with self._lock:
+            if challenge_id not in self._challenges:
+                raise RequestError('No challenge with id {}'.format(challenge_id), 404)
+            return dict(self._challenges[challenge_id])
+
+    def open_challenges(self, opponent: str) -> List[dict]:
+        """
+        :return: The challenges sent to `opponent` that haven't been accepted yet, oldest first.
+        """
+        with self._lock:
+            return [dict(challenge) for challenge in self._challenges.values()
+                    if challenge['opponent'] == opponent and challenge['game_id'] is None]
+
+    def accept(self, name: str, challenge_id: int, game_store: GameStore) -> int:
+        """
+        Accepts a challenge sent to `name` and creates its game.
+
+        :return: The id of the game.
+        :raises RequestError: If the challenge doesn't exist, wasn't sent to `name`, or was already accepted.
+        """
+        with self._lock:
+            challenge = self._challenges.get(challenge_id)
+            if challenge is None:
+                raise RequestError('No challenge with id {}'.format(challenge_id), 404)
+            if challenge['opponent'] != name:
+                raise RequestError('Challenge {} was not sent to {}'.format(challenge_id, name), 403)
+            if challenge['game_id'] is not None:
+                raise RequestError('Challenge {} was already accepted'.format(challenge_id), 409)
+            challenge['game_id'] = game_store.new_game(challenge['challenger'], challenge['opponent'],
+                                                       challenge['seconds_per_player'])
+            return challenge['game_id']
@@ -19,12 +19,17 @@ setuptools.setup(
     entry_points={
         'console_scripts': [
             'rc-bot-match=reconchess.scripts.rc_bot_match:main',
+            'rc-connect=reconchess.scripts.rc_connect:main',
             'rc-play=reconchess.scripts.rc_play:main',
             'rc-replay=reconchess.scripts.rc_replay:main',
+            'rc-tournament=reconchess.scripts.rc_tournament:main',
         ],
     },
     python_requires='>=3.5',
     install_requires=requirements,
+    extras_require={
+        'server': ['flask'],
+    },
     project_urls={
         'Documentation': 'https://reconchess.readthedocs.io/en/latest/index.html',
         'Source': 'https://github.com/reconnaissanceblindchess/reconchess',
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from reconchess import *
+from reconchess.archive import HistoryArchive
+from reconchess.bots.random_bot import RandomBot
+
+
+def play_and_append(job):
+    archive_path, game_number = job
+    winner_color, win_reason, history = play_local_game(RandomBot(), RandomBot())
+    HistoryArchive(archive_path).append(history, {'game_number': game_number})
+    return game_number, history.to_bytes()
+
+
+class HistoryArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive = HistoryArchive(os.path.join(self.directory.name, 'games.rca'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_empty(self):
+        self.assertEqual(len(self.archive), 0)
+        self.assertEqual(list(self.archive.games()), [])
+        with self.assertRaises(IndexError):
+            self.archive.read(0)
+
+    def test_append_and_read(self):
+        histories = [play_local_game(RandomBot(), RandomBot())[2] for _ in range(3)]
+        for i, history in enumerate(histories):
+            self.assertEqual(self.archive.append(history, {'game_number': i}), i)
+        self.archive.append(GameHistory())
+
+        self.assertEqual(len(self.archive), 4)
+        self.assertEqual(self.archive.read(1), ({'game_number': 1}, histories[1]))
+        self.assertEqual(self.archive.read(-1), ({}, GameHistory()))
+        with self.assertRaises(IndexError):
+            self.archive.read(4)
+
+        games = list(self.archive.games())
+        self.assertEqual(games, [({'game_number': i}, history) for i, history in enumerate(histories)] +
+                         [({}, GameHistory())])
+
+    def test_games_is_lazy(self):
+        for i in range(3):
+            self.archive.append(GameHistory(), {'game_number': i})
+        games = self.archive.games()
+        self.assertEqual(next(games)[0], {'game_number': 0})
+        self.archive.append(GameHistory(), {'game_number': 3})
+        self.assertEqual([metadata['game_number'] for metadata, history in games], [1, 2, 3])
+
+    def test_rebuild_index(self):
+        for i in range(3):
+            self.archive.append(GameHistory(), {'game_number': i})
+        os.remove(self.archive.index_path)
+        self.assertEqual(len(self.archive), 0)
+
+        self.archive.rebuild_index()
+        self.assertEqual(len(self.archive), 3)
+        self.assertEqual(self.archive.read(2)[0], {'game_number': 2})
+
+    def test_truncated(self):
+        self.archive.append(GameHistory(), {'game_number': 0})
+        with open(self.archive.path, 'ab') as fp:
+            fp.write(b'RCGA\x00')
+        with self.assertRaises(ValueError):
+            list(self.archive.games())
+
+    def test_concurrent_appends(self):
+        with multiprocessing.Pool(4) as pool:
+            results = dict(pool.map(play_and_append, [(self.archive.path, i) for i in range(16)]))
+
+        self.assertEqual(len(self.archive), 16)
+        for index in range(16):
+            metadata, history = self.archive.read(index)
+            self.assertEqual(history.to_bytes(), results[metadata['game_number']])
+        self.assertEqual(sorted(metadata['game_number'] for metadata, history in self.archive.games()),
+                         list(range(16)))
@@ -0,0 +1,170 @@
+import unittest
+import random
+import numpy as np
+from chess import *
+from reconchess import *
+from reconchess.belief import BeliefState, sense_window_scores, best_sense_squares, INTERIOR_SQUARES
+
+
+def reference_handle_sense_result(dist, color, opp_pieces_left, sense_result):
+    # the nested list update the p5 bots used before BeliefState
+    n = 30 / opp_pieces_left
+    for square, piece in sense_result:
+        row, col = square // 8, square % 8
+        if piece is not None and piece.color != color:
+            piece_index = piece.piece_type - 1
+            dist[row][col] = [1 if i == piece_index else 0 for i in range(6)]
+
+            piece_list = [(i, j) for i in range(7, -1, -1) for j in range(8)
+                          if dist[i][j].index(max(dist[i][j])) == piece_index]
+            closest = min(piece_list, key=lambda x: (abs(x[0] - row), abs(x[1] - col)))
+
+            stay_prob = dist[closest[0]][closest[1]][piece_index] * ((opp_pieces_left - 1) / opp_pieces_left)
+            dist[closest[0]][closest[1]][piece_index] += (1 - stay_prob) / n
+            piece_list.remove(closest)
+
+            for i, j in piece_list:
+                dist[i][j][piece_index] *= ((opp_pieces_left - 1) / opp_pieces_left)
+        else:
+            dist[row][col] = [0] * 6
+
+
+def sense_result_for(board, square):
+    result = []
+    for rank_offset in [-1, 0, 1]:
+        for file_offset in [-1, 0, 1]:
+            rank, file = square_rank(square) + rank_offset, square_file(square) + file_offset
+            if 0 <= rank < 8 and 0 <= file < 8:
+                sensed = chess.square(file, rank)
+                result.append((sensed, board.piece_at(sensed)))
+    return result
+
+
+class BeliefStateTestCase(unittest.TestCase):
+    def test_initial(self):
+        belief = BeliefState(WHITE)
+        self.assertEqual(belief.opponent_pieces_left, 16)
+        self.assertEqual(belief.probabilities.shape, (8, 8, 6))
+        self.assertEqual(belief.probabilities.sum(), 16)
+        self.assertEqual(belief.probabilities[7, 4, KING - 1], 1)
+        self.assertEqual(belief.probabilities[6, 0, PAWN - 1], 1)
+        self.assertEqual(belief.probabilities[0:2].sum(), 0)
+
+        belief = BeliefState(BLACK)
+        self.assertEqual(belief.probabilities[0, 4, KING - 1], 1)
+        self.assertEqual(belief.probabilities[6:8].sum(), 0)
+
+    def test_instances_independent(self):
+        a, b = BeliefState(WHITE), BeliefState(WHITE)
+        a.handle_capture(E8)
+        self.assertEqual(a.opponent_pieces_left, 15)
+        self.assertEqual(b.opponent_pieces_left, 16)
+        self.assertEqual(b.probabilities[7, 4, KING - 1], 1)
+
+    def test_handle_capture(self):
+        belief = BeliefState(WHITE)
+        belief.handle_capture(D7)
+        self.assertEqual(belief.opponent_pieces_left, 15)
+        self.assertEqual(belief.probabilities[6, 3].sum(), 0)
+
+    def test_handle_own_move(self):
+        belief = BeliefState(BLACK)
+        belief.handle_own_move(Move(E7, E2))
+        self.assertEqual(belief.probabilities[1, 4].sum(), 0)
+
+        before = belief.probabilities.copy()
+        belief.handle_own_move(None)
+        self.assertTrue(np.array_equal(before, belief.probabilities))
+
+    def test_sense_matches_reference(self):
+        for color in COLORS:
+            for _ in range(20):
+                board = Board()
+                belief = BeliefState(color, board)
+                dist = belief.probabilities.tolist()
+                opp_pieces_left = belief.opponent_pieces_left
+
+                for _ in range(15):
+                    moves = list(board.generate_pseudo_legal_moves())
+                    if not moves:
+                        break
+                    board.push(random.choice(moves))
+
+                    sense_result = sense_result_for(board, random.choice(SQUARES))
+                    belief.handle_sense_result(sense_result)
+                    reference_handle_sense_result(dist, color, opp_pieces_left, sense_result)
+                    self.assertTrue(np.allclose(belief.probabilities, dist))
+
+    def test_window_totals(self):
+        belief = BeliefState(WHITE)
+        belief.probabilities = np.random.rand(8, 8, 6)
+        totals = belief.square_totals()
+        windows = belief.window_totals()
+        for rank in range(8):
+            for file in range(8):
+                expected = totals[max(rank - 1, 0):rank + 2, max(file - 1, 0):file + 2].sum()
+                self.assertAlmostEqual(windows[rank, file], expected)
+
+    def test_best_sense_square(self):
+        belief = BeliefState(WHITE)
+        self.assertEqual(square_rank(belief.best_sense_square()), 6)
+
+        belief.probabilities[:] = 0
+        self.assertEqual(belief.best_sense_square(), A1)
+
+        belief.probabilities[0, 0, QUEEN - 1] = 1
+        self.assertEqual(belief.best_sense_square(), B2)
+
+    def test_most_likely_square(self):
+        belief = BeliefState(WHITE)
+        self.assertEqual(belief.most_likely_square(KING), E8)
+        belief.handle_capture(E8)
+        self.assertIsNone(belief.most_likely_square(KING))
+
+    def test_likely_pieces(self):
+        belief = BeliefState(WHITE)
+        pieces = belief.likely_pieces(0.75)
+        self.assertEqual(len(pieces), 15)
+        self.assertNotIn((E8, KING), pieces)
+        self.assertIn((A8, ROOK), pieces)
+
+        self.assertEqual(len([p for p in belief.likely_pieces(0.75, max_pawns=3) if p[1] == PAWN]), 3)
+        belief.probabilities[6, :, PAWN - 1] = 0.5
+        self.assertEqual(belief.likely_pieces(0.75, max_pawns=3), [(sq, pt) for sq, pt in pieces if pt != PAWN])
+
+
+class SenseWindowScoresTestCase(unittest.TestCase):
+    def test_scores(self):
+        scores = sense_window_scores(np.ones((8, 8)))
+        self.assertEqual(scores.shape, (64,))
+        self.assertEqual(scores[A1], 4)
+        self.assertEqual(scores[A4], 6)
+        self.assertEqual(scores[D4], 9)
+
+    def test_matches_loops(self):
+        grid = np.random.rand(8, 8)
+        scores = sense_window_scores(grid)
+        for square in SQUARES:
+            rank, file = square_rank(square), square_file(square)
+            expected = grid[max(rank - 1, 0):rank + 2, max(file - 1, 0):file + 2].sum()
+            self.assertAlmostEqual(scores[square], expected)
+        self.assertTrue(np.allclose(sense_window_scores(grid.reshape(64)), scores))
+
+    def test_batched(self):
+        grids = np.random.rand(5, 3, 8, 8)
+        scores = sense_window_scores(grids)
+        self.assertEqual(scores.shape, (5, 3, 64))
+        self.assertTrue(np.allclose(scores[2, 1], sense_window_scores(grids[2, 1])))
+
+        best = best_sense_squares(grids, INTERIOR_SQUARES)
+        self.assertEqual(best.shape, (5, 3))
+        for i in range(5):
+            for j in range(3):
+                expected = max(INTERIOR_SQUARES, key=lambda square: scores[i, j, square])
+                self.assertEqual(best[i, j], expected)
+
+    def test_best_sense_squares(self):
+        grid = np.zeros(64)
+        grid[A1] = 1
+        self.assertEqual(best_sense_squares(grid), A1)
+        self.assertEqual(best_sense_squares(grid, INTERIOR_SQUARES), B2)
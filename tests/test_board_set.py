@@ -0,0 +1,191 @@
+import unittest
+import random
+import tracemalloc
+import chess.polyglot
+import numpy as np
+from chess import *
+from reconchess.board_set import BoardSet, BoardSetPool
+from reconchess.utilities import *
+
+
+def random_boards(games=20, max_turns=80):
+    # the boards of random games with passes and castles
+    boards = []
+    for _ in range(games):
+        board = Board()
+        for _ in range(random.randint(1, max_turns)):
+            if board.king(WHITE) is None or board.king(BLACK) is None:
+                break
+            boards.append(board.copy(stack=False))
+            board.push(random.choice(possible_taken_moves(board)) or Move.null())
+    return boards
+
+
+def stripped(board: Board) -> Board:
+    # what a BoardSet keeps of a board
+    result = Board(None)
+    result.set_fen(board.fen(en_passant='fen'))
+    result.castling_rights = result.clean_castling_rights()
+    result.halfmove_clock = 0
+    result.fullmove_number = 1
+    return result
+
+
+class BoardSetTestCase(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.boards = random_boards()
+        self.board_set = BoardSet(self.boards)
+
+    def test_keys_are_zobrist_hashes(self):
+        for key, board in zip(self.board_set.keys, self.board_set):
+            self.assertEqual(int(key), chess.polyglot.zobrist_hash(board))
+
+    def test_round_trip(self):
+        expected = {chess.polyglot.zobrist_hash(stripped(board)): stripped(board) for board in self.boards}
+        self.assertEqual(len(self.board_set), len(expected))
+        for board in self.board_set:
+            self.assertEqual(board, expected[chess.polyglot.zobrist_hash(board)])
+        for board in self.boards:
+            self.assertIn(board, self.board_set)
+
+    def test_empty(self):
+        board_set = BoardSet()
+        self.assertEqual(len(board_set), 0)
+        self.assertEqual(len(board_set.filter_sense_result([(E4, None)])), 0)
+        self.assertEqual(len(board_set.filter_move_result(Move(E2, E4), Move(E2, E4), None)), 0)
+        self.assertEqual(len(board_set.push(None)), 0)
+
+    def test_duplicates_are_merged(self):
+        board = Board()
+        other = Board('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1')
+        board_set = BoardSet([board, other, board.copy()], weights=[0.5, 0.25, 0.125])
+        self.assertEqual(list(board_set), [board, other])
+        self.assertEqual(board_set.weights.tolist(), [0.625, 0.25])
+
+        merged = BoardSet.concatenate([board_set, BoardSet([other])])
+        self.assertEqual(merged.weights.tolist(), [0.625, 1.25])
+        self.assertEqual(list(merged.most_likely(1)), [other])
+
+    def test_memory(self):
+        # boards held as hypotheses have the move that led to them on their stack
+        boards = []
+        tracemalloc.start()
+        for board in self.boards:
+            board = board.copy(stack=False)
+            board.push(Move.null())
+            boards.append(board)
+        boards_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        board_set = BoardSet(boards)
+        self.assertLess(board_set.nbytes * 10, boards_size)
+
+    def test_filter_sense_result(self):
+        for true_board in random.sample(self.boards, 50):
+            sense_result = [(square, true_board.piece_at(square))
+                            for square in SENSE_WINDOWS[random.choice(SQUARES)]]
+            expected = [board for board in self.board_set
+                        if all(board.piece_at(square) == piece for square, piece in sense_result)]
+            filtered = self.board_set.filter_sense_result(sense_result)
+            self.assertEqual(list(filtered), expected)
+            self.assertIn(true_board, filtered)
+
+    def test_filter_move_result(self):
+        for true_board in random.sample(self.boards, 20):
+            requested_move = random.choice(moves_without_opponent_pieces(true_board) +
+                                           pawn_capture_moves_on(true_board))
+            taken_move = revise_move(true_board, add_pawn_queen_promotion(true_board, requested_move))
+            capture_square = capture_square_of_move(true_board, taken_move)
+
+            expected = []
+            for board in self.board_set:
+                move = add_pawn_queen_promotion(board, requested_move)
+                if move not in moves_without_opponent_pieces(board) + pawn_capture_moves_on(board):
+                    continue
+                revised = revise_move(board, move)
+                if revised == taken_move and capture_square_of_move(board, revised) == capture_square:
+                    expected.append(board)
+
+            filtered = self.board_set.filter_move_result(requested_move, taken_move, capture_square)
+            self.assertEqual(list(filtered), expected)
+            self.assertIn(true_board, filtered)
+
+    def test_filter_pass(self):
+        self.assertEqual(len(self.board_set.filter_move_result(None, None, None)), len(self.board_set))
+
+    def test_push(self):
+        for board in random.sample(self.boards, 20):
+            for move in possible_taken_moves(board):
+                expected = board.copy(stack=False)
+                expected.push(move if move is not None else Move.null())
+                pushed = BoardSet([board]).push(move)
+                self.assertEqual(pushed[0], stripped(expected))
+                self.assertEqual(int(pushed.keys[0]), chess.polyglot.zobrist_hash(expected))
+
+    def test_push_merges_boards(self):
+        # the captured piece is gone, so both boards become the same board
+        boards = [Board('4k3/8/8/8/8/8/n7/R3K3 w - - 0 1'), Board('4k3/8/8/8/8/8/b7/R3K3 w - - 0 1')]
+        pushed = BoardSet(boards, weights=[0.5, 0.25]).push(Move(A1, A2))
+        self.assertEqual(list(pushed), [Board('4k3/8/8/8/8/8/R7/4K3 b - - 0 1')])
+        self.assertEqual(pushed.weights.tolist(), [0.75])
+
+    def test_expand(self):
+        boards = random.sample(self.boards, 20)
+        weights = np.random.RandomState(0).rand(len(boards))
+        for capture_square in [None, E4, D5]:
+            expanded = BoardSet(boards, weights).expand(capture_square)
+            successors = successor_boards(boards, capture_square, weights)
+            expected = {chess.polyglot.zobrist_hash(stripped(board)): weight for board, weight in successors.values()}
+            self.assertEqual(len(expanded), len(expected))
+            for key, weight in zip(expanded.keys, expanded.weights):
+                self.assertAlmostEqual(weight, expected[int(key)])
+
+
+class BoardSetPoolTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = BoardSetPool(processes=2, min_boards_per_process=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def setUp(self):
+        random.seed(0)
+        self.boards = random_boards(games=10, max_turns=40)
+        self.board_set = BoardSet(self.boards, weights=np.random.RandomState(0).rand(len(self.boards)))
+
+    def test_filter_sense_result(self):
+        for true_board in random.sample(self.boards, 10):
+            sense_result = [(square, true_board.piece_at(square))
+                            for square in SENSE_WINDOWS[random.choice(SQUARES)]]
+            expected = self.board_set.filter_sense_result(sense_result)
+            filtered = self.pool.filter_sense_result(self.board_set, sense_result)
+            self.assertEqual(filtered.keys.tolist(), expected.keys.tolist())
+            self.assertEqual(filtered.weights.tolist(), expected.weights.tolist())
+
+    def test_expand(self):
+        for capture_square in [None, E4]:
+            expected = self.board_set.expand(capture_square)
+            expanded = self.pool.expand(self.board_set, capture_square)
+            self.assertEqual(sorted(expanded.keys.tolist()), sorted(expected.keys.tolist()))
+            expected_weights = dict(zip(expected.keys.tolist(), expected.weights))
+            for key, weight in zip(expanded.keys.tolist(), expanded.weights):
+                self.assertAlmostEqual(weight, expected_weights[key])
+
+    def test_small_sets_are_handled_in_process(self):
+        self.assertEqual(len(self.pool.expand(BoardSet(), None)), 0)
+        expected = self.board_set.select(slice(0, 5)).expand(None)
+        expanded = self.pool.expand(self.board_set.select(slice(0, 5)), None)
+        self.assertEqual(sorted(expanded.keys.tolist()), sorted(expected.keys.tolist()))
+
+    def test_time_limit(self):
+        expected = set(self.board_set.expand(None).keys.tolist())
+        expanded = self.pool.expand(self.board_set, None, time_limit=0)
+        self.assertLessEqual(set(expanded.keys.tolist()), expected)
+
+        # shards that don't finish in time keep all their boards
+        sense_result = [(E4, None)]
+        filtered = self.pool.filter_sense_result(self.board_set, sense_result, time_limit=0)
+        self.assertLessEqual(set(self.board_set.filter_sense_result(sense_result).keys.tolist()),
+                             set(filtered.keys.tolist()))
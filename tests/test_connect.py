@@ -0,0 +1,112 @@
+import unittest
+import threading
+import time
+from chess import *
+from reconchess import *
+from reconchess.bots.random_bot import RandomBot
+from reconchess.game import remote_session
+
+try:
+    from werkzeug.serving import make_server
+    from reconchess_server import server
+    from reconchess.scripts.rc_connect import BotConnector
+except ImportError:
+    server = None
+
+
+@unittest.skipIf(server is None, 'flask is not installed')
+class BotConnectorTestCase(unittest.TestCase):
+    THREAD_TIMEOUT = 60
+
+    @classmethod
+    def setUpClass(cls):
+        cls.http_server = make_server('127.0.0.1', 0, server.app, threaded=True)
+        cls.server_url = 'http://127.0.0.1:{}'.format(cls.http_server.server_port)
+        cls.server_thread = threading.Thread(target=cls.http_server.serve_forever, daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.http_server.shutdown()
+        cls.server_thread.join(cls.THREAD_TIMEOUT)
+
+    def setUp(self):
+        self.session = remote_session(self.server_url)
+
+    def invite(self, challenger, opponent):
+        response = self.session.post(self.server_url + '/api/challenge/invite', timeout=10, json={
+            'name': challenger, 'opponent': opponent, 'seconds_per_player': 30})
+        return response.json()['challenge_id']
+
+    def wait_for_game_id(self, challenge_id):
+        deadline = time.monotonic() + self.THREAD_TIMEOUT
+        while time.monotonic() < deadline:
+            challenge = self.session.get(self.server_url + '/api/challenge/{}'.format(challenge_id), timeout=10).json()
+            if challenge['game_id'] is not None:
+                return challenge['game_id']
+            time.sleep(0.05)
+        self.fail('challenge {} was not accepted'.format(challenge_id))
+
+    def play_challengers(self, challenge_ids, connector):
+        results = {}
+
+        def play(challenge_id):
+            game_id = self.wait_for_game_id(challenge_id)
+            results[challenge_id] = play_remote_game('challenger', game_id, RandomBot(), server_url=self.server_url,
+                                                     long_poll_seconds=1)
+
+        threads = [threading.Thread(target=play, args=(challenge_id,), daemon=True) for challenge_id in challenge_ids]
+        for thread in threads:
+            thread.start()
+
+        deadline = time.monotonic() + self.THREAD_TIMEOUT
+        while any(thread.is_alive() for thread in threads) and time.monotonic() < deadline:
+            connector.poll()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join(1)
+            self.assertFalse(thread.is_alive(), 'game did not finish in time')
+        return results
+
+    def test_plays_challenges(self):
+        connector = BotConnector(self.server_url, 'daemon bot', 'reconchess.bots.random_bot', max_games=2)
+        try:
+            challenge_ids = [self.invite('challenger', 'daemon bot') for _ in range(3)]
+            results = self.play_challengers(challenge_ids, connector)
+        finally:
+            connector.close()
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len(connector.results), 3)
+        for game_id, winner_color, win_reason, error in connector.results:
+            self.assertIsNone(error)
+            self.assertEqual(win_reason, WinReason.KING_CAPTURE)
+        self.assertEqual(connector.game_ids, set())
+
+    def test_max_games(self):
+        connector = BotConnector(self.server_url, 'busy bot', 'reconchess.bots.random_bot', max_games=1)
+        try:
+            challenge_ids = [self.invite('challenger', 'busy bot') for _ in range(2)]
+
+            # the second challenge waits until the first game is over
+            self.assertEqual(len(connector.poll()), 1)
+            self.assertEqual(connector.poll(), [])
+            open_challenges = self.session.get(self.server_url + '/api/challenge/get', params={'name': 'busy bot'},
+                                               timeout=10).json()['challenges']
+            self.assertEqual([challenge['challenge_id'] for challenge in open_challenges], challenge_ids[1:])
+
+            self.play_challengers(challenge_ids, connector)
+        finally:
+            connector.close()
+
+    def test_accept_errors(self):
+        challenge_id = self.invite('challenger', 'someone')
+        url = self.server_url + '/api/challenge/accept'
+        self.assertEqual(self.session.post(url, json={'name': 'someone else', 'challenge_id': challenge_id},
+                                           timeout=10).status_code, 403)
+        self.assertEqual(self.session.post(url, json={'name': 'someone', 'challenge_id': challenge_id},
+                                           timeout=10).status_code, 200)
+        self.assertEqual(self.session.post(url, json={'name': 'someone', 'challenge_id': challenge_id},
+                                           timeout=10).status_code, 409)
+        self.assertEqual(self.session.post(url, json={'name': 'someone', 'challenge_id': 123456789},
+                                           timeout=10).status_code, 404)
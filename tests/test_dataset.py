@@ -0,0 +1,87 @@
+import unittest
+from chess import *
+from reconchess import *
+from reconchess.dataset import build_dataset, history_arrays, find_histories, load_history
+import tempfile
+import os
+import random
+
+
+class RandomBot(Player):
+    def choose_sense(self, sense_actions: List[Square], move_actions: List[chess.Move], seconds_left: float) -> Square:
+        return random.choice(sense_actions)
+
+    def choose_move(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
+        return random.choice(move_actions + [None])
+
+
+def move_index(move):
+    return -1 if move is None else move.from_square * 64 + move.to_square
+
+
+class HistoryArraysTestCase(unittest.TestCase):
+    def setUp(self):
+        _, _, self.history = play_local_game(RandomBot(), RandomBot())
+        self.turns = [turn for turn in self.history.turns() if self.history.has_move(turn)]
+
+    def test_matches_history(self):
+        arrays = history_arrays(self.history)
+        self.assertEqual(arrays['boards'].shape, (len(self.turns), 12, 8, 8))
+        self.assertEqual(arrays['senses'].shape, (len(self.turns), 64))
+
+        for i, turn in enumerate(self.turns):
+            self.assertEqual(arrays['colors'][i], turn.color)
+            self.assertEqual(arrays['turn_numbers'][i], turn.turn_number)
+            self.assertEqual(arrays['senses'][i].argmax(), self.history.sense(turn))
+            self.assertEqual(arrays['senses'][i].sum(), 1)
+            self.assertEqual(arrays['requested_moves'][i], move_index(self.history.requested_move(turn)))
+            self.assertEqual(arrays['taken_moves'][i], move_index(self.history.taken_move(turn)))
+            capture_square = self.history.capture_square(turn)
+            self.assertEqual(arrays['capture_squares'][i], -1 if capture_square is None else capture_square)
+
+            board = self.history.truth_board_before_move(turn)
+            for square in SQUARES:
+                piece = board.piece_at(square)
+                planes = arrays['boards'][i, :, square_rank(square), square_file(square)]
+                if piece is None:
+                    self.assertEqual(planes.sum(), 0)
+                else:
+                    self.assertEqual(planes.sum(), 1)
+                    self.assertEqual(planes.argmax(), piece.piece_type - 1 + (0 if piece.color else 6))
+
+    def test_color(self):
+        arrays = history_arrays(self.history, color=BLACK)
+        self.assertEqual(len(arrays['colors']), len([turn for turn in self.turns if turn.color == BLACK]))
+        self.assertFalse(arrays['colors'].any())
+
+    def test_empty(self):
+        arrays = history_arrays(GameHistory())
+        self.assertEqual(arrays['boards'].shape, (0, 12, 8, 8))
+
+
+class BuildDatasetTestCase(unittest.TestCase):
+    def test_directory(self):
+        histories = [play_local_game(RandomBot(), RandomBot())[2] for _ in range(4)]
+        with tempfile.TemporaryDirectory() as d:
+            for i, history in enumerate(histories):
+                if i % 2 == 0:
+                    history.save(os.path.join(d, '{}.json'.format(i)))
+                else:
+                    history.save_binary(os.path.join(d, '{}.bin'.format(i)))
+
+            paths = find_histories(d)
+            self.assertEqual(len(paths), 4)
+            self.assertEqual(load_history(paths[0]), histories[0])
+            self.assertEqual(load_history(paths[1]), histories[1])
+
+            dataset = build_dataset(d, processes=2)
+
+        expected = [history_arrays(history) for history in histories]
+        self.assertEqual(len(dataset['boards']), sum(len(arrays['boards']) for arrays in expected))
+        start = 0
+        for game_id, arrays in enumerate(expected):
+            stop = start + len(arrays['boards'])
+            self.assertTrue((dataset['game_ids'][start:stop] == game_id).all())
+            for key in ['boards', 'senses', 'requested_moves', 'taken_moves', 'capture_squares']:
+                self.assertTrue((dataset[key][start:stop] == arrays[key]).all())
+            start = stop
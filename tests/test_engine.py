@@ -0,0 +1,272 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+import chess.engine
+from chess import *
+from reconchess.engine import EnginePool, EvaluationCache, search_limit
+
+
+class FakeEngine(object):
+    def __init__(self, crash_after=None):
+        self.crash_after = crash_after
+        self.new_games = 0
+        self.searches = 0
+        self.quit_called = False
+        self.game = None
+        self.first_game = True
+
+    def _search(self, game):
+        if self.crash_after is not None and self.searches >= self.crash_after:
+            raise chess.engine.EngineTerminatedError('engine process died unexpectedly')
+        if self.first_game or self.game != game:
+            self.first_game = False
+            self.game = game
+            self.new_games += 1
+        self.searches += 1
+
+    def play(self, board, limit, game=None, **kwargs):
+        self._search(game)
+        return chess.engine.PlayResult(next(iter(board.generate_pseudo_legal_moves()), None), None)
+
+    def analyse(self, board, limit, game=None, **kwargs):
+        self._search(game)
+        return {'score': chess.engine.PovScore(chess.engine.Cp(0), board.turn)}
+
+    def quit(self):
+        self.quit_called = True
+
+
+class EngineFactory(object):
+    def __init__(self, crash_after=None):
+        self.crash_after = crash_after
+        self.engines = []
+
+    def __call__(self):
+        engine = FakeEngine(self.crash_after)
+        self.engines.append(engine)
+        return engine
+
+
+class EnginePoolTestCase(unittest.TestCase):
+    def test_reuses_engines(self):
+        factory = EngineFactory()
+        pool = EnginePool(factory, max_engines=2)
+        for _ in range(5):
+            pool.play(Board(), chess.engine.Limit(time=0.1))
+        self.assertEqual(len(factory.engines), 1)
+        self.assertEqual(factory.engines[0].searches, 5)
+
+    def test_new_game(self):
+        factory = EngineFactory()
+        pool = EnginePool(factory)
+        game_a, game_b = object(), object()
+        pool.play(Board(), chess.engine.Limit(time=0.1), game=game_a)
+        pool.play(Board(), chess.engine.Limit(time=0.1), game=game_a)
+        self.assertEqual(factory.engines[0].new_games, 1)
+        pool.analyse(Board(), chess.engine.Limit(time=0.1), game=game_b)
+        self.assertEqual(factory.engines[0].new_games, 2)
+
+    def test_concurrency_limit(self):
+        factory = EngineFactory()
+        pool = EnginePool(factory, max_engines=2)
+        a = pool.acquire()
+        b = pool.acquire()
+        self.assertIsNot(a, b)
+        self.assertEqual(pool.num_engines, 2)
+        with self.assertRaises(TimeoutError):
+            pool.acquire(timeout=0.05)
+
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        thread.start()
+        time.sleep(0.05)
+        self.assertEqual(acquired, [])
+        pool.release(a)
+        thread.join(1)
+        self.assertEqual(acquired, [a])
+        self.assertEqual(len(factory.engines), 2)
+
+    def test_restarts_terminated_engine(self):
+        factory = EngineFactory(crash_after=1)
+        pool = EnginePool(factory)
+        pool.play(Board(), chess.engine.Limit(time=0.1))
+        pool.play(Board(), chess.engine.Limit(time=0.1))
+        self.assertEqual(len(factory.engines), 2)
+        self.assertTrue(factory.engines[0].quit_called)
+        self.assertEqual(factory.engines[1].searches, 1)
+        self.assertEqual(pool.num_engines, 1)
+
+    def test_engine_context_discards_terminated(self):
+        factory = EngineFactory()
+        pool = EnginePool(factory)
+        with self.assertRaises(chess.engine.EngineTerminatedError):
+            with pool.engine():
+                raise chess.engine.EngineTerminatedError('engine process died unexpectedly')
+        self.assertEqual(pool.num_engines, 0)
+        self.assertTrue(factory.engines[0].quit_called)
+
+        with pool.engine() as engine:
+            self.assertIs(engine, factory.engines[1])
+
+    def test_factory_error(self):
+        def factory():
+            raise FileNotFoundError()
+
+        pool = EnginePool(factory)
+        with self.assertRaises(FileNotFoundError):
+            pool.acquire()
+        self.assertEqual(pool.num_engines, 0)
+
+    def test_close(self):
+        factory = EngineFactory()
+        pool = EnginePool(factory, max_engines=2)
+        a = pool.acquire()
+        pool.release(pool.acquire())
+        pool.close()
+        self.assertTrue(factory.engines[1].quit_called)
+        self.assertFalse(a.quit_called)
+        pool.release(a)
+        self.assertTrue(a.quit_called)
+        self.assertEqual(pool.num_engines, 0)
+        with self.assertRaises(ValueError):
+            pool.acquire()
+
+
+def play_result(move, score=None, depth=None, turn=WHITE):
+    info = {}
+    if score is not None:
+        info['score'] = chess.engine.PovScore(score, turn)
+    if depth is not None:
+        info['depth'] = depth
+    return chess.engine.PlayResult(move, None, info)
+
+
+class EvaluationCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'evaluations.rcec')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get(self):
+        cache = EvaluationCache()
+        board = Board()
+        self.assertIsNone(cache.get(board))
+        cache.put(board, play_result(Move(E2, E4), chess.engine.Cp(30), 12))
+
+        result = cache.get(board)
+        self.assertEqual(result.move, Move(E2, E4))
+        self.assertEqual(result.info['score'], chess.engine.PovScore(chess.engine.Cp(30), WHITE))
+        self.assertEqual(result.info['depth'], 12)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.hit_rate, 0.5)
+
+    def test_side_to_move(self):
+        cache = EvaluationCache()
+        board = Board()
+        cache.put(board, play_result(Move(E2, E4)))
+        board.turn = BLACK
+        self.assertIsNone(cache.get(board))
+
+    def test_min_depth(self):
+        cache = EvaluationCache()
+        board = Board()
+        cache.put(board, play_result(Move(E2, E4)))
+        self.assertIsNone(cache.get(board, min_depth=1))
+
+        cache.put(board, play_result(Move(D2, D4), depth=10))
+        self.assertEqual(cache.get(board, min_depth=10).move, Move(D2, D4))
+        self.assertIsNone(cache.get(board, min_depth=11))
+
+        # a shallower search doesn't replace a deeper one
+        cache.put(board, play_result(Move(G1, F3), depth=5))
+        self.assertEqual(cache.get(board).move, Move(D2, D4))
+
+    def test_evicts_least_recently_used(self):
+        cache = EvaluationCache(max_entries=2)
+        boards = [Board(), Board('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1'),
+                  Board('rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2')]
+        cache.put(boards[0], play_result(Move(E2, E4)))
+        cache.put(boards[1], play_result(Move(E7, E5)))
+        cache.get(boards[0])
+        cache.put(boards[2], play_result(Move(G1, F3)))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get(boards[0]))
+        self.assertIsNone(cache.get(boards[1]))
+        self.assertIsNotNone(cache.get(boards[2]))
+
+    def test_save_and_load(self):
+        cache = EvaluationCache(path=self.path)
+        boards = [Board(), Board('4k3/8/8/8/8/8/8/R3K3 w - - 0 1'), Board('4k3/8/8/8/8/8/8/R3K3 b - - 0 1'),
+                  Board('R3k3/8/8/8/8/8/8/4K3 b - - 0 1')]
+        results = [play_result(Move(E2, E4), chess.engine.Cp(-15), 20),
+                   play_result(Move(A1, A8), chess.engine.Mate(1), 3),
+                   play_result(Move(E8, D7), chess.engine.Mate(-7), None, BLACK),
+                   play_result(None, chess.engine.MateGiven, 0, BLACK)]
+        for board, result in zip(boards, results):
+            cache.put(board, result)
+        cache.save()
+
+        loaded = EvaluationCache(path=self.path)
+        self.assertEqual(len(loaded), len(boards))
+        for board, result in zip(boards, results):
+            cached = loaded.get(board)
+            self.assertEqual(cached.move, result.move)
+            self.assertEqual(cached.info, result.info)
+
+        # the least recently used entries are evicted first when loading into a smaller cache
+        smaller = EvaluationCache(max_entries=2, path=self.path)
+        self.assertIsNone(smaller.get(boards[0]))
+        self.assertIsNotNone(smaller.get(boards[3]))
+
+    def test_load_errors(self):
+        with open(self.path, 'wb') as fp:
+            fp.write(b'not a cache')
+        with self.assertRaises(ValueError):
+            EvaluationCache(path=self.path)
+        with self.assertRaises(ValueError):
+            EvaluationCache().save()
+
+    def test_pool_uses_cache(self):
+        factory = EngineFactory()
+        cache = EvaluationCache()
+        pool = EnginePool(factory, cache=cache)
+        first = pool.play(Board(), chess.engine.Limit(time=0.1))
+        second = pool.play(Board(), chess.engine.Limit(time=0.1))
+        self.assertEqual(first.move, second.move)
+        self.assertEqual(factory.engines[0].searches, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # the cached search has no depth, and other arguments can change the result, so neither uses the cache
+        pool.play(Board(), chess.engine.Limit(depth=5))
+        pool.play(Board(), chess.engine.Limit(time=0.1), root_moves=[Move(D2, D4)])
+        self.assertEqual(factory.engines[0].searches, 3)
+
+        pool.play_all([Board(), Board()], chess.engine.Limit(time=0.1))
+        self.assertEqual(factory.engines[0].searches, 3)
+
+
+class SearchLimitTestCase(unittest.TestCase):
+    def test_splits_clock(self):
+        self.assertAlmostEqual(search_limit(610, 0, max_time=100).time, 10)
+        self.assertAlmostEqual(search_limit(610, 0, searches_per_turn=2, max_time=100).time, 5)
+        self.assertAlmostEqual(search_limit(410, 20, max_time=100).time, 10)
+
+    def test_min_turns_left(self):
+        self.assertAlmostEqual(search_limit(210, 55).time, 10)
+        self.assertAlmostEqual(search_limit(210, 200).time, 10)
+
+    def test_bounds(self):
+        self.assertEqual(search_limit(900, 0).time, 10)
+        self.assertEqual(search_limit(900, 0, max_time=0.5).time, 0.5)
+        self.assertEqual(search_limit(5, 10).time, 0.01)
+        self.assertEqual(search_limit(-1, 10, min_time=0.1).time, 0.1)
+
+    def test_does_not_flag(self):
+        seconds_left = 900
+        for turn_number in range(500):
+            seconds_left -= 2 * search_limit(seconds_left, turn_number, searches_per_turn=2).time
+        self.assertGreater(seconds_left, 0)
@@ -1,5 +1,7 @@
 import unittest
-from reconchess import LocalGame, WinReason
+from reconchess import LocalGame, SimulatedGame, WinReason, Turn, TURN_PHASES, Player, play_local_game
+from reconchess.bots.random_bot import RandomBot
+from reconchess.utilities import moves_without_opponent_pieces, pawn_capture_moves_on
 from chess import *
 import time
 import random
@@ -134,6 +136,31 @@ class LocalGameTimeTest(unittest.TestCase):
         time.sleep(delta)
         self.assertAlmostEqual(game.get_seconds_left(), time_by_color[turn], places=2)
 
+    def test_phase_durations(self):
+        game = LocalGame()
+        game.start()
+        time.sleep(0.02)
+        game.sense(E7)
+        time.sleep(0.04)
+        game.move(Move(E2, E4))
+        time.sleep(0.01)
+        game.end_turn()
+
+        game.sense(E2)
+        game.move(None)
+        game.end_turn()
+
+        history = game._LocalGame__game_history
+        durations = history.phase_durations(Turn(WHITE, 0))
+        self.assertEqual(set(durations.keys()), set(TURN_PHASES))
+        self.assertAlmostEqual(durations['sense'] / 1e9, 0.02, places=2)
+        self.assertAlmostEqual(durations['move'] / 1e9, 0.04, places=2)
+        self.assertAlmostEqual(durations['bookkeeping'] / 1e9, 0.01, places=2)
+        self.assertAlmostEqual(900 - game.seconds_left_by_color[WHITE], sum(durations.values()) / 1e9, places=3)
+
+        self.assertTrue(history.has_phase_durations(Turn(BLACK, 0)))
+        self.assertFalse(history.has_phase_durations(Turn(WHITE, 1)))
+
 
 class LocalGameMoveActionsTest(unittest.TestCase):
     STARTING_WHITE_PAWN_CAPTURES = [
@@ -173,6 +200,25 @@ class LocalGameMoveActionsTest(unittest.TestCase):
         self.assertNotIn(None, self.game.move_actions())
         self.assertNotIn(Move.null(), self.game.move_actions())
 
+    def test_cache_matches_board(self, max_turns=100):
+        self.game.start()
+        turn = 1
+        while not self.game.is_over() and turn < max_turns:
+            expected = moves_without_opponent_pieces(self.game.board) + pawn_capture_moves_on(self.game.board)
+            self.assertEqual(self.game.move_actions(), expected)
+            self.assertEqual(self.game.move_actions(), expected)
+
+            self.game.move(random.choice(expected + [None]))
+            self.game.end_turn()
+            turn += 1
+
+    def test_cache_board_modified(self):
+        self.game.move_actions()
+        self.game.board.remove_piece_at(E2)
+        self.assertIn(Move(E1, E2), self.game.move_actions())
+        self.game.move(Move(E1, E2))
+        self.assertEqual(self.game.board.piece_at(E2), Piece(KING, WHITE))
+
     def test_superset_fuzz(self, max_turns=500):
         turn = 1
         while not self.game.board.is_game_over() and turn < max_turns:
@@ -815,3 +861,79 @@ class GetGameHistoryTestCase(unittest.TestCase):
         g.move(Move(B5, E8))
         self.assertTrue(g.is_over())
         self.assertNotEqual(g.get_game_history(), None)
+
+
+class PassingBot(Player):
+    def handle_game_start(self, color, board):
+        pass
+
+    def handle_opponent_move_result(self, captured_my_piece, capture_square):
+        pass
+
+    def choose_sense(self, sense_actions, move_actions, seconds_left):
+        return E4
+
+    def handle_sense_result(self, sense_result):
+        pass
+
+    def choose_move(self, move_actions, seconds_left):
+        return None
+
+    def handle_move_result(self, requested_move, taken_move, captured_opponent_piece, capture_square):
+        pass
+
+    def handle_game_end(self, winner_color, win_reason, game_history):
+        pass
+
+
+class SimulatedGameTest(unittest.TestCase):
+    def test_same_as_local_game(self):
+        for seed in range(5):
+            random.seed(seed)
+            local_results = play_local_game(RandomBot(), RandomBot())
+            random.seed(seed)
+            simulated_results = play_local_game(RandomBot(), RandomBot(), game=SimulatedGame())
+            self.assertEqual(local_results, simulated_results)
+
+    def test_virtual_clock(self):
+        game = SimulatedGame(seconds_per_player=10, seconds_per_turn=1)
+        game.start()
+        time.sleep(0.01)
+        self.assertEqual(game.get_seconds_left(), 10)
+
+        winner_color, win_reason, history = play_local_game(PassingBot(), PassingBot(), game=game)
+        self.assertEqual(winner_color, BLACK)
+        self.assertEqual(win_reason, WinReason.TIMEOUT)
+        self.assertEqual(history.num_turns(WHITE), 10)
+        self.assertEqual(history.num_turns(BLACK), 9)
+        self.assertFalse(history.has_phase_durations(Turn(WHITE, 0)))
+
+    def test_no_history(self):
+        game = SimulatedGame(record_history=False)
+        winner_color, win_reason, history = play_local_game(RandomBot(), RandomBot(), game=game)
+        self.assertEqual(win_reason, WinReason.KING_CAPTURE)
+        self.assertIsNone(history)
+        self.assertIsNone(game.get_game_history())
+
+    def test_starting_board(self):
+        board = Board('4k3/8/8/8/8/8/8/R3K3 w - - 0 1')
+        game = SimulatedGame()
+        game.board = board.copy()
+        game.sense(E7)
+        game.move(Move(A1, A8))
+        game.end_turn()
+        game.sense(E2)
+        game.move(None)
+        game.end_turn()
+        game.sense(E7)
+        game.move(Move(A8, E8))
+        self.assertTrue(game.is_over())
+
+        history = game.get_game_history()
+        self.assertIs(game.get_game_history(), history)
+        self.assertEqual(history.truth_board_before_move(Turn(WHITE, 0)), board)
+        sense_result = dict(history.sense_result(Turn(WHITE, 0)))
+        self.assertEqual(sense_result[E8], Piece(KING, BLACK))
+        self.assertIsNone(sense_result[E7])
+        self.assertEqual(history.taken_move(Turn(WHITE, 1)), Move(A8, E8))
+        self.assertEqual(history.capture_square(Turn(WHITE, 1)), E8)
@@ -4,6 +4,7 @@ from reconchess import *
 import tempfile
 import os
 import random
+import json
 
 
 class RandomBot(Player):
@@ -50,6 +51,17 @@ class TurnEqualityTestCase(unittest.TestCase):
         self.assertTrue(Turn(BLACK, 5) >= Turn(BLACK, 5))
 
 
+class TurnHashTestCase(unittest.TestCase):
+    def test_hash(self):
+        self.assertEqual(hash(Turn(WHITE, 5)), hash(Turn(WHITE, 5)))
+        self.assertEqual(len({Turn(WHITE, 5), Turn(WHITE, 5), Turn(BLACK, 5), Turn(WHITE, 4)}), 3)
+        self.assertEqual({Turn(BLACK, 2): 'x'}[Turn(BLACK, 2)], 'x')
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Turn(WHITE, 5).ply = 10
+
+
 class TurnNeighborsTestCase(unittest.TestCase):
     def test_next(self):
         self.assertEqual(Turn(WHITE, 0).next, Turn(BLACK, 0))
@@ -152,6 +164,23 @@ class HistoryTurnsTestCase(unittest.TestCase):
         self.history.store_fen_before_move(WHITE, 'g1')
         self.history.store_fen_after_move(WHITE, 'g2')
 
+    def test_turns_sequence(self):
+        turns = self.history.turns()
+        self.assertEqual(len(turns), 7)
+        self.assertEqual(turns[0], Turn(WHITE, 0))
+        self.assertEqual(turns[5], Turn(BLACK, 2))
+        self.assertEqual(turns[-1], Turn(WHITE, 3))
+        self.assertEqual(list(turns[2:4]), [Turn(WHITE, 1), Turn(BLACK, 1)])
+        self.assertEqual(turns[::3], [Turn(WHITE, 0), Turn(BLACK, 1), Turn(WHITE, 3)])
+        self.assertIn(Turn(BLACK, 2), turns)
+        self.assertNotIn(Turn(BLACK, 3), turns)
+        with self.assertRaises(IndexError):
+            turns[7]
+
+        self.assertEqual(self.history.turns(BLACK)[-1], Turn(BLACK, 2))
+        self.assertEqual(list(self.history.turns(WHITE, start=1)[1:]), [Turn(WHITE, 2), Turn(WHITE, 3)])
+        self.assertEqual(sorted(random.sample(self.history.turns(WHITE), 4)), list(self.history.turns(WHITE)))
+
     def test_first_turn(self):
         self.assertEqual(self.history.first_turn(), Turn(WHITE, 0))
         self.assertEqual(self.history.first_turn(WHITE), Turn(WHITE, 0))
@@ -685,3 +714,205 @@ class HistorySaveTestCase(unittest.TestCase):
             history.save(os.path.join(d, 'history.tsv'))
             restored_history = GameHistory.from_file(os.path.join(d, 'history.tsv'))
         self.assertEqual(history, restored_history)
+
+    def test_phase_durations(self):
+        winner_color, win_reason, history = play_local_game(RandomBot(), RandomBot())
+
+        with tempfile.TemporaryDirectory() as d:
+            history.save(os.path.join(d, 'history.json'))
+            restored_history = GameHistory.from_file(os.path.join(d, 'history.json'))
+
+            # histories saved before turns were timed have no phase durations
+            with open(os.path.join(d, 'history.json')) as fp:
+                obj = json.load(fp)
+            del obj['phase_durations']
+            with open(os.path.join(d, 'old_history.json'), 'w') as fp:
+                json.dump(obj, fp)
+            old_history = GameHistory.from_file(os.path.join(d, 'old_history.json'))
+
+        for turn in history.turns():
+            if history.has_move(turn):
+                self.assertTrue(restored_history.has_phase_durations(turn))
+                self.assertEqual(restored_history.phase_durations(turn), history.phase_durations(turn))
+                self.assertFalse(old_history.has_phase_durations(turn))
+        self.assertEqual(old_history, history)
+
+    def test_phase_durations_not_compared(self):
+        history, other_history = GameHistory(), GameHistory()
+        history.store_phase_durations(WHITE, {'sense': 1, 'move': 2, 'bookkeeping': 3})
+        self.assertEqual(history, other_history)
+
+
+class FenRecordingGame(LocalGame):
+    """Also records every fen the way LocalGame used to, to check the fens rebuilt from the move log against."""
+
+    def __init__(self):
+        super().__init__()
+        self.fens_history = GameHistory()
+
+    def _record_sense(self, square, sense_result):
+        super()._record_sense(square, sense_result)
+        self.fens_history.store_sense(self.turn, square, sense_result)
+
+    def _push_move(self, requested_move, taken_move, opt_capture_square):
+        self.fens_history.store_move(self.turn, requested_move, taken_move, opt_capture_square)
+        self.fens_history.store_fen_before_move(self.turn, self.board.fen())
+        super()._push_move(requested_move, taken_move, opt_capture_square)
+        self.fens_history.store_fen_after_move(self.turn, self.board.fen())
+
+
+class HistoryMoveLogTestCase(unittest.TestCase):
+    def play_game(self):
+        game = FenRecordingGame()
+        winner_color, win_reason, history = play_local_game(RandomBot(), RandomBot(), game=game)
+        return history, game.fens_history
+
+    def test_fens(self):
+        for _ in range(5):
+            history, fens_history = self.play_game()
+            self.assertIsNotNone(history._move_log)
+            self.assertEqual(history, fens_history)
+
+            turns = [turn for turn in history.turns() if history.has_move(turn)]
+            random.shuffle(turns)
+            for turn in turns:
+                self.assertEqual(history.truth_fen_before_move(turn), fens_history.truth_fen_before_move(turn))
+                self.assertEqual(history.truth_fen_after_move(turn), fens_history.truth_fen_after_move(turn))
+                self.assertEqual(history.truth_board_before_move(turn), fens_history.truth_board_before_move(turn))
+                self.assertEqual(history.truth_board_after_move(turn), fens_history.truth_board_after_move(turn))
+
+    def test_json(self):
+        history, fens_history = self.play_game()
+        fens_history._phase_durations = history._phase_durations
+        with tempfile.TemporaryDirectory() as d:
+            history.save(os.path.join(d, 'history.json'))
+            fens_history.save(os.path.join(d, 'fens_history.json'))
+            self.assertLess(os.path.getsize(os.path.join(d, 'history.json')),
+                            os.path.getsize(os.path.join(d, 'fens_history.json')))
+
+            with open(os.path.join(d, 'history.json')) as fp:
+                obj = json.load(fp)
+            self.assertIn('fen_checkpoints', obj)
+            self.assertNotIn('fens_before_move', obj)
+
+            restored_history = GameHistory.from_file(os.path.join(d, 'history.json'))
+            restored_fens_history = GameHistory.from_file(os.path.join(d, 'fens_history.json'))
+        self.assertEqual(restored_history, history)
+        self.assertEqual(restored_fens_history, history)
+
+    def test_binary(self):
+        history, fens_history = self.play_game()
+        data = history.to_bytes()
+        self.assertLess(len(data), len(fens_history.to_bytes()) * 0.6)
+
+        restored_history = GameHistory.from_bytes(data)
+        self.assertEqual(restored_history, fens_history)
+        for turn in history.turns():
+            if history.has_move(turn):
+                self.assertEqual(restored_history.truth_board_after_move(turn), history.truth_board_after_move(turn))
+
+        # histories decoded from the short format are encoded in it again
+        self.assertEqual(restored_history.to_bytes(), data)
+        self.assertEqual(GameHistory.from_bytes(fens_history.to_bytes()), history)
+
+    def test_timeout_without_move(self):
+        history = GameHistory()
+        history.store_sense(WHITE, E7, [])
+        history.store_move(WHITE, Move(E2, E4), Move(E2, E4), None)
+        history.store_board_before_move(WHITE, Board())
+        history.store_sense(BLACK, E2, [])
+
+        self.assertFalse(history.has_move(Turn(BLACK, 0)))
+        self.assertEqual(history.truth_board_after_move(Turn(WHITE, 0)).piece_at(E4), Piece(PAWN, WHITE))
+        with self.assertRaises(ValueError):
+            history.truth_fen_before_move(Turn(BLACK, 0))
+
+    def test_mixed_with_fens(self):
+        history = GameHistory()
+        history.store_move(WHITE, Move(E2, E4), Move(E2, E4), None)
+        history.store_fen_before_move(WHITE, Board().fen())
+        with self.assertRaises(ValueError):
+            history.store_board_before_move(BLACK, Board())
+
+
+class HistoryBinarySaveTestCase(unittest.TestCase):
+    def save_and_load(self, history):
+        with tempfile.TemporaryDirectory() as d:
+            history.save_binary(os.path.join(d, 'history.bin'))
+            return GameHistory.from_binary_file(os.path.join(d, 'history.bin'))
+
+    def test_empty(self):
+        history = GameHistory()
+        restored_history = self.save_and_load(history)
+        self.assertTrue(restored_history.is_empty())
+        self.assertEqual(history, restored_history)
+
+    def test_one_turn(self):
+        game = LocalGame()
+        game.start()
+        sense_result = game.sense(E7)
+        game.move(Move(B1, C3))
+
+        history = game._LocalGame__game_history
+        restored_history = self.save_and_load(history)
+
+        self.assertEqual(restored_history._senses, {WHITE: [E7], BLACK: []})
+        self.assertEqual(restored_history._sense_results, {WHITE: [sense_result], BLACK: []})
+        self.assertEqual(restored_history._requested_moves, {WHITE: [Move(B1, C3)], BLACK: []})
+        self.assertEqual(restored_history._taken_moves, {WHITE: [Move(B1, C3)], BLACK: []})
+        self.assertEqual(restored_history._capture_squares, {WHITE: [None], BLACK: []})
+        self.assertEqual(restored_history.truth_fen_before_move(Turn(WHITE, 0)), Board().fen())
+        self.assertEqual(restored_history.truth_board_after_move(Turn(WHITE, 0)),
+                         history.truth_board_after_move(Turn(WHITE, 0)))
+        self.assertEqual(history, restored_history)
+
+    def test_fuzz(self):
+        winner_color, win_reason, history = play_local_game(RandomBot(), RandomBot())
+        restored_history = self.save_and_load(history)
+
+        self.assertEqual(history, restored_history)
+        for turn in history.turns():
+            if history.has_move(turn):
+                self.assertEqual(restored_history.truth_board_before_move(turn),
+                                 history.truth_board_before_move(turn))
+                self.assertEqual(restored_history.truth_board_after_move(turn), history.truth_board_after_move(turn))
+                self.assertEqual(restored_history.move_result(turn), history.move_result(turn))
+
+    def test_bytes(self):
+        winner_color, win_reason, history = play_local_game(RandomBot(), RandomBot())
+        data = history.to_bytes()
+        self.assertEqual(GameHistory.from_bytes(data), history)
+        self.assertEqual(GameHistory.from_bytes(b'padding' + data, offset=7), history)
+        self.assertLess(len(data), len(json.dumps(history, cls=GameHistoryEncoder)) / 2)
+
+    def test_invalid_sense_result(self):
+        history = GameHistory()
+        history.store_sense(WHITE, E7, [(D8, Piece(QUEEN, BLACK)), (F6, None)])
+        with self.assertRaises(ValueError):
+            history.to_bytes()
+
+    def test_not_binary(self):
+        with tempfile.TemporaryDirectory() as d:
+            GameHistory().save(os.path.join(d, 'history.json'))
+            with self.assertRaises(ValueError):
+                GameHistory.from_binary_file(os.path.join(d, 'history.json'))
+
+    def test_empty_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            open(os.path.join(d, 'history.bin'), 'wb').close()
+            with self.assertRaisesRegex(ValueError, 'No GameHistory object found'):
+                GameHistory.from_binary_file(os.path.join(d, 'history.bin'))
+
+    def test_close(self):
+        winner_color, win_reason, history = play_local_game(RandomBot(), RandomBot())
+        with tempfile.TemporaryDirectory() as d:
+            history.save_binary(os.path.join(d, 'history.bin'))
+            with GameHistory.from_binary_file(os.path.join(d, 'history.bin')) as restored_history:
+                self.assertEqual(history, restored_history)
+                mapping = restored_history._mmap
+            self.assertTrue(mapping.closed)
+            self.assertIsNone(restored_history._mmap)
+
+        # closing a history that isn't memory mapped does nothing
+        history.close()
+        self.assertFalse(history.is_empty())
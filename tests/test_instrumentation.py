@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+import chess
+from reconchess import *
+from reconchess.bots.random_bot import RandomBot
+from reconchess.instrumentation import GameObserver, LatencyAggregator, TURN_STEPS
+
+
+class RecordingObserver(GameObserver):
+    def __init__(self):
+        self.starts = []
+        self.turns = []
+        self.ends = []
+
+    def handle_game_start(self, color, player):
+        self.starts.append((color, player))
+
+    def handle_turn(self, player, event):
+        self.turns.append((player, event))
+
+    def handle_game_end(self, winner_color, win_reason, game_history):
+        self.ends.append((winner_color, win_reason, game_history))
+
+
+class GameObserverTestCase(unittest.TestCase):
+    def test_events(self):
+        white, black = RandomBot(), RandomBot()
+        observer = RecordingObserver()
+        winner_color, win_reason, history = play_local_game(white, black, observer=observer)
+
+        self.assertEqual(observer.starts, [(chess.WHITE, white), (chess.BLACK, black)])
+        self.assertEqual(observer.ends, [(winner_color, win_reason, history)])
+
+        turns = list(history.turns())
+        self.assertEqual(len(observer.turns), len(turns))
+        for (player, event), turn in zip(observer.turns, turns):
+            self.assertIs(player, white if turn.color == chess.WHITE else black)
+            self.assertEqual(tuple(event.durations), TURN_STEPS)
+            self.assertTrue(all(duration >= 0 for duration in event.durations.values()))
+            self.assertEqual(event.total_duration, sum(event.durations.values()))
+            self.assertEqual(event.num_sense_actions, 64)
+            self.assertGreater(event.num_move_actions, 0)
+            self.assertEqual(event.sense, history.sense(turn))
+            self.assertEqual(event.requested_move, history.requested_move(turn))
+            self.assertEqual(event.taken_move, history.taken_move(turn))
+            self.assertEqual(event.capture_square, history.capture_square(turn))
+            self.assertEqual(event.revised_move, history.requested_move(turn) != history.taken_move(turn))
+            self.assertEqual(event.captured_piece, history.capture_square(turn) is not None)
+
+            if turn != history.first_turn():
+                self.assertEqual(event.opponent_capture_square, history.capture_square(turn.previous))
+
+    def test_async_player_not_supported(self):
+        class AsyncRandomBot(AsyncPlayer):
+            pass
+
+        with self.assertRaises(ValueError):
+            play_local_game(AsyncRandomBot(), RandomBot(), observer=GameObserver())
+
+
+class LatencyAggregatorTestCase(unittest.TestCase):
+    def test_summary(self):
+        aggregator = LatencyAggregator(percentiles=(50, 99.9))
+        num_turns = 0
+        for _ in range(3):
+            _, _, history = play_local_game(RandomBot(), RandomBot(), observer=aggregator)
+            num_turns += history.num_turns()
+
+        summary = aggregator.summary()
+        self.assertEqual(list(summary), ['RandomBot'])
+        bot_summary = summary['RandomBot']
+        self.assertEqual(bot_summary['games'], 6)
+        self.assertEqual(bot_summary['turns'], num_turns)
+        self.assertGreater(bot_summary['mean_move_actions'], 0)
+        self.assertEqual(set(bot_summary['durations']), set(TURN_STEPS) | {'turn'})
+        for step_summary in bot_summary['durations'].values():
+            self.assertEqual(step_summary['count'], num_turns)
+            self.assertLessEqual(step_summary['p50'], step_summary['p99.9'])
+            self.assertLessEqual(step_summary['p99.9'], step_summary['max'])
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'latency.json')
+            aggregator.write_summary(path)
+            with open(path) as fp:
+                self.assertEqual(json.load(fp), summary)
+
+    def test_empty(self):
+        self.assertEqual(LatencyAggregator().summary(), {})
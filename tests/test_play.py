@@ -3,6 +3,8 @@ from chess import *
 from collections import defaultdict
 from reconchess import *
 import random
+import asyncio
+import time
 
 
 def clean_locals(d):
@@ -195,7 +197,7 @@ class PlayMoveTestCase(unittest.TestCase):
     def test_call_order(self):
         self.assertEqual(self.player.call_order, ['choose_move', 'handle_move_result'])
         self.assertEqual(self.game.call_order,
-                         ['start', 'move_actions', 'get_seconds_left', 'move', 'move_actions'])
+                         ['start', 'move_actions', 'get_seconds_left', 'move'])
 
     def test_player_params(self):
         self.assertEqual(self.player.params_by_function['choose_move'], [{
@@ -229,7 +231,7 @@ class PlayTurnTestCase(unittest.TestCase):
                                                   'choose_move', 'handle_move_result'])
         self.assertEqual(self.game.call_order,
                          ['start', 'move_actions', 'sense_actions', 'move_actions', 'opponent_move_results',
-                          'get_seconds_left', 'sense', 'sense_actions', 'get_seconds_left', 'move', 'move_actions',
+                          'get_seconds_left', 'sense', 'sense_actions', 'get_seconds_left', 'move',
                           'end_turn'])
 
     def test_player_opponent_move_results_params(self):
@@ -322,3 +324,110 @@ class PlayLocalGameTestCase(unittest.TestCase):
             'win_reason': self.win_reason,
             'history': self.history,
         }])
+
+
+class AsyncTestPlayer(AsyncPlayer):
+    def __init__(self, senses, moves):
+        self.player = TestPlayer(senses, moves)
+        self.call_order = self.player.call_order
+
+    async def handle_game_start(self, color: Color, board: Board):
+        await asyncio.sleep(0)
+        self.player.handle_game_start(color, board)
+
+    async def handle_opponent_move_result(self, captured_my_piece: bool, capture_square: Optional[Square]):
+        await asyncio.sleep(0)
+        self.player.handle_opponent_move_result(captured_my_piece, capture_square)
+
+    async def choose_sense(self, sense_actions: List[Square], move_actions: List[Move], seconds_left: float) -> Square:
+        await asyncio.sleep(0)
+        return self.player.choose_sense(sense_actions, move_actions, seconds_left)
+
+    async def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[Piece]]]):
+        await asyncio.sleep(0)
+        self.player.handle_sense_result(sense_result)
+
+    async def choose_move(self, move_actions: List[Move], seconds_left: float) -> Optional[Move]:
+        await asyncio.sleep(0)
+        return self.player.choose_move(move_actions, seconds_left)
+
+    async def handle_move_result(self, requested_move: Optional[Move], taken_move: Optional[Move],
+                                 captured_opponent_piece: bool, capture_square: Optional[Square]):
+        await asyncio.sleep(0)
+        self.player.handle_move_result(requested_move, taken_move, captured_opponent_piece, capture_square)
+
+    async def handle_game_end(self, winner_color: Optional[Color], win_reason: Optional[WinReason],
+                              history: GameHistory):
+        await asyncio.sleep(0)
+        self.player.handle_game_end(winner_color, win_reason, history)
+
+
+class SlowTestPlayer(TestPlayer):
+    def choose_move(self, move_actions: List[Move], seconds_left: float) -> Optional[Move]:
+        # blocks the event loop, like a bot doing a lot of work without awaiting
+        time.sleep(0.05)
+        return super().choose_move(move_actions, seconds_left)
+
+
+class AsyncPlayTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_play_turn(self):
+        for player in [TestPlayer([E7], [Move(E2, E4)]), AsyncTestPlayer([E7], [Move(E2, E4)])]:
+            game = TestGame()
+            game.start()
+            self.loop.run_until_complete(async_play_turn(game, player))
+            self.assertEqual(player.call_order, ['handle_opponent_move_result', 'choose_sense', 'handle_sense_result',
+                                                 'choose_move', 'handle_move_result'])
+            self.assertEqual(game.board.piece_at(E4), Piece(PAWN, WHITE))
+            self.assertEqual(game.turn, BLACK)
+
+    def test_play_local_game(self):
+        white_player, black_player = AsyncTestPlayer([], []), TestPlayer([], [])
+        winner_color, win_reason, history = self.loop.run_until_complete(
+            async_play_local_game(white_player, black_player))
+
+        self.assertEqual(win_reason, WinReason.KING_CAPTURE)
+        turn_order = ['handle_opponent_move_result', 'choose_sense', 'handle_sense_result',
+                      'choose_move', 'handle_move_result']
+        for color, player in [(WHITE, white_player), (BLACK, black_player)]:
+            self.assertEqual(player.call_order, ['handle_game_start'] + turn_order * history.num_turns(color) +
+                             ['handle_game_end'])
+
+    def test_concurrent_games(self):
+        players = [(AsyncTestPlayer([], []), AsyncTestPlayer([], [])) for _ in range(50)]
+
+        async def play_games():
+            return await asyncio.gather(
+                *[async_play_local_game(white_player, black_player) for white_player, black_player in players])
+
+        results = self.loop.run_until_complete(play_games())
+
+        self.assertEqual(len(results), 50)
+        for (white_player, black_player), (winner_color, win_reason, history) in zip(players, results):
+            self.assertEqual(win_reason, WinReason.KING_CAPTURE)
+            self.assertEqual(white_player.call_order[-1], 'handle_game_end')
+            self.assertEqual(black_player.call_order[-1], 'handle_game_end')
+
+    def test_play_local_game_with_async_player(self):
+        winner_color, win_reason, history = play_local_game(AsyncTestPlayer([], []), TestPlayer([], []))
+        self.assertEqual(win_reason, WinReason.KING_CAPTURE)
+
+    def test_clock_excludes_other_games(self):
+        slow_players = SlowTestPlayer([], []), SlowTestPlayer([], [])
+        white_player, black_player = TestPlayer([], []), TestPlayer([], [])
+
+        async def play_games():
+            return await asyncio.gather(async_play_local_game(*slow_players, seconds_per_player=0.5),
+                                        async_play_local_game(white_player, black_player, seconds_per_player=900))
+
+        slow_result, result = self.loop.run_until_complete(play_games())
+
+        self.assertEqual(slow_result[1], WinReason.TIMEOUT)
+        for player in [white_player, black_player]:
+            seconds_left = min(params['seconds_left'] for params in player.params_by_function['choose_move'])
+            self.assertGreater(seconds_left, 900 - 0.25)
@@ -0,0 +1,195 @@
+import unittest
+import threading
+import time
+import random
+from chess import *
+from reconchess import *
+from reconchess.game import remote_session
+
+try:
+    from werkzeug.serving import make_server
+    from reconchess_server import server
+except ImportError:
+    server = None
+
+
+class RandomBot(Player):
+    def handle_game_start(self, color: Color, board: chess.Board):
+        self.color = color
+        self.turns = 0
+
+    def handle_opponent_move_result(self, captured_my_piece: bool, capture_square: Optional[Square]):
+        pass
+
+    def choose_sense(self, sense_actions: List[Square], move_actions: List[chess.Move], seconds_left: float) -> Square:
+        return random.choice(sense_actions)
+
+    def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+        pass
+
+    def choose_move(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
+        return random.choice(move_actions + [None])
+
+    def handle_move_result(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                           captured_opponent_piece: bool, capture_square: Optional[Square]):
+        self.turns += 1
+
+    def handle_game_end(self, winner_color: Optional[Color], win_reason: Optional[WinReason],
+                        game_history: GameHistory):
+        self.result = winner_color, win_reason, game_history
+
+
+@unittest.skipIf(server is None, 'flask is not installed')
+class RemoteGameTestCase(unittest.TestCase):
+    # keep long-polls short so a broken test fails quickly instead of blocking the suite
+    LONG_POLL_SECONDS = 1
+    THREAD_TIMEOUT = 60
+
+    @classmethod
+    def setUpClass(cls):
+        cls.http_server = make_server('127.0.0.1', 0, server.app, threaded=True)
+        cls.server_url = 'http://127.0.0.1:{}'.format(cls.http_server.server_port)
+        cls.server_thread = threading.Thread(target=cls.http_server.serve_forever, daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.http_server.shutdown()
+        cls.server_thread.join(cls.THREAD_TIMEOUT)
+
+    def new_game(self, seconds_per_player):
+        response = remote_session(self.server_url).post(self.server_url + '/api/game/new', json={
+            'white': 'white bot', 'black': 'black bot', 'seconds_per_player': seconds_per_player}, timeout=10)
+        return response.json()['game_id']
+
+    def remote_game(self, game_id, name):
+        game = RemoteGame(game_id, server_url=self.server_url, long_poll_seconds=self.LONG_POLL_SECONDS)
+        game.get_player_color(name)
+        return game
+
+    def play(self, game_id, players):
+        results, errors = {}, {}
+
+        def play_as(name, player):
+            try:
+                results[name] = play_remote_game(name, game_id, player, server_url=self.server_url,
+                                                 long_poll_seconds=self.LONG_POLL_SECONDS)
+            except Exception as e:
+                errors[name] = e
+
+        threads = [threading.Thread(target=play_as, args=item, daemon=True) for item in players.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(self.THREAD_TIMEOUT)
+            self.assertFalse(thread.is_alive(), 'game did not finish in time')
+        self.assertEqual(errors, {})
+        return results
+
+    def test_play_game(self):
+        # the game ends on time even if a bug stalls one of the players
+        game_id = self.new_game(seconds_per_player=30)
+        white, black = RandomBot(), RandomBot()
+        results = self.play(game_id, {'white bot': white, 'black bot': black})
+
+        self.assertEqual(white.color, WHITE)
+        self.assertEqual(black.color, BLACK)
+        winner_color, win_reason, history = results['white bot']
+        self.assertEqual(win_reason, WinReason.KING_CAPTURE)
+        self.assertEqual(results['black bot'][:2], (winner_color, win_reason))
+        self.assertEqual(history, results['black bot'][2])
+        self.assertEqual(white.result[:2], (winner_color, win_reason))
+        self.assertEqual(history.num_turns(WHITE), white.turns)
+        self.assertEqual(history.num_turns(BLACK), black.turns)
+        self.assertIsNone(history.truth_board_after_move(history.last_turn()).king(not winner_color))
+
+    def test_timeout(self):
+        game_id = self.new_game(seconds_per_player=0.5)
+        white_game = self.remote_game(game_id, 'white bot')
+        black_game = self.remote_game(game_id, 'black bot')
+        white_game.start()
+        black_game.start()
+
+        # white never moves, so black's long-poll returns when white's clock runs out
+        start = time.monotonic()
+        black_game.wait_for_turn('black bot')
+        self.assertLess(time.monotonic() - start, 5)
+
+        self.assertTrue(black_game.is_over())
+        self.assertEqual(black_game.get_winner_color(), BLACK)
+        self.assertEqual(black_game.get_win_reason(), WinReason.TIMEOUT)
+
+        # white finds out the game is over too, and can't move anymore
+        white_game.wait_for_turn('white bot')
+        self.assertTrue(white_game.is_over())
+        with self.assertRaises(ValueError):
+            white_game.move(Move(E2, E4))
+
+    def test_long_poll_times_out(self):
+        game_id = self.new_game(seconds_per_player=30)
+        white_game = self.remote_game(game_id, 'white bot')
+        black_game = self.remote_game(game_id, 'black bot')
+        white_game.start()
+        black_game.start()
+
+        # black's long-poll is answered with "not your turn" every second until white moves
+        thread = threading.Thread(target=black_game.wait_for_turn, args=('black bot',), daemon=True)
+        thread.start()
+        time.sleep(2.5)
+        self.assertTrue(thread.is_alive())
+
+        white_game.wait_for_turn('white bot')
+        white_game.sense(E7)
+        white_game.move(Move(E2, E4))
+        white_game.end_turn()
+
+        thread.join(self.THREAD_TIMEOUT)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(black_game.is_over())
+        self.assertIsNone(black_game.opponent_move_results())
+
+    def test_turn_info(self):
+        game_id = self.new_game(seconds_per_player=900)
+        games = {name: self.remote_game(game_id, name) for name in ['white bot', 'black bot']}
+        for game in games.values():
+            game.start()
+
+        game = games['white bot']
+        game.wait_for_turn('white bot')
+        self.assertEqual(game.sense_actions(), list(SQUARES))
+        self.assertEqual(set(game.move_actions()), set(LocalGame().move_actions()))
+        self.assertIsNone(game.opponent_move_results())
+        self.assertGreater(game.get_seconds_left(), 890)
+
+        with self.assertRaises(ValueError):
+            games['black bot'].sense(E4)
+
+        self.assertIn((E7, Piece(PAWN, BLACK)), game.sense(E7))
+        self.assertEqual(game.move(Move(E2, E4)), (Move(E2, E4), Move(E2, E4), None))
+        game.end_turn()
+        with self.assertRaises(ValueError):
+            game.sense_actions()
+
+    def test_unknown_game(self):
+        game = RemoteGame(123456789, server_url=self.server_url)
+        with self.assertRaises(ValueError):
+            game.get_player_color('white bot')
+
+
+@unittest.skipIf(server is None, 'flask is not installed')
+class LoadTestTestCase(unittest.TestCase):
+    def test_run_load_test(self):
+        from reconchess_server.load_test import run_load_test
+
+        http_server = make_server('127.0.0.1', 0, server.app, threaded=True)
+        thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            results = run_load_test('http://127.0.0.1:{}'.format(http_server.server_port), num_games=6,
+                                    concurrent_games=3, seconds_per_player=30, player_cls=RandomBot)
+        finally:
+            http_server.shutdown()
+
+        self.assertEqual(results['games'], 6)
+        self.assertEqual(sum(results['win_reasons'].values()), 6)
+        self.assertGreater(results['turns'], 0)
@@ -0,0 +1,77 @@
+import unittest
+import collections
+import random
+import numpy as np
+from chess import *
+from reconchess.board_set import BoardSet
+from reconchess.belief import INTERIOR_SQUARES
+from reconchess.sense_planning import observation_keys, expected_information_gains, best_information_sense
+from reconchess.utilities import SENSE_WINDOWS
+from .test_board_set import random_boards
+
+
+def reference_information_gains(boards, weights):
+    # the entropy of the sense results of each sense, counting every distinct result
+    probabilities = np.asarray(weights) / np.sum(weights)
+    gains = np.zeros(64)
+    for sense in SQUARES:
+        result_probabilities = collections.Counter()
+        for board, probability in zip(boards, probabilities):
+            result_probabilities[tuple(board.piece_at(square) for square in SENSE_WINDOWS[sense])] += probability
+        p = np.array(list(result_probabilities.values()))
+        gains[sense] = -(p * np.log2(p)).sum()
+    return gains
+
+
+class SensePlanningTestCase(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        boards = random_boards()
+        self.board_set = BoardSet(boards, weights=np.random.RandomState(0).rand(len(boards)))
+
+    def test_matches_reference(self):
+        # the successors of a few boards, like the candidate boards of a bot
+        board_set = self.board_set.select(np.arange(0, len(self.board_set), 50)).expand(None)
+        gains = expected_information_gains(board_set)
+        expected = reference_information_gains(list(board_set), board_set.weights)
+        self.assertTrue(np.all(gains <= expected + 1e-9))
+        np.testing.assert_allclose(gains, expected, atol=0.01)
+
+    def test_hash_collisions_underestimate(self):
+        # most senses see a different result on almost every one of these boards, so some results share a key
+        gains = expected_information_gains(self.board_set)
+        expected = reference_information_gains(list(self.board_set), self.board_set.weights)
+        self.assertTrue(np.all(gains <= expected + 1e-9))
+        np.testing.assert_allclose(gains, expected, atol=0.1)
+
+    def test_keys_match_observations(self):
+        keys = observation_keys(self.board_set)
+        boards = list(self.board_set)
+        for sense in random.sample(SQUARES, 10):
+            results = [tuple(board.piece_at(square) for square in SENSE_WINDOWS[sense]) for board in boards]
+            for i, j in zip(random.sample(range(len(boards)), 50), random.sample(range(len(boards)), 50)):
+                if results[i] == results[j]:
+                    self.assertEqual(keys[sense, i], keys[sense, j])
+
+    def test_edge_senses_gain_less(self):
+        gains = expected_information_gains(self.board_set)
+        for sense in SQUARES:
+            rank = min(max(square_rank(sense), 1), 6)
+            file = min(max(square_file(sense), 1), 6)
+            self.assertLessEqual(gains[sense], gains[square(file, rank)] + 1e-9)
+
+    def test_no_information(self):
+        self.assertEqual(expected_information_gains(BoardSet()).tolist(), [0.0] * 64)
+        self.assertEqual(expected_information_gains(BoardSet([Board()])).tolist(), [0.0] * 64)
+
+    def test_start_position(self):
+        # only white's first move is unknown, so senses that can't see white's pieces learn nothing
+        gains = expected_information_gains(BoardSet([Board()]).expand(None))
+        self.assertTrue(np.all(gains[A6:] == 0))
+        self.assertTrue(np.all(gains[:A6] > 0))
+
+    def test_best_information_sense(self):
+        gains = expected_information_gains(self.board_set)
+        self.assertEqual(best_information_sense(self.board_set), int(gains.argmax()))
+        self.assertIn(best_information_sense(self.board_set, INTERIOR_SQUARES), INTERIOR_SQUARES)
+        self.assertEqual(best_information_sense(self.board_set, [A1, H8]), A1 if gains[A1] >= gains[H8] else H8)
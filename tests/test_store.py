@@ -0,0 +1,103 @@
+import unittest
+import os
+import tempfile
+import threading
+from chess import *
+from reconchess import *
+from reconchess_server.store import GameStore, HostedGame, FinishedGame, RequestError
+
+
+def play_to_king_capture(game: HostedGame):
+    game.start('white bot')
+    game.start('black bot')
+    moves = [('white bot', Move(E2, E4)), ('black bot', Move(F7, F6)), ('white bot', Move(D1, H5)),
+             ('black bot', Move(A7, A6)), ('white bot', Move(H5, E8))]
+    for name, move in moves:
+        game.move(name, move)
+
+
+class GameStoreTestCase(unittest.TestCase):
+    def test_new_game(self):
+        store = GameStore()
+        game_ids = [store.new_game('white bot', 'black bot') for _ in range(40)]
+        self.assertEqual(len(set(game_ids)), 40)
+        self.assertEqual(store.num_active_games(), 40)
+        for game_id in game_ids:
+            game = store.get(game_id)
+            self.assertIsInstance(game, HostedGame)
+            self.assertIsInstance(game.game, LocalGame)
+            self.assertEqual(game.color_of('black bot'), BLACK)
+
+    def test_unknown_game(self):
+        with self.assertRaises(RequestError) as context:
+            GameStore().get(1)
+        self.assertEqual(context.exception.status_code, 404)
+
+    def test_concurrent_new_games(self):
+        store = GameStore(num_shards=4)
+        game_ids = []
+
+        def create():
+            for _ in range(250):
+                game_ids.append(store.new_game('white bot', 'black bot'))
+
+        threads = [threading.Thread(target=create) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(game_ids)), 2000)
+        self.assertEqual(store.num_active_games(), 2000)
+
+    def test_evicted_when_over(self):
+        with tempfile.TemporaryDirectory() as d:
+            store = GameStore(history_dir=d)
+            game_id = store.new_game('white bot', 'black bot')
+            game = store.get(game_id)
+            play_to_king_capture(game)
+
+            self.assertEqual(store.num_active_games(), 0)
+            finished_game = store.get(game_id)
+            self.assertIsInstance(finished_game, FinishedGame)
+            self.assertEqual(finished_game.result(),
+                             {'is_over': True, 'winner_color': WHITE, 'win_reason': 'KING_CAPTURE'})
+            self.assertEqual(finished_game.wait_for_turn('black bot', 10), {'is_over': True, 'is_my_turn': False})
+            with self.assertRaises(RequestError):
+                finished_game.move('black bot', Move(A6, A5))
+
+            path = os.path.join(d, '{}.bin'.format(game_id))
+            with GameHistory.from_binary_file(path) as history:
+                self.assertEqual(history, game.game.get_game_history())
+            self.assertEqual(finished_game.history_bytes(), game.history_bytes())
+
+    def test_evicted_in_memory(self):
+        store = GameStore()
+        game_id = store.new_game('white bot', 'black bot')
+        game = store.get(game_id)
+        play_to_king_capture(game)
+        self.assertEqual(GameHistory.from_bytes(store.get(game_id).history_bytes()), game.game.get_game_history())
+
+    def test_evicted_on_timeout(self):
+        store = GameStore()
+        game_id = store.new_game('white bot', 'black bot', seconds_per_player=0.1)
+        game = store.get(game_id)
+        game.start('white bot')
+        game.start('black bot')
+
+        info = game.wait_for_turn('black bot', 5)
+        self.assertTrue(info['is_over'])
+        self.assertEqual(store.get(game_id).result()['win_reason'], 'TIMEOUT')
+        self.assertEqual(store.num_active_games(), 0)
+
+    def test_max_finished_games(self):
+        store = GameStore(num_shards=2, max_finished_games=4)
+        game_ids = [store.new_game('white bot', 'black bot') for _ in range(10)]
+        for game_id in game_ids:
+            play_to_king_capture(store.get(game_id))
+
+        self.assertEqual(store.num_finished_games(), 4)
+        for game_id in game_ids[-4:]:
+            self.assertIsInstance(store.get(game_id), FinishedGame)
+        with self.assertRaises(RequestError):
+            store.get(game_ids[0])
@@ -0,0 +1,90 @@
+import unittest
+import collections
+import tempfile
+import os
+from chess import *
+from reconchess import *
+from reconchess.scripts.rc_tournament import round_robin_schedule, gauntlet_schedule, TournamentResults, \
+    play_scheduled_game
+from reconchess.archive import HistoryArchive
+
+
+class ScheduleTestCase(unittest.TestCase):
+    def test_round_robin(self):
+        schedule = round_robin_schedule(['a', 'b', 'c'], 4)
+        self.assertEqual(len(schedule), 3 * 4)
+
+        games_by_pair = collections.Counter(frozenset(game) for game in schedule)
+        self.assertEqual(set(games_by_pair.values()), {4})
+        self.assertEqual(len(games_by_pair), 3)
+
+        whites = collections.Counter(schedule)
+        for white, black in schedule:
+            self.assertEqual(whites[(white, black)], whites[(black, white)])
+
+    def test_round_robin_alternates_colors(self):
+        self.assertEqual(round_robin_schedule(['a', 'b'], 3), [('a', 'b'), ('b', 'a'), ('a', 'b')])
+
+    def test_gauntlet(self):
+        schedule = gauntlet_schedule(['a', 'b', 'c', 'd'], 2)
+        self.assertEqual(len(schedule), 3 * 2)
+        for game in schedule:
+            self.assertIn('a', game)
+        self.assertEqual(schedule[:2], [('a', 'b'), ('b', 'a')])
+
+    def test_gauntlet_one_game(self):
+        self.assertEqual(gauntlet_schedule(['a', 'b', 'c'], 1), [('a', 'b'), ('a', 'c')])
+
+
+class TournamentResultsTestCase(unittest.TestCase):
+    def test_tallies_unordered_pairs(self):
+        results = TournamentResults()
+        results.add('a', 'b', WHITE, WinReason.KING_CAPTURE)
+        results.add('b', 'a', WHITE, WinReason.TIMEOUT)
+        results.add('b', 'a', BLACK, WinReason.KING_CAPTURE)
+        results.add('a', 'b', None, None)
+        results.add('a', 'b', None, None, error='RuntimeError()')
+        results.add('a', 'c', BLACK, WinReason.KING_CAPTURE)
+
+        self.assertEqual(list(results.tallies.keys()), [('a', 'b'), ('a', 'c')])
+        tally = results.tallies[('a', 'b')]
+        self.assertEqual(tally['wins']['a'], 2)
+        self.assertEqual(tally['wins']['b'], 1)
+        self.assertEqual(tally['draws'], 1)
+        self.assertEqual(tally['timeouts'], 1)
+        self.assertEqual(tally['errors'], 1)
+        self.assertEqual(results.tallies[('a', 'c')]['wins']['c'], 1)
+
+    def test_summary_lines(self):
+        results = TournamentResults()
+        results.add('a', 'b', WHITE, WinReason.KING_CAPTURE)
+        results.add('b', 'a', WHITE, WinReason.TIMEOUT)
+        results.add('a', 'b', None, None, error='RuntimeError()')
+
+        self.assertEqual(results.summary_lines({'a': 'BotA', 'b': 'BotB'}),
+                         ['BotA vs BotB: 1-1 wins, 0 draws, 1 timeouts, 1 errors'])
+
+
+class PlayScheduledGameTestCase(unittest.TestCase):
+    def test_save_error_is_returned(self):
+        with tempfile.NamedTemporaryFile() as fp:
+            # the replay directory is a file, so saving the history fails
+            job = (0, 'reconchess.bots.random_bot', 'reconchess.bots.random_bot', 900, fp.name, None)
+            result = play_scheduled_game(job)
+        self.assertEqual(result[:3], (0, 'reconchess.bots.random_bot', 'reconchess.bots.random_bot'))
+        self.assertIsNone(result[5])
+        self.assertIsNotNone(result[6])
+
+    def test_archive(self):
+        with tempfile.TemporaryDirectory() as d:
+            archive_path = os.path.join(d, 'games.rca')
+            for game_number in range(2):
+                job = (game_number, 'reconchess.bots.random_bot', 'reconchess.bots.random_bot', 900, d, archive_path)
+                result = play_scheduled_game(job)
+                self.assertIsNone(result[6])
+                self.assertEqual(result[5], archive_path)
+
+            self.assertEqual(sorted(os.listdir(d)), ['games.rca', 'games.rca.idx'])
+            archive = HistoryArchive(archive_path)
+            self.assertEqual([metadata['game_number'] for metadata, history in archive.games()], [0, 1])
+            self.assertEqual(archive.read(1)[0]['white'], 'RandomBot')
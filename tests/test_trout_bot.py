@@ -0,0 +1,113 @@
+import unittest
+import random
+from chess import *
+from reconchess import *
+from reconchess.engine import EnginePool
+from reconchess.bots.trout_bot import TroutBot
+from reconchess.board_set import BoardSet
+from reconchess.sense_planning import expected_information_gains
+from reconchess.utilities import possible_taken_moves
+from .test_engine import EngineFactory
+
+
+class RandomBot(Player):
+    def handle_game_start(self, color: Color, board: chess.Board):
+        pass
+
+    def handle_opponent_move_result(self, captured_my_piece: bool, capture_square: Optional[Square]):
+        pass
+
+    def choose_sense(self, sense_actions: List[Square], move_actions: List[chess.Move], seconds_left: float) -> Square:
+        return random.choice(sense_actions)
+
+    def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
+        pass
+
+    def choose_move(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
+        return random.choice(move_actions + [None])
+
+    def handle_move_result(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move],
+                           captured_opponent_piece: bool, capture_square: Optional[Square]):
+        pass
+
+    def handle_game_end(self, winner_color: Optional[Color], win_reason: Optional[WinReason],
+                        game_history: GameHistory):
+        pass
+
+
+def play_turns(game, players, num_turns, after_turn):
+    players[WHITE].handle_game_start(WHITE, game.board.copy())
+    players[BLACK].handle_game_start(BLACK, game.board.copy())
+    game.start()
+    for _ in range(num_turns):
+        if game.is_over():
+            break
+        play_turn(game, players[game.turn])
+        after_turn()
+
+
+class PossibleTakenMovesTestCase(unittest.TestCase):
+    def test_includes_pass_and_castles(self):
+        board = Board('r3k2r/8/8/8/8/8/5q2/R3K2R w KQkq - 0 1')
+        moves = possible_taken_moves(board)
+        self.assertIn(None, moves)
+        self.assertIn(Move(E1, G1), moves)
+        self.assertIn(Move(E1, C1), moves)
+        self.assertEqual(len(moves), len(set(moves)))
+
+
+class TroutBotHypothesesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pool = EnginePool(EngineFactory(), max_engines=2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_tracks_true_board(self):
+        for color in COLORS:
+            game = LocalGame()
+            bot = TroutBot(engine_pool=self.pool, max_hypotheses=5000, min_search_time=0.001)
+            players = {color: bot, not color: RandomBot()}
+
+            def check():
+                # only check after the bot's turn, since it doesn't know about the opponent's move until its next turn
+                if game.turn == color:
+                    return
+                boards = [board.board_fen() for board, _ in bot.hypotheses]
+                self.assertIn(game.board.board_fen(), boards)
+                self.assertAlmostEqual(sum(likelihood for _, likelihood in bot.hypotheses), 1)
+
+            play_turns(game, players, 8, check)
+
+    def test_capped(self):
+        game = LocalGame()
+        bot = TroutBot(engine_pool=self.pool, max_hypotheses=10, min_search_time=0.001)
+        players = {WHITE: bot, BLACK: RandomBot()}
+
+        def check():
+            if game.turn == BLACK:
+                self.assertLessEqual(len(bot.hypotheses), 10)
+            likelihoods = [likelihood for _, likelihood in bot.hypotheses]
+            self.assertEqual(likelihoods, sorted(likelihoods, reverse=True))
+
+        play_turns(game, players, 30, check)
+
+    def test_single_board_by_default(self):
+        bot = TroutBot(engine_pool=self.pool)
+        bot.handle_game_start(WHITE, Board())
+        self.assertEqual(bot.hypotheses, [])
+
+    def test_votes_for_king_capture_on_a1(self):
+        bot = TroutBot(engine_pool=self.pool, max_hypotheses=10)
+        bot.handle_game_start(BLACK, Board('4k3/8/8/8/8/8/r7/K7 b - - 0 1'))
+        move = bot.choose_move([Move(A2, A1), Move(A2, B2)], 900)
+        self.assertEqual(move, Move(A2, A1))
+
+    def test_senses_for_information(self):
+        bot = TroutBot(engine_pool=self.pool, max_hypotheses=10)
+        bot.handle_game_start(BLACK, Board())
+        bot.handle_opponent_move_result(False, None)
+        sense = bot.choose_sense(list(SQUARES), [], 900)
+        boards, likelihoods = zip(*bot.hypotheses)
+        gains = expected_information_gains(BoardSet(boards, likelihoods))
+        self.assertEqual(gains[sense], gains.max())
@@ -1,4 +1,5 @@
 import unittest
+import chess.polyglot
 from reconchess import *
 from reconchess.utilities import *
 from chess import *
@@ -833,3 +834,171 @@ class AddPawnQueenPromotionTestCase(unittest.TestCase):
         for piece_type in chess.PIECE_TYPES[1:-1]:
             self.assertEqual(add_pawn_queen_promotion(board, Move(A7, A8, promotion=piece_type)),
                              Move(A7, A8, promotion=piece_type))
+
+
+def reference_is_illegal_castle(board: Board, move: Move) -> bool:
+    if not board.is_castling(move):
+        return False
+    if board.is_kingside_castling(move) and not board.has_kingside_castling_rights(board.turn):
+        return True
+    if board.is_queenside_castling(move) and not board.has_queenside_castling_rights(board.turn):
+        return True
+    rook_square = square(7 if board.is_kingside_castling(move) else 0, square_rank(move.from_square))
+    between_squares = SquareSet(BB_BETWEEN[move.from_square][rook_square])
+    return any(map(lambda s: board.piece_at(s), between_squares))
+
+
+def reference_slide_move(board: Board, move: Move) -> Optional[Move]:
+    psuedo_legal_moves = list(board.generate_pseudo_legal_moves())
+    squares = list(SquareSet(BB_BETWEEN[move.from_square][move.to_square])) + [move.to_square]
+    squares = sorted(squares, key=lambda s: square_distance(s, move.from_square), reverse=True)
+    for slide_square in squares:
+        revised = Move(move.from_square, slide_square, move.promotion)
+        if revised in psuedo_legal_moves:
+            return revised
+    return None
+
+
+def reference_without_opponent_pieces(board: Board) -> Board:
+    b = board.copy()
+    for piece_type in PIECE_TYPES:
+        for sq in b.pieces(piece_type, not board.turn):
+            b.remove_piece_at(sq)
+    return b
+
+
+def reference_pawn_capture_moves_on(board: Board) -> List[Move]:
+    pawn_capture_moves = []
+    no_opponents_board = reference_without_opponent_pieces(board)
+    for pawn_square in board.pieces(PAWN, board.turn):
+        for attacked_square in board.attacks(pawn_square):
+            if no_opponents_board.piece_at(attacked_square):
+                continue
+            pawn_capture_moves.append(Move(pawn_square, attacked_square))
+            if attacked_square in SquareSet(BB_BACKRANKS):
+                for piece_type in PIECE_TYPES[1:-1]:
+                    pawn_capture_moves.append(Move(pawn_square, attacked_square, promotion=piece_type))
+    return pawn_capture_moves
+
+
+class BitboardRegressionTestCase(unittest.TestCase):
+    """Compares the bitboard implementations against the original piece-by-piece implementations."""
+
+    def random_boards(self, games=20, max_turns=200):
+        for _ in range(games):
+            board = Board()
+            turn = 1
+            while not board.is_game_over() and turn < max_turns:
+                yield board
+                board.push(random.choice(list(board.generate_pseudo_legal_moves())))
+                turn += 1
+
+    def test_without_opponent_pieces(self):
+        for board in self.random_boards():
+            expected = reference_without_opponent_pieces(board)
+            actual = without_opponent_pieces(board)
+            self.assertEqual(actual.fen(), expected.fen())
+            self.assertEqual(actual.promoted, expected.promoted)
+            self.assertEqual(list(actual.generate_pseudo_legal_moves()),
+                             list(expected.generate_pseudo_legal_moves()))
+
+    def test_pawn_capture_moves_on(self):
+        for board in self.random_boards():
+            self.assertEqual(pawn_capture_moves_on(board), reference_pawn_capture_moves_on(board))
+
+    def test_slide_move(self):
+        for board in self.random_boards(games=5):
+            for move in moves_without_opponent_pieces(board) + pawn_capture_moves_on(board):
+                self.assertEqual(slide_move(board, move), reference_slide_move(board, move))
+
+    def test_is_illegal_castle(self):
+        castles = [Move(E1, G1), Move(E1, C1), Move(E8, G8), Move(E8, C8)]
+        for board in self.random_boards():
+            for move in castles:
+                self.assertEqual(is_illegal_castle(board, move), reference_is_illegal_castle(board, move))
+
+
+class SenseWindowTestCase(unittest.TestCase):
+    def test_windows(self):
+        self.assertEqual(SENSE_WINDOWS[B7], (A8, B8, C8, A7, B7, C7, A6, B6, C6))
+        self.assertEqual(SENSE_WINDOWS[A1], (A2, B2, A1, B1))
+        self.assertEqual(SENSE_WINDOWS[H5], (G6, H6, G5, H5, G4, H4))
+
+    def test_masks(self):
+        for square in SQUARES:
+            self.assertEqual(list(SquareSet(SENSE_WINDOW_MASKS[square])), sorted(SENSE_WINDOWS[square]))
+            self.assertEqual(SquareSet(SENSE_WINDOW_MASKS[square]),
+                             SquareSet(BB_SQUARES[square] | BB_KING_ATTACKS[square]))
+
+
+class InformationSetMovesTestCase(unittest.TestCase):
+    def random_boards(self, games=10, max_turns=150):
+        # random games with passes and castles, like the boards a bot has to track
+        for _ in range(games):
+            board = Board()
+            turn = 1
+            while board.king(WHITE) is not None and board.king(BLACK) is not None and turn < max_turns:
+                yield board
+                board.push(random.choice(possible_taken_moves(board)) or Move.null())
+                turn += 1
+
+    def test_possible_taken_moves_are_revised_move_actions(self):
+        for board in self.random_boards():
+            move_actions = moves_without_opponent_pieces(board) + pawn_capture_moves_on(board)
+            revised = {revise_move(board, add_pawn_queen_promotion(board, move)) for move in move_actions}
+            moves = possible_taken_moves(board)
+            self.assertEqual(len(moves), len(set(moves)))
+            self.assertEqual(set(moves), revised | {None})
+
+    def test_possible_taken_moves_excludes_opponent_castles(self):
+        board = Board('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+        moves = possible_taken_moves(board)
+        self.assertIn(Move(E1, G1), moves)
+        self.assertIn(Move(E1, C1), moves)
+        self.assertNotIn(Move(E8, G8), moves)
+        self.assertNotIn(Move(E8, C8), moves)
+
+    def test_consistent_taken_moves(self):
+        for board in self.random_boards():
+            moves = possible_taken_moves(board)
+            for capture_square in [None] + list(SQUARES):
+                expected = [move for move in moves if capture_square_of_move(board, move) == capture_square]
+                self.assertCountEqual(consistent_taken_moves(board, capture_square), expected)
+
+    def test_consistent_taken_moves_en_passant(self):
+        board = Board('4k3/8/8/3Pp3/8/8/8/4K3 w - e6 0 1')
+        self.assertEqual(consistent_taken_moves(board, E5), [Move(D5, E6)])
+        self.assertNotIn(Move(D5, E6), consistent_taken_moves(board, None))
+        self.assertEqual(consistent_taken_moves(board, E6), [])
+
+    def test_successor_boards(self):
+        board = Board('4k3/8/8/8/8/8/8/R3K3 b Q - 0 1')
+        successors = successor_boards([board], None)
+        expected = [move for move in possible_taken_moves(board) if capture_square_of_move(board, move) is None]
+        self.assertEqual(len(successors), len(expected))
+        for move in expected:
+            successor = board.copy()
+            successor.push(move if move is not None else Move.null())
+            key = chess.polyglot.zobrist_hash(successor)
+            self.assertIn(key, successors)
+            self.assertEqual(successors[key][0], successor)
+        self.assertEqual(board, Board('4k3/8/8/8/8/8/8/R3K3 b Q - 0 1'))
+
+    def test_successor_boards_merges_duplicates(self):
+        # both boards become the same board if the king moves to d8
+        boards = [Board('4k3/8/8/8/8/8/8/4K3 b - - 0 1'), Board('2k5/8/8/8/8/8/8/4K3 b - - 0 1')]
+        successors = successor_boards(boards, None, weights=[0.75, 0.25])
+        merged = Board('3k4/8/8/8/8/8/8/4K3 w - - 1 2')
+        _, weight = successors[chess.polyglot.zobrist_hash(merged)]
+        self.assertAlmostEqual(weight, 0.75 / 6 + 0.25 / 6)
+
+    def test_successor_boards_weights(self):
+        for board in self.random_boards(games=3):
+            total = 0
+            for capture_square in [None] + list(SQUARES):
+                successors = successor_boards([board], capture_square, weights=[2.0])
+                for key, (successor, weight) in successors.items():
+                    self.assertEqual(key, chess.polyglot.zobrist_hash(successor))
+                    self.assertEqual(successor.turn, not board.turn)
+                total += sum(weight for _, weight in successors.values())
+            self.assertAlmostEqual(total, 2.0)